@@ -14,7 +14,7 @@ from backend.base.definitions import Constants, StartType
 from backend.base.helpers import check_min_python_version, get_python_exe
 from backend.base.logging import LOGGER, setup_logging
 from backend.features.tasks import TaskHandler
-from backend.internals.db import set_db_location, setup_db
+from backend.internals.db import set_db_location, set_wal_mode, setup_db
 from backend.internals.migrations import run_migrations
 from backend.internals.server import SERVER, handle_start_type
 
@@ -54,7 +54,9 @@ def _main(
     log_file: Union[str, None] = None,
     host: Union[str, None] = None,
     port: Union[int, None] = None,
-    url_base: Union[str, None] = None
+    url_base: Union[str, None] = None,
+    wal_mode: bool = False,
+    watch_library: bool = False
 ) -> NoReturn:
     """The main function of the Readlook sub-process.
 
@@ -83,6 +85,14 @@ def _main(
         server.
             Defaults to None.
 
+        wal_mode (bool, optional): Use the WAL journal mode for the database.
+        Only use this when the database is on a local disk.
+            Defaults to False.
+
+        watch_library (bool, optional): Scan series as soon as files in the
+        root folders change, instead of waiting for the next periodic scan.
+            Defaults to False.
+
     Raises:
         ValueError: One of the arguments has an invalid value.
 
@@ -98,6 +108,7 @@ def _main(
         exit(1)
 
     set_db_location(db_folder)
+    set_wal_mode(wal_mode)
 
     SERVER.create_app()
 
@@ -148,6 +159,16 @@ def _main(
         task_handler = TaskHandler()
         task_handler.handle_intervals()
 
+        # Continue background scans that were interrupted by a shutdown
+        from backend.features.scan_jobs import resume_scan_jobs
+        resume_scan_jobs()
+
+        library_watcher = None
+        if watch_library:
+            from backend.features.library_watcher import LibraryWatcher
+            library_watcher = LibraryWatcher()
+            library_watcher.start()
+
     try:
         # =================
         SERVER.run(settings.host, settings.port)
@@ -155,6 +176,8 @@ def _main(
 
     finally:
         task_handler.stop_handle()
+        if library_watcher is not None:
+            library_watcher.stop()
 
         if SERVER.start_type is not None:
             # Check if we're running in Docker
@@ -277,6 +300,16 @@ if __name__ == "__main__":
             type=str,
             help="The filename of the file in which the logs from Readloom will be stored"
         )
+        fs.add_argument(
+            '-w', '--WalMode',
+            action='store_true',
+            help="Use the WAL journal mode for the database so reads don't wait on writes. Only use this when the database is on a local disk, not on a network share"
+        )
+        fs.add_argument(
+            '-W', '--WatchLibrary',
+            action='store_true',
+            help="Watch the root folders and scan series as soon as their files change. Uses inotify on Linux and polling otherwise"
+        )
 
         hs = parser.add_argument_group(title="Hosting settings")
         hs.add_argument(
@@ -305,6 +338,8 @@ if __name__ == "__main__":
         db_folder: Union[str, None] = args.DatabaseFolder
         log_folder: Union[str, None] = args.LogFolder
         log_file: Union[str, None] = args.LogFile
+        wal_mode: bool = args.WalMode or environ.get("READLOOM_DB_WAL") == "1"
+        watch_library: bool = args.WatchLibrary or environ.get("READLOOM_WATCH_LIBRARY") == "1"
         host: Union[str, None] = None
         port: Union[int, None] = None
         url_base: Union[str, None] = None
@@ -321,7 +356,9 @@ if __name__ == "__main__":
                 log_file=log_file,
                 host=host,
                 port=port,
-                url_base=url_base
+                url_base=url_base,
+                wal_mode=wal_mode,
+                watch_library=watch_library
             )
 
         except ValueError as e:
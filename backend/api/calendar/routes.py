@@ -5,16 +5,167 @@
 API endpoints for calendar events.
 """
 
-from flask import Blueprint, jsonify, request
-from datetime import datetime
+import heapq
+import json
+from typing import Any, Callable, Dict, Hashable, Optional
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
+from datetime import date, datetime, time, timezone
 
 from backend.base.logging import LOGGER
+from backend.features.calendar import (
+    VIEW_CACHE, FeedFilter, get_calendar_version, open_feed_file,
+    iter_ical_lines, make_etag
+)
+from backend.features.content_service_factory import ContentType
+from backend.features.release_schedules import iter_scheduled_releases
 from backend.internals.db import execute_query
 
 # Create Blueprint for calendar API
 calendar_bp = Blueprint('calendar', __name__, url_prefix='/api/calendar')
 
 
+def _format_event(event: dict) -> dict:
+    """Format a chapter release for the frontend."""
+    return {
+        'id': event.get('id'),
+        'seriesId': event.get('series_id'),
+        'seriesTitle': event.get('series_title'),
+        'contentType': event.get('content_type'),
+        'releaseDate': event.get('release_date'),
+        'chapterNumber': event.get('chapter_number'),
+        'title': event.get('chapter_title')
+    }
+
+
+def _iter_scheduled_events(start_date, end_date, series_filter: str = "", params: tuple = ()):
+    """Yield the releases of the release schedules, formatted like chapters.
+
+    They have no chapter row, so their ID is a string.
+    """
+    for release in iter_scheduled_releases(start_date, end_date, series_filter, params):
+        yield {
+            'id': f"schedule-{release['schedule_id']}-{release['chapter_number']}",
+            'seriesId': release['series_id'],
+            'seriesTitle': release['series_title'],
+            'contentType': release['content_type'],
+            'releaseDate': release['release_date'],
+            'chapterNumber': release['chapter_number'],
+            'title': f"Chapter {release['chapter_number']}"
+        }
+
+
+def _is_not_modified(etag: str, last_modified: datetime) -> bool:
+    """Check whether the client already has the current response.
+
+    HTTP dates have whole seconds, so a change in the same second as the
+    date the client has is not seen by If-Modified-Since. It is only
+    honoured when it is later than the last change.
+
+    Args:
+        etag (str): The ETag of the current response.
+        last_modified (datetime): When the current response last changed.
+
+    Returns:
+        bool: True if a 304 response can be sent.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return bool(request.if_modified_since) and request.if_modified_since > last_modified
+
+
+def _cached_view(key: Hashable, build: Callable[[], Dict[str, Any]]) -> Response:
+    """Respond with a calendar view, from the view cache if it is current.
+
+    The ETag and Last-Modified of the response follow the calendar version,
+    so a client that sends them back gets a 304 response without the view
+    being built or even looked up.
+
+    Args:
+        key (Hashable): The key of the view, e.g. the range and filters.
+        build (Callable[[], Dict[str, Any]]): Builds the view if needed.
+
+    Returns:
+        Response: The view, or a 304 response.
+    """
+    version = get_calendar_version()
+    if version is None:
+        return jsonify(build())
+
+    etag = make_etag(key, version.version)
+    if _is_not_modified(etag, version.changed_at):
+        response = Response(status=304)
+    else:
+        view = VIEW_CACHE.get(key, version.version)
+        if view is None:
+            view = json.dumps(build(), default=str).encode()
+            VIEW_CACHE.put(key, version.version, view)
+        response = Response(view, mimetype='application/json')
+
+    response.set_etag(etag)
+    response.last_modified = version.changed_at
+    # Clients may keep the view, but have to check whether it is still current
+    response.cache_control.no_cache = True
+    return response
+
+
+def _build_range_view(
+    start_date: str,
+    end_date: str,
+    content_type: Optional[str],
+    collection_id: Optional[str]
+) -> Dict[str, Any]:
+    """Get the chapter releases in a date range, with optional filters."""
+    # Build query for calendar events
+    query = """
+        SELECT 
+            c.id,
+            c.series_id,
+            s.title as series_title,
+            s.content_type,
+            c.release_date,
+            c.chapter_number,
+            c.title as chapter_title
+        FROM chapters c
+        JOIN series s ON c.series_id = s.id
+        WHERE c.release_date BETWEEN ? AND ?
+    """
+
+    series_filter = ""
+    series_params = []
+
+    # Add content type filter if provided
+    if content_type:
+        series_filter += " AND s.content_type = ?"
+        series_params.append(content_type)
+
+    # Add collection filter if provided
+    if collection_id:
+        series_filter += """
+            AND s.id IN (
+                SELECT series_id FROM series_collections
+                WHERE collection_id = ?
+            )
+        """
+        series_params.append(collection_id)
+
+    query += series_filter + " ORDER BY c.release_date ASC"
+
+    events = execute_query(query, (start_date, end_date, *series_params))
+
+    # Transform database results to calendar event format, with the
+    # releases of the release schedules merged in by date
+    calendar_events = list(heapq.merge(
+        (_format_event(event) for event in events or []),
+        _iter_scheduled_events(start_date, end_date, series_filter, tuple(series_params)),
+        key=lambda event: event['releaseDate'] or ''
+    ))
+
+    return {
+        "success": True,
+        "events": calendar_events
+    }
+
+
 @calendar_bp.route('', methods=['GET'])
 def get_calendar_events():
     """Get calendar events for a date range.
@@ -25,6 +176,9 @@ def get_calendar_events():
         content_type: Filter by content type (optional)
         collection_id: Filter by collection (optional)
     
+    Responses carry an ETag and Last-Modified, and are 304 when the
+    calendar didn't change since.
+    
     Returns:
         Response: Calendar events for the date range.
     """
@@ -37,65 +191,46 @@ def get_calendar_events():
         if not start_date or not end_date:
             return jsonify({"error": "start_date and end_date are required"}), 400
         
-        # Build query for calendar events
-        query = """
-            SELECT 
-                c.id,
-                c.series_id,
-                s.title as series_title,
-                s.content_type,
-                c.release_date,
-                c.chapter_number,
-                c.title as chapter_title
-            FROM chapters c
-            JOIN series s ON c.series_id = s.id
-            WHERE c.release_date BETWEEN ? AND ?
-        """
-        
-        params = [start_date, end_date]
-        
-        # Add content type filter if provided
-        if content_type:
-            query += " AND s.content_type = ?"
-            params.append(content_type)
-        
-        # Add collection filter if provided
-        if collection_id:
-            query += """
-                AND s.id IN (
-                    SELECT series_id FROM collection_series 
-                    WHERE collection_id = ?
-                )
-            """
-            params.append(collection_id)
-        
-        query += " ORDER BY c.release_date ASC"
-        
-        events = execute_query(query, tuple(params))
-        
-        # Transform database results to calendar event format
-        calendar_events = []
-        if events:
-            for event in events:
-                calendar_events.append({
-                    'id': event.get('id'),
-                    'seriesId': event.get('series_id'),
-                    'seriesTitle': event.get('series_title'),
-                    'contentType': event.get('content_type'),
-                    'releaseDate': event.get('release_date'),
-                    'chapterNumber': event.get('chapter_number'),
-                    'title': event.get('chapter_title')
-                })
-        
-        return jsonify({
-            "success": True,
-            "events": calendar_events
-        })
+        key = ('range', start_date, end_date, content_type, collection_id)
+        return _cached_view(key, lambda: _build_range_view(
+            start_date, end_date, content_type, collection_id
+        ))
     except Exception as e:
         LOGGER.error(f"Error getting calendar events: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+def _build_series_view(series_id: int) -> Dict[str, Any]:
+    """Get all chapter releases of a series."""
+    query = """
+        SELECT 
+            c.id,
+            c.series_id,
+            s.title as series_title,
+            s.content_type,
+            c.release_date,
+            c.chapter_number,
+            c.title as chapter_title
+        FROM chapters c
+        JOIN series s ON c.series_id = s.id
+        WHERE c.series_id = ?
+        ORDER BY c.release_date ASC
+    """
+
+    events = execute_query(query, (series_id,))
+
+    calendar_events = list(heapq.merge(
+        (_format_event(event) for event in events or []),
+        _iter_scheduled_events(None, None, "AND s.id = ?", (series_id,)),
+        key=lambda event: event['releaseDate'] or ''
+    ))
+
+    return {
+        "success": True,
+        "events": calendar_events
+    }
+
+
 @calendar_bp.route('/series/<int:series_id>', methods=['GET'])
 def get_series_calendar_events(series_id: int):
     """Get calendar events for a specific series.
@@ -107,40 +242,7 @@ def get_series_calendar_events(series_id: int):
         Response: Calendar events for the series.
     """
     try:
-        query = """
-            SELECT 
-                c.id,
-                c.series_id,
-                s.title as series_title,
-                s.content_type,
-                c.release_date,
-                c.chapter_number,
-                c.title as chapter_title
-            FROM chapters c
-            JOIN series s ON c.series_id = s.id
-            WHERE c.series_id = ?
-            ORDER BY c.release_date ASC
-        """
-        
-        events = execute_query(query, (series_id,))
-        
-        calendar_events = []
-        if events:
-            for event in events:
-                calendar_events.append({
-                    'id': event.get('id'),
-                    'seriesId': event.get('series_id'),
-                    'seriesTitle': event.get('series_title'),
-                    'contentType': event.get('content_type'),
-                    'releaseDate': event.get('release_date'),
-                    'chapterNumber': event.get('chapter_number'),
-                    'title': event.get('chapter_title')
-                })
-        
-        return jsonify({
-            "success": True,
-            "events": calendar_events
-        })
+        return _cached_view(('series', series_id), lambda: _build_series_view(series_id))
     except Exception as e:
         LOGGER.error(f"Error getting series calendar events: {e}")
         return jsonify({"error": str(e)}), 500
@@ -176,16 +278,7 @@ def get_calendar_event(event_id: int):
         if not event:
             return jsonify({"error": "Event not found"}), 404
         
-        event_data = event[0]
-        calendar_event = {
-            'id': event_data.get('id'),
-            'seriesId': event_data.get('series_id'),
-            'seriesTitle': event_data.get('series_title'),
-            'contentType': event_data.get('content_type'),
-            'releaseDate': event_data.get('release_date'),
-            'chapterNumber': event_data.get('chapter_number'),
-            'title': event_data.get('chapter_title')
-        }
+        calendar_event = _format_event(event[0])
         
         return jsonify({
             "success": True,
@@ -194,3 +287,71 @@ def get_calendar_event(event_id: int):
     except Exception as e:
         LOGGER.error(f"Error getting calendar event: {e}")
         return jsonify({"error": str(e)}), 500
+
+
+@calendar_bp.route('/feed.ics', methods=['GET'])
+def get_calendar_feed():
+    """Get the release calendar as iCalendar feed, e.g. for phone calendars.
+    
+    Query parameters:
+        collection_id: Only the releases of a collection (optional)
+        content_type: Only the releases of a content type (optional)
+    
+    Without filters, the feed holds the releases of the whole library. The
+    feed is written to disk when the calendar changed, and is 304 when the
+    client already has the current feed.
+    
+    Returns:
+        Response: The feed, or 400 for an unknown collection or content type.
+    """
+    try:
+        # Every filter has its own feed file, so only existing ones are allowed
+        collection_id = request.args.get('collection_id') or None
+        if collection_id is not None:
+            if not collection_id.isdigit() or not execute_query(
+                "SELECT 1 FROM collections WHERE id = ?", (int(collection_id),)
+            ):
+                return jsonify({"error": "Unknown collection_id"}), 400
+            collection_id = int(collection_id)
+        
+        content_type = request.args.get('content_type') or None
+        if content_type is not None:
+            content_type = content_type.upper()
+            if content_type not in ContentType.__members__:
+                return jsonify({"error": "Unknown content_type"}), 400
+        
+        feed = FeedFilter(collection_id, content_type)
+        
+        version = get_calendar_version()
+        if version is None:
+            return Response(
+                stream_with_context(iter_ical_lines(feed)),
+                mimetype='text/calendar'
+            )
+        
+        # The feed starts a month ago, so it also changes every day
+        today = date.today()
+        etag = make_etag(('feed', feed, today.isoformat()), version.version)
+        last_modified = max(
+            version.changed_at,
+            datetime.combine(today, time()).astimezone(timezone.utc)
+        )
+        
+        if _is_not_modified(etag, last_modified):
+            response = Response(status=304)
+        else:
+            response = send_file(
+                open_feed_file(feed, version),
+                mimetype='text/calendar',
+                download_name='readloom.ics',
+                conditional=False,
+                etag=False
+            )
+        
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        LOGGER.error(f"Error getting calendar feed: {e}")
+        return jsonify({"error": str(e)}), 500
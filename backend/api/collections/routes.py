@@ -12,6 +12,7 @@ import json
 
 from flask import Blueprint, request, jsonify
 
+from backend.api.streaming import stream_json_list
 from backend.base.custom_exceptions import InvalidCollectionError
 from backend.base.logging import LOGGER
 from backend.internals.db import execute_query
@@ -33,6 +34,7 @@ from backend.features.collection import (
     remove_series_from_collection,
     get_collection_series,
     get_default_collection,
+    iter_collection_export,
 )
 
 # Create Blueprint
@@ -520,6 +522,27 @@ def api_remove_series_from_collection(collection_id: int, series_id: int):
         }), 500
 
 
+# Collection Export Endpoint
+
+@collections_api.route('/api/collection/export', methods=['GET'])
+def api_export_collection():
+    """Export all collection items.
+    
+    The items are streamed, so large collections are never held in memory.
+    
+    Returns:
+        Response: The collection items.
+    """
+    try:
+        return stream_json_list(iter_collection_export(), "items")
+    except Exception as e:
+        LOGGER.error(f"Error exporting collection: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 # Want-to-Read Collection Endpoints
 
 @collections_api.route('/api/collection/want-to-read', methods=['GET'])
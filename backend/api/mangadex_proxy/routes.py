@@ -7,6 +7,7 @@ MangaDex API proxy endpoints to bypass CORS restrictions.
 
 import requests
 from flask import Blueprint, jsonify, request
+from backend.internals import http_client
 from backend.base.logging import LOGGER
 
 # Create API blueprint
@@ -42,7 +43,7 @@ def search_manga():
             params[f'includes[]'] = include
         
         # Make request to MangaDex API
-        response = requests.get(f"{MANGADEX_API}/manga", params=params, timeout=10)
+        response = http_client.get(f"{MANGADEX_API}/manga", params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -75,7 +76,7 @@ def get_chapters(manga_id):
             params[f'translatedLanguage[]'] = lang
         
         # Make request to MangaDex API
-        response = requests.get(f"{MANGADEX_API}/manga/{manga_id}/chapter", params=params, timeout=10)
+        response = http_client.get(f"{MANGADEX_API}/manga/{manga_id}/chapter", params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -99,7 +100,7 @@ def get_cover_image(manga_id, filename):
         cover_url = f"{MANGADEX_COVER_BASE}/{manga_id}/{filename}"
         
         # Make request to MangaDex CDN
-        response = requests.get(cover_url, timeout=10)
+        response = http_client.get(cover_url, timeout=10)
         response.raise_for_status()
         
         # Return the image data
@@ -120,7 +121,7 @@ def health_check():
     """Health check for MangaDex proxy."""
     try:
         # Test basic MangaDex API connectivity
-        response = requests.get(f"{MANGADEX_API}/manga?limit=1", timeout=5)
+        response = http_client.get(f"{MANGADEX_API}/manga?limit=1", timeout=5)
         if response.status_code == 200:
             return jsonify({
                 "status": "healthy",
@@ -12,6 +12,7 @@ from backend.internals.db import execute_query
 from backend.features.metadata_service import (
     search_manga, get_manga_details, get_chapter_list, get_chapter_images,
     get_latest_releases, get_providers, update_provider, clear_cache,
+    get_cache_stats,
     import_manga_to_collection, add_to_want_to_read_collection
 )
 
@@ -259,6 +260,23 @@ def api_clear_cache():
         return jsonify({"error": str(e)}), 500
 
 
+@metadata_api_bp.route('/cache/stats', methods=['GET'])
+def api_cache_stats():
+    """Get the counters of the metadata cache.
+    
+    Returns:
+        Response: The hits, misses, evictions and entries of the cache.
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "stats": get_cache_stats()
+        })
+    except Exception as e:
+        LOGGER.error(f"Error in cache stats API: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @metadata_api_bp.route('/import/<provider>/<manga_id>', methods=['POST'])
 def api_import_manga(provider, manga_id):
     """Import a manga or book to the collection.
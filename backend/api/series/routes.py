@@ -5,10 +5,28 @@
 API endpoints for series.
 """
 
-from flask import Blueprint, jsonify, request
+import json
+import time
 
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from backend.api.streaming import stream_json_list
 from backend.base.logging import LOGGER
-from backend.internals.db import execute_query
+from backend.features.ebook_file_metadata import get_file_metadata
+from backend.features.file_fingerprints import find_duplicate_files
+from backend.features.release_schedules import get_release_schedules
+from backend.features.scan_jobs import (
+    ACTIVE_STATUSES, cancel_scan_job, get_scan_job, get_scan_jobs, submit_scan_job
+)
+from backend.internals.db import execute_query, iter_query
+
+
+# Seconds between two checks for progress of a scan job in the event stream
+SCAN_JOB_EVENT_INTERVAL = 1
+
+# Most seconds an event stream stays open. It holds a server thread, so
+# clients reconnect after this instead of keeping it for a whole scan
+SCAN_JOB_STREAM_SECONDS = 30
 
 
 # Create Blueprint for series API
@@ -38,19 +56,27 @@ def scan_series_for_ebooks(series_id: int):
         
         # Get custom path from request body if provided
         custom_path = None
+        full_scan = False
+        background = False
         if request.is_json:
             data = request.json or {}
             custom_path = data.get('custom_path')
-            LOGGER.info(f"Request has JSON content, custom_path: {custom_path}")
+            full_scan = bool(data.get('full_scan', False))
+            background = bool(data.get('background', False))
+            LOGGER.info(f"Request has JSON content, custom_path: {custom_path}, full_scan: {full_scan}")
         else:
             LOGGER.info("Request does not have JSON content")
         
+        if background:
+            job = submit_scan_job(series_id=series_id, custom_path=custom_path, full_scan=full_scan)
+            return jsonify({"success": True, "job": job}), 202
+        
         # Import scan function
         from backend.features.ebook_files import scan_for_ebooks
         
         # Scan for e-books
         LOGGER.info(f"Starting scan for series ID {series_id} with custom_path: {custom_path}")
-        scan_results = scan_for_ebooks(specific_series_id=series_id, custom_path=custom_path)
+        scan_results = scan_for_ebooks(specific_series_id=series_id, custom_path=custom_path, full_scan=full_scan)
         LOGGER.info(f"Scan completed with results: {scan_results}")
         
         # Add success flag
@@ -77,20 +103,28 @@ def scan_all_ebooks():
         
         # Get content type filter from request body (optional)
         content_type = None
+        full_scan = False
+        background = False
         if request.is_json:
             data = request.json or {}
             content_type = data.get('content_type')
+            full_scan = bool(data.get('full_scan', False))
+            background = bool(data.get('background', False))
             LOGGER.info(f"Content type filter from request: {content_type}")
             LOGGER.info(f"Request data: {data}")
         else:
             LOGGER.warning("Request is not JSON format")
         
+        if background:
+            job = submit_scan_job(content_type=content_type, full_scan=full_scan)
+            return jsonify({"success": True, "job": job}), 202
+        
         # Import scan function
         from backend.features.ebook_files import scan_for_ebooks
         
         # Scan for all e-books with content type filter
         LOGGER.info("Starting general scan for all e-books")
-        scan_results = scan_for_ebooks(content_type_filter=content_type)
+        scan_results = scan_for_ebooks(content_type_filter=content_type, full_scan=full_scan)
         LOGGER.info(f"General scan completed with results: {scan_results}")
         
         # Add success flag
@@ -105,6 +139,160 @@ def scan_all_ebooks():
         return jsonify({"error": str(e)}), 500
 
 
+@api_series_bp.route('/api/series/scan/jobs', methods=['GET'])
+def list_scan_jobs():
+    """Get the most recent background scan jobs.
+
+    Query parameters:
+        limit: The maximum number of jobs (default 20)
+
+    Returns:
+        Response: The jobs, newest first.
+    """
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        return jsonify({"jobs": get_scan_jobs(limit)})
+    except Exception as e:
+        LOGGER.error(f"Error getting scan jobs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_series_bp.route('/api/series/scan/jobs/<int:job_id>', methods=['GET'])
+def get_scan_job_status(job_id: int):
+    """Get the status and progress of a background scan job.
+
+    Args:
+        job_id (int): The job ID.
+
+    Returns:
+        Response: The job.
+    """
+    try:
+        job = get_scan_job(job_id)
+        if job is None:
+            return jsonify({"error": "Scan job not found"}), 404
+        return jsonify({"job": job})
+    except Exception as e:
+        LOGGER.error(f"Error getting scan job {job_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_series_bp.route('/api/series/scan/jobs/<int:job_id>/events', methods=['GET'])
+def stream_scan_job_events(job_id: int):
+    """Follow the progress of a background scan job as server-sent events.
+
+    An event with the job is sent whenever it changes, and a comment as
+    heartbeat otherwise, so a client that went away is noticed within a
+    second. The stream ends when the job is finished, or after
+    `SCAN_JOB_STREAM_SECONDS`, after which the browser reconnects. The ID
+    of an event is the status of the job, so a browser that reconnects
+    after it got the finished job gets a 204 response, which stops it.
+
+    Args:
+        job_id (int): The job ID.
+
+    Returns:
+        Response: The event stream.
+    """
+    try:
+        job = get_scan_job(job_id)
+        if job is None:
+            return jsonify({"error": "Scan job not found"}), 404
+        if (
+            job['status'] not in ACTIVE_STATUSES
+            and request.headers.get('Last-Event-ID') == job['status']
+        ):
+            return Response(status=204)
+    except Exception as e:
+        LOGGER.error(f"Error getting scan job {job_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        deadline = time.monotonic() + SCAN_JOB_STREAM_SECONDS
+        # Reconnect right after the stream ends
+        yield f"retry: {SCAN_JOB_EVENT_INTERVAL * 1000}\n\n"
+        current = job
+        last = None
+        while current is not None:
+            if current != last:
+                yield f"id: {current['status']}\ndata: {json.dumps(current, default=str)}\n\n"
+                last = current
+            else:
+                yield ": heartbeat\n\n"
+            if current['status'] not in ACTIVE_STATUSES or time.monotonic() >= deadline:
+                break
+            time.sleep(SCAN_JOB_EVENT_INTERVAL)
+            current = get_scan_job(job_id)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+
+@api_series_bp.route('/api/series/scan/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_scan_job_request(job_id: int):
+    """Cancel a background scan job.
+
+    A running job stops after the series folder it is scanning.
+
+    Args:
+        job_id (int): The job ID.
+
+    Returns:
+        Response: The job.
+    """
+    try:
+        job = cancel_scan_job(job_id)
+        if job is None:
+            return jsonify({"error": "Scan job not found"}), 404
+        return jsonify({"success": True, "job": job})
+    except Exception as e:
+        LOGGER.error(f"Error cancelling scan job {job_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_series_bp.route('/api/series/files/duplicates', methods=['GET'])
+def get_duplicate_files():
+    """Get the e-book files that are stored more than once, also across
+    root folders and series.
+
+    Returns:
+        Response: The groups of duplicates and the space that can be reclaimed.
+    """
+    try:
+        duplicates = find_duplicate_files()
+        return jsonify({
+            "duplicates": duplicates,
+            "total_groups": len(duplicates),
+            "total_reclaimable": sum(group['reclaimable'] for group in duplicates)
+        })
+    except Exception as e:
+        LOGGER.error(f"Error finding duplicate files: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_series_bp.route('/api/series/files/<int:file_id>/metadata', methods=['GET'])
+def get_ebook_file_metadata(file_id: int):
+    """Get the page count, embedded metadata and cover of a CBZ, CBR or EPUB file.
+
+    Args:
+        file_id (int): The e-book file ID.
+
+    Returns:
+        Response: The metadata read from the file.
+    """
+    try:
+        metadata = get_file_metadata(file_id)
+        if metadata is None:
+            return jsonify({"error": "E-book file not found or not an archive"}), 404
+        return jsonify(metadata)
+    except Exception as e:
+        LOGGER.error(f"Error getting metadata of e-book file {file_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @api_series_bp.route('/api/series', methods=['GET'])
 def get_all_series():
     """Get all series.
@@ -146,9 +334,8 @@ def get_all_series():
         
         query += " ORDER BY title"
         
-        series = execute_query(query, tuple(params)) if params else execute_query(query)
-        
-        return jsonify({"series": series})
+        # Stream the rows instead of building the whole list in memory
+        return stream_json_list(iter_query(query, tuple(params)), "series")
     except Exception as e:
         LOGGER.error(f"Error getting series: {e}")
         return jsonify({"error": str(e)}), 500
@@ -480,10 +667,22 @@ def get_recent_series():
         }), 500
 
 
+def _chapter_sort_key(chapter_number) -> float:
+    """Sort chapter numbers numerically, like CAST(chapter_number AS INTEGER)."""
+    try:
+        return float(chapter_number)
+    except (TypeError, ValueError):
+        return 0.0
+
+
 @api_series_bp.route('/api/series/<int:series_id>/chapters', methods=['GET'])
 def get_series_chapters(series_id: int):
     """Get all chapters for a series.
     
+    Projected chapters of the release schedules of the series are included
+    with the same fields, and a string ID like "schedule-3-1125" as they
+    have no row.
+    
     Args:
         series_id: The ID of the series.
         
@@ -496,9 +695,26 @@ def get_series_chapters(series_id: int):
             FROM chapters 
             WHERE series_id = ?
             ORDER BY CAST(chapter_number AS INTEGER) ASC
-        """, (series_id,))
-        
-        return jsonify(chapters if chapters else [])
+        """, (series_id,)) or []
+        
+        schedules = get_release_schedules(series_id)
+        if schedules:
+            chapters.extend(
+                {
+                    'id': f"schedule-{schedule.id}-{number}",
+                    'series_id': series_id,
+                    'chapter_number': str(number),
+                    'title': f"Chapter {number}",
+                    'release_date': release_date,
+                    'status': 'ANNOUNCED',
+                    'read_status': 'UNREAD'
+                }
+                for schedule in schedules
+                for number, release_date in schedule.expand()
+            )
+            chapters.sort(key=lambda chapter: _chapter_sort_key(chapter['chapter_number']))
+        
+        return jsonify(chapters)
     except Exception as e:
         LOGGER.error(f"Error getting chapters for series {series_id}: {e}")
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Helpers for streaming large result sets as JSON.
+"""
+
+import json
+from typing import Any, Dict, Iterable
+
+from flask import Response, stream_with_context
+
+
+# Rows serialized per chunk written to the client
+CHUNK_ROWS = 100
+
+_END = object()
+
+
+def stream_json_list(rows: Iterable[Dict[str, Any]], key: str) -> Response:
+    """Stream rows to the client as `{"<key>": [row, row, ...]}`.
+
+    The rows are serialized as they are consumed, so combined with
+    `iter_query` the result set is never held in memory as a whole.
+    The first row is fetched before the response is started, so errors
+    of the query itself can still be turned into an error response by
+    the caller.
+
+    Args:
+        rows (Iterable[Dict[str, Any]]): The rows to send.
+        key (str): The key of the list in the JSON object.
+
+    Returns:
+        Response: The streaming response.
+    """
+    rows = iter(rows)
+    first = next(rows, _END)
+
+    def generate():
+        yield f'{{{json.dumps(key)}: ['
+        if first is not _END:
+            yield json.dumps(first, default=str)
+            chunk = []
+            for row in rows:
+                chunk.append(json.dumps(row, default=str))
+                if len(chunk) >= CHUNK_ROWS:
+                    yield "," + ",".join(chunk)
+                    chunk = []
+            if chunk:
+                yield "," + ",".join(chunk)
+        yield ']}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
@@ -31,6 +31,7 @@ class Constants:
     DEFAULT_TASK_INTERVAL_MINUTES: int = 60
     DEFAULT_EBOOK_STORAGE: str = "ebooks"
     DEFAULT_ROOT_FOLDERS: List[Dict[str, str]] = []  # Empty list by default
+    DEFAULT_SCAN_WORKERS: int = 0
 
 
 class Settings(NamedTuple):
@@ -47,6 +48,7 @@ class Settings(NamedTuple):
     task_interval_minutes: int
     ebook_storage: str
     root_folders: List[Dict[str, str]]  # List of root folders with path and name
+    scan_workers: int  # Worker processes for library scans, 0 to scan in one process
 
 
 class MangaFormat(Enum):
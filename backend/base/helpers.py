@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
 import os
 import sys
 import shutil
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Tuple, Union, Dict, Any
 
 
+# Maximum number of parsed README.txt files kept in memory
+README_CACHE_SIZE = 4096
+
+# README.txt path -> ((mtime_ns, size), parsed metadata)
+_README_CACHE: "OrderedDict[str, Tuple[Tuple[int, int], dict]]" = OrderedDict()
+_README_CACHE_LOCK = threading.Lock()
+
+
 def check_min_python_version(major: int, minor: int) -> bool:
     """Check if the current Python version is at least the given version.
 
@@ -487,7 +498,7 @@ def ensure_readme_file(series_dir: Path, series_title: str, series_id: int, cont
         
         # Create the README file with standardized format
         LOGGER.info(f"Creating README file in: {series_dir.name}")
-        with open(readme_path, 'w', encoding='utf-8') as f:
+        with io.StringIO() as f:
             # Required fields
             f.write(f"Series: {series_title}\n")
             f.write(f"ID: {series_id}\n")
@@ -549,6 +560,12 @@ def ensure_readme_file(series_dir: Path, series_title: str, series_id: int, cont
             
             # Footer
             f.write("This folder is managed by Readloom. Place your e-book files here.\n")
+            content = f.getvalue()
+        
+        with open(readme_path, 'w', encoding='utf-8') as readme_file:
+            readme_file.write(content)
+        # The content is known, so readers don't have to parse the file again
+        _update_readme_cache(readme_path, content)
         
         # Verify the file was created
         if readme_path.exists():
@@ -564,18 +581,15 @@ def ensure_readme_file(series_dir: Path, series_title: str, series_id: int, cont
         return False
 
 
-def read_metadata_from_readme(series_dir: Path) -> dict:
-    """Read metadata from README.txt file in the series directory.
+def _parse_readme(content: str) -> dict:
+    """Parse the content of a README.txt file.
 
     Args:
-        series_dir (Path): The series directory.
+        content (str): The content of the file.
 
     Returns:
-        dict: Metadata dictionary with keys: metadata_source, metadata_id, series_id, title, type, 
-              author, publisher, isbn, genres, cover_url.
+        dict: Metadata dictionary, see `read_metadata_from_readme()`.
     """
-    from backend.base.logging import LOGGER
-    
     metadata = {
         'metadata_source': None,
         'metadata_id': None,
@@ -599,93 +613,182 @@ def read_metadata_from_readme(series_dir: Path) -> dict:
         'user_description': None
     }
     
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        
+        if ':' in line:
+            key, value = line.split(':', 1)
+            key = key.strip()
+            value = value.strip()
+            
+            # Provider information
+            if key == 'MetadataSource':
+                metadata['metadata_source'] = value
+            elif key == 'MetadataID':
+                metadata['metadata_id'] = value
+            elif key == 'Provider':
+                # For books, "Provider" is the metadata_source
+                metadata['metadata_source'] = value
+            
+            # Core metadata
+            elif key == 'ID':
+                try:
+                    metadata['series_id'] = int(value)
+                except ValueError:
+                    pass
+            elif key == 'Series':
+                metadata['title'] = value
+            elif key == 'Book':
+                # For books, "Book" is the title
+                metadata['title'] = value
+            elif key == 'Type':
+                metadata['type'] = value
+            
+            # Additional metadata fields
+            elif key == 'Author':
+                metadata['author'] = value
+            elif key == 'Publisher':
+                metadata['publisher'] = value
+            elif key == 'ISBN':
+                metadata['isbn'] = value if value else None
+            elif key == 'Genres':
+                # Parse comma-separated genres into list
+                metadata['genres'] = [g.strip() for g in value.split(',')] if value else None
+            elif key == 'CoverURL':
+                metadata['cover_url'] = value if value else None
+            elif key == 'Status':
+                metadata['status'] = value
+            elif key == 'Description':
+                metadata['description'] = value
+            elif key == 'CustomPath':
+                metadata['custom_path'] = value
+            elif key == 'Created':
+                metadata['created'] = value
+            elif key == 'Updated':
+                metadata['updated'] = value
+            elif key == 'PublishedDate':
+                metadata['published_date'] = value
+            elif key == 'Subjects':
+                # Parse comma-separated subjects into list
+                metadata['subjects'] = [s.strip() for s in value.split(',')] if value else None
+            
+            # User tracking data
+            elif key == 'StarRating':
+                try:
+                    metadata['star_rating'] = float(value) if value else None
+                except ValueError:
+                    pass
+            elif key == 'ReadingProgress':
+                try:
+                    metadata['reading_progress'] = int(value) if value else None
+                except ValueError:
+                    pass
+            elif key == 'UserNotes':
+                metadata['user_description'] = value if value else None
+    
+    return metadata
+
+
+def _copy_metadata(metadata: dict) -> dict:
+    """Copy parsed README.txt metadata, including its lists."""
+    return {
+        key: list(value) if isinstance(value, list) else value
+        for key, value in metadata.items()
+    }
+
+
+def _store_readme_cache(readme_path: Path, stat_result: os.stat_result, metadata: dict) -> None:
+    """Add parsed README.txt metadata to the cache, dropping the least recently used files.
+
+    Args:
+        readme_path (Path): The README.txt file.
+        stat_result (os.stat_result): The state of the file that was parsed.
+        metadata (dict): The parsed metadata.
+    """
+    key = str(readme_path)
+    with _README_CACHE_LOCK:
+        _README_CACHE[key] = ((stat_result.st_mtime_ns, stat_result.st_size), metadata)
+        _README_CACHE.move_to_end(key)
+        while len(_README_CACHE) > README_CACHE_SIZE:
+            _README_CACHE.popitem(last=False)
+
+
+def _update_readme_cache(readme_path: Path, content: str) -> None:
+    """Store the parsed content of a README.txt file that was just written.
+
+    Args:
+        readme_path (Path): The README.txt file.
+        content (str): The content written to the file.
+    """
+    try:
+        stat_result = readme_path.stat()
+    except OSError:
+        invalidate_readme_cache(readme_path)
+        return
+
+    _store_readme_cache(readme_path, stat_result, _parse_readme(content))
+
+
+def invalidate_readme_cache(readme_path: Optional[Path] = None) -> None:
+    """Forget the parsed content of README.txt files.
+
+    Args:
+        readme_path (Optional[Path], optional): The README.txt file to forget.
+            Defaults to None, which forgets all files.
+    """
+    with _README_CACHE_LOCK:
+        if readme_path is None:
+            _README_CACHE.clear()
+        else:
+            _README_CACHE.pop(str(readme_path), None)
+
+
+def read_metadata_from_readme(series_dir: Path) -> dict:
+    """Read metadata from README.txt file in the series directory.
+
+    The parsed files are cached by their modification time and size, so
+    reading the same README.txt again only costs a `stat()`.
+
+    Args:
+        series_dir (Path): The series directory.
+
+    Returns:
+        dict: Metadata dictionary with keys: metadata_source, metadata_id, series_id, title, type, 
+              author, publisher, isbn, genres, cover_url.
+    """
+    from backend.base.logging import LOGGER
+    
     readme_path = series_dir / "README.txt"
+    key = str(readme_path)
+    
+    try:
+        stat_result = readme_path.stat()
+    except OSError:
+        invalidate_readme_cache(readme_path)
+        return _parse_readme("")
+    version = (stat_result.st_mtime_ns, stat_result.st_size)
     
-    if not readme_path.exists():
-        return metadata
+    with _README_CACHE_LOCK:
+        cached = _README_CACHE.get(key)
+        if cached is not None and cached[0] == version:
+            _README_CACHE.move_to_end(key)
+            # Callers are free to change the result
+            return _copy_metadata(cached[1])
     
     try:
         with open(readme_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    # Provider information
-                    if key == 'MetadataSource':
-                        metadata['metadata_source'] = value
-                    elif key == 'MetadataID':
-                        metadata['metadata_id'] = value
-                    elif key == 'Provider':
-                        # For books, "Provider" is the metadata_source
-                        metadata['metadata_source'] = value
-                    
-                    # Core metadata
-                    elif key == 'ID':
-                        try:
-                            metadata['series_id'] = int(value)
-                        except ValueError:
-                            pass
-                    elif key == 'Series':
-                        metadata['title'] = value
-                    elif key == 'Book':
-                        # For books, "Book" is the title
-                        metadata['title'] = value
-                    elif key == 'Type':
-                        metadata['type'] = value
-                    
-                    # Additional metadata fields
-                    elif key == 'Author':
-                        metadata['author'] = value
-                    elif key == 'Publisher':
-                        metadata['publisher'] = value
-                    elif key == 'ISBN':
-                        metadata['isbn'] = value if value else None
-                    elif key == 'Genres':
-                        # Parse comma-separated genres into list
-                        metadata['genres'] = [g.strip() for g in value.split(',')] if value else None
-                    elif key == 'CoverURL':
-                        metadata['cover_url'] = value if value else None
-                    elif key == 'Status':
-                        metadata['status'] = value
-                    elif key == 'Description':
-                        metadata['description'] = value
-                    elif key == 'CustomPath':
-                        metadata['custom_path'] = value
-                    elif key == 'Created':
-                        metadata['created'] = value
-                    elif key == 'Updated':
-                        metadata['updated'] = value
-                    elif key == 'PublishedDate':
-                        metadata['published_date'] = value
-                    elif key == 'Subjects':
-                        # Parse comma-separated subjects into list
-                        metadata['subjects'] = [s.strip() for s in value.split(',')] if value else None
-                    
-                    # User tracking data
-                    elif key == 'StarRating':
-                        try:
-                            metadata['star_rating'] = float(value) if value else None
-                        except ValueError:
-                            pass
-                    elif key == 'ReadingProgress':
-                        try:
-                            metadata['reading_progress'] = int(value) if value else None
-                        except ValueError:
-                            pass
-                    elif key == 'UserNotes':
-                        metadata['user_description'] = value if value else None
-        
-        LOGGER.info(f"Read metadata from README: {metadata}")
-        return metadata
+            content = f.read()
     except Exception as e:
         LOGGER.warning(f"Error reading metadata from README: {e}")
-        return metadata
+        return _parse_readme("")
+    
+    metadata = _parse_readme(content)
+    LOGGER.debug(f"Read metadata from README: {metadata}")
+    _store_readme_cache(readme_path, stat_result, metadata)
+    
+    return _copy_metadata(metadata)
 
 
 def get_book_folder_path(series_id: int, book_title: str, author_name: str = None) -> Optional[Path]:
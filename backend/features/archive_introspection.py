@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Read page counts, embedded metadata and covers from comic and EPUB archives.
+
+Only the central directory of an archive and the few entries that are
+needed are read, never the whole archive: ComicInfo.xml of comics, the OPF
+package document of EPUBs, and the cover image. CBR files are read with
+the optional `rarfile` package, except for the many CBR files that are
+zip archives in disguise.
+
+This module only uses the standard library, so worker processes can
+import it cheaply.
+"""
+
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.avif', '.jxl')
+
+# Larger entries are not read
+MAX_METADATA_SIZE = 4 * 1024 * 1024
+MAX_COVER_SIZE = 32 * 1024 * 1024
+
+# Simple ComicInfo.xml fields, by the key they are stored under
+COMIC_INFO_FIELDS = {
+    'title': 'Title',
+    'series': 'Series',
+    'number': 'Number',
+    'volume': 'Volume',
+    'count': 'Count',
+    'summary': 'Summary',
+    'writer': 'Writer',
+    'penciller': 'Penciller',
+    'publisher': 'Publisher',
+    'year': 'Year',
+    'month': 'Month',
+    'language': 'LanguageISO',
+    'page_count': 'PageCount',
+    'manga': 'Manga',
+    'genre': 'Genre',
+    'gtin': 'GTIN',
+}
+
+_DIGITS = re.compile(r'(\d+)')
+
+
+def _natural_key(name: str) -> List[Any]:
+    """Sort key that puts page2 before page10."""
+    return [int(part) if part.isdigit() else part.lower() for part in _DIGITS.split(name)]
+
+
+def _local_name(tag: str) -> str:
+    """Strip the namespace of an XML tag."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _open_archive(file_path: str) -> Any:
+    """Open a zip or rar archive.
+
+    Args:
+        file_path (str): The archive.
+
+    Raises:
+        ValueError: If the archive is not a zip archive and can't be read as rar.
+
+    Returns:
+        Any: The archive, a `zipfile.ZipFile` or a `rarfile.RarFile`.
+    """
+    if zipfile.is_zipfile(file_path):
+        return zipfile.ZipFile(file_path)
+    if rarfile is None:
+        raise ValueError("rarfile package not installed. Install with: pip install rarfile")
+    return rarfile.RarFile(file_path)
+
+
+def _entries(archive: Any) -> Dict[str, Any]:
+    """Get the files in an archive by name."""
+    return {
+        info.filename: info for info in archive.infolist()
+        if not info.is_dir()
+    }
+
+
+def _read_entry(archive: Any, info: Any, max_size: int) -> Optional[bytes]:
+    """Read an entry of an archive, unless it is too large."""
+    if info.file_size > max_size:
+        return None
+    with archive.open(info) as f:
+        return f.read(max_size + 1)[:max_size]
+
+
+def _parse_xml(data: bytes) -> Optional[ET.Element]:
+    """Parse an XML document, ignoring broken ones."""
+    try:
+        return ET.fromstring(data)
+    except ET.ParseError:
+        return None
+
+
+def _parse_comic_info(data: bytes) -> Dict[str, Any]:
+    """Get the fields of a ComicInfo.xml document.
+
+    Args:
+        data (bytes): The document.
+
+    Returns:
+        Dict[str, Any]: The fields that are set, and the index of the front
+        cover page under `cover_page` if it is marked.
+    """
+    root = _parse_xml(data)
+    if root is None:
+        return {}
+
+    values = {_local_name(child.tag): (child.text or '').strip() for child in root}
+    info: Dict[str, Any] = {
+        key: values[field] for key, field in COMIC_INFO_FIELDS.items()
+        if values.get(field)
+    }
+
+    for page in root.iter():
+        if _local_name(page.tag) == 'Page' and page.get('Type') == 'FrontCover':
+            image = page.get('Image', '')
+            if image.isdigit():
+                info['cover_page'] = int(image)
+            break
+
+    return info
+
+
+def _introspect_comic(archive: Any) -> Dict[str, Any]:
+    """Read the pages and ComicInfo.xml of a CBZ or CBR archive."""
+    entries = _entries(archive)
+    pages = sorted(
+        (name for name in entries if name.lower().endswith(IMAGE_EXTENSIONS)),
+        key=_natural_key
+    )
+
+    result: Dict[str, Any] = {'page_count': len(pages), 'metadata_format': None, 'metadata': {}}
+
+    comic_info = next(
+        (info for name, info in entries.items()
+         if PurePosixPath(name).name.lower() == 'comicinfo.xml'),
+        None
+    )
+    if comic_info is not None:
+        data = _read_entry(archive, comic_info, MAX_METADATA_SIZE)
+        if data is not None:
+            result['metadata_format'] = 'ComicInfo'
+            result['metadata'] = _parse_comic_info(data)
+
+    cover_page = result['metadata'].pop('cover_page', 0)
+    if pages:
+        cover = pages[cover_page] if cover_page < len(pages) else pages[0]
+        result['cover_entry'] = entries[cover]
+
+    return result
+
+
+def _parse_opf(data: bytes) -> Dict[str, Any]:
+    """Get the metadata and the cover of an OPF package document.
+
+    Args:
+        data (bytes): The document.
+
+    Returns:
+        Dict[str, Any]: The metadata that is set, and the path of the cover
+        image relative to the document under `cover_href`.
+    """
+    root = _parse_xml(data)
+    if root is None:
+        return {}
+
+    info: Dict[str, Any] = {}
+    authors = []
+    meta: Dict[str, str] = {}
+    cover_id = None
+    manifest: Dict[str, Dict[str, str]] = {}
+
+    for element in root.iter():
+        tag = _local_name(element.tag)
+        text = (element.text or '').strip()
+        if tag == 'title' and text:
+            info.setdefault('title', text)
+        elif tag == 'creator' and text:
+            authors.append(text)
+        elif tag in ('publisher', 'language', 'description') and text:
+            info.setdefault(tag, text)
+        elif tag == 'date' and text:
+            info.setdefault('published', text)
+        elif tag == 'identifier' and text:
+            info.setdefault('identifiers', []).append(text)
+        elif tag == 'meta':
+            name = element.get('name')
+            if name == 'cover':
+                cover_id = element.get('content')
+            elif name:
+                meta[name] = element.get('content', '')
+            elif element.get('property') and text:
+                meta[element.get('property', '')] = text
+        elif tag == 'item':
+            manifest[element.get('id', '')] = {
+                'href': element.get('href', ''),
+                'properties': element.get('properties', '')
+            }
+
+    if authors:
+        info['authors'] = authors
+    if meta.get('calibre:series') or meta.get('belongs-to-collection'):
+        info['series'] = meta.get('calibre:series') or meta.get('belongs-to-collection')
+    if meta.get('calibre:series_index') or meta.get('group-position'):
+        info['number'] = meta.get('calibre:series_index') or meta.get('group-position')
+
+    cover = next(
+        (item for item in manifest.values() if 'cover-image' in item['properties'].split()),
+        manifest.get(cover_id or '')
+    )
+    if cover and cover['href']:
+        info['cover_href'] = cover['href']
+
+    return info
+
+
+def _introspect_epub(archive: Any) -> Dict[str, Any]:
+    """Read the OPF metadata and the cover of an EPUB archive."""
+    entries = _entries(archive)
+    result: Dict[str, Any] = {'page_count': None, 'metadata_format': None, 'metadata': {}}
+
+    opf_path = None
+    container = entries.get('META-INF/container.xml')
+    if container is not None:
+        root = _parse_xml(_read_entry(archive, container, MAX_METADATA_SIZE) or b'')
+        if root is not None:
+            opf_path = next(
+                (element.get('full-path') for element in root.iter()
+                 if _local_name(element.tag) == 'rootfile'),
+                None
+            )
+    if opf_path is None:
+        opf_path = next((name for name in entries if name.lower().endswith('.opf')), None)
+    if opf_path is None or opf_path not in entries:
+        return result
+
+    data = _read_entry(archive, entries[opf_path], MAX_METADATA_SIZE)
+    if data is None:
+        return result
+
+    result['metadata_format'] = 'OPF'
+    result['metadata'] = _parse_opf(data)
+
+    cover_href = result['metadata'].pop('cover_href', None)
+    if cover_href:
+        # Paths in the OPF are relative to it and URL encoded
+        cover_path = posixpath.normpath(
+            posixpath.join(posixpath.dirname(opf_path), unquote(cover_href))
+        )
+        if cover_path in entries:
+            result['cover_entry'] = entries[cover_path]
+
+    return result
+
+
+def introspect_archive(file_path: str, file_type: str, cover_target: Optional[str] = None) -> Dict[str, Any]:
+    """Read the page count, embedded metadata and cover of an archive.
+
+    Args:
+        file_path (str): The archive.
+        file_type (str): The file type: CBZ, CBR or EPUB.
+        cover_target (Optional[str], optional): Where to save the cover,
+            without extension. The extension of the image inside the archive
+            is added. Defaults to None, which doesn't save the cover.
+
+    Returns:
+        Dict[str, Any]: The `page_count`, the `metadata_format` (ComicInfo,
+        OPF or None), the `metadata`, the path of the saved cover under
+        `cover_path` and an `error` if the archive can't be read.
+    """
+    result: Dict[str, Any] = {
+        'page_count': None,
+        'metadata_format': None,
+        'metadata': {},
+        'cover_path': None,
+        'error': None
+    }
+
+    try:
+        with _open_archive(file_path) as archive:
+            if file_type == 'EPUB':
+                found = _introspect_epub(archive)
+            else:
+                found = _introspect_comic(archive)
+
+            cover_entry = found.pop('cover_entry', None)
+            result.update(found)
+
+            if cover_target is not None and cover_entry is not None:
+                data = _read_entry(archive, cover_entry, MAX_COVER_SIZE)
+                if data is not None:
+                    extension = PurePosixPath(cover_entry.filename).suffix.lower() or '.jpg'
+                    cover_path = cover_target + extension
+                    os.makedirs(os.path.dirname(cover_path), exist_ok=True)
+                    with open(cover_path, 'wb') as f:
+                        f.write(data)
+                    result['cover_path'] = cover_path
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+
+    return result
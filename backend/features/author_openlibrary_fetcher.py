@@ -10,6 +10,7 @@ Fetches author information including biography, birth date, and photos.
 import requests
 import json
 from typing import Optional, Dict, Any
+from backend.internals import http_client
 from backend.base.logging import LOGGER
 from backend.internals.db import execute_query
 
@@ -32,7 +33,7 @@ def fetch_author_from_openlibrary(author_name: str) -> Optional[Dict[str, Any]]:
             "limit": 1
         }
         
-        response = requests.get(search_url, params=params, timeout=5)
+        response = http_client.get(search_url, params=params, timeout=5)
         response.raise_for_status()
         
         data = response.json()
@@ -196,7 +197,7 @@ def get_book_cover_from_openlibrary(book_title: str, author_name: str) -> Option
             "fields": "cover_i,title,author_name,key"  # Only get needed fields
         }
         
-        response = requests.get(search_url, params=params, timeout=5)
+        response = http_client.get(search_url, params=params, timeout=5)
         response.raise_for_status()
         
         data = response.json()
@@ -412,7 +413,7 @@ def get_author_popular_books_openlibrary(author_id: int, author_name: str) -> li
         params = {"limit": 10}  # Get up to 10 works
         LOGGER.info(f"Fetching works from: {works_url}")
         
-        response = requests.get(works_url, params=params, timeout=5)
+        response = http_client.get(works_url, params=params, timeout=5)
         response.raise_for_status()
         
         works_data = response.json()
@@ -6,6 +6,7 @@ Author photo fetcher - fetches author photos from OpenLibrary and other sources.
 """
 
 import requests
+from backend.internals import http_client
 from backend.base.logging import LOGGER
 from backend.internals.db import execute_query
 
@@ -30,7 +31,7 @@ def fetch_author_photo_from_openlibrary(author_name: str) -> str:
             "limit": 1
         }
         
-        response = requests.get(search_url, params=params, timeout=5)
+        response = http_client.get(search_url, params=params, timeout=5)
         response.raise_for_status()
         
         data = response.json()
@@ -205,11 +205,11 @@ def _enrich_author_metadata(author_id: int, author_name: str) -> bool:
                 
                 # Try to fetch released books count from OpenLibrary even if other data failed
                 try:
-                    import requests
+                    from backend.internals import http_client
                     from backend.features.metadata_providers.openlibrary.provider import OpenLibraryProvider
                     provider = OpenLibraryProvider()
                     search_url = f"{provider.base_url}/search/authors.json"
-                    response = requests.get(search_url, params={"q": author_name}, timeout=5)
+                    response = http_client.get(search_url, params={"q": author_name}, timeout=5)
                     
                     if response.ok:
                         data = response.json()
@@ -220,7 +220,7 @@ class BookService(ContentServiceBase):
                     if author_id:
                         # Create book-author relationship
                         execute_query("""
-                            INSERT INTO author_books (series_id, author_id)
+                            INSERT OR IGNORE INTO author_books (series_id, author_id)
                             VALUES (?, ?)
                         """, (series_id, author_id), commit=True)
                     
@@ -5,9 +5,18 @@
 Calendar package for Readloom.
 """
 
-from .calendar import update_calendar, get_calendar_events
+from .calendar import update_calendar, get_calendar_events, iter_calendar_events
+from .view_cache import VIEW_CACHE, get_calendar_version, make_etag
+from .ical import FeedFilter, open_feed_file, iter_ical_lines
 
 __all__ = [
     "update_calendar",
     "get_calendar_events",
+    "iter_calendar_events",
+    "VIEW_CACHE",
+    "get_calendar_version",
+    "make_etag",
+    "FeedFilter",
+    "open_feed_file",
+    "iter_ical_lines",
 ]
@@ -5,328 +5,232 @@
 Calendar management functions.
 """
 
+import heapq
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Union
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 from backend.base.definitions import ReleaseStatus
 from backend.base.logging import LOGGER
-from backend.internals.db import execute_query
+from backend.features.release_schedules import iter_scheduled_releases
+from backend.internals.db import execute_query, iter_query, transaction
 from backend.internals.settings import Settings
 
 
+# Volumes and chapters: table, event column, number column, event type and label
+_RELEASE_KINDS = (
+    ('volume', 'volumes', 'volume_id', 'volume_number', 'VOLUME_RELEASE', 'Volume'),
+    ('chapter', 'chapters', 'chapter_id', 'chapter_number', 'CHAPTER_RELEASE', 'Chapter'),
+)
+
+
+def _upcoming_range(range_days: int) -> Tuple[str, str]:
+    """Get the upcoming range of the calendar.
+
+    Args:
+        range_days (int): The number of days after today in the range.
+
+    Returns:
+        Tuple[str, str]: Today and the day after the range, as ISO dates.
+        Release dates are compared as text, so `2024-05-01T10:00` falls
+        between `2024-05-01` and `2024-05-02`.
+    """
+    today = date.today()
+    return today.isoformat(), (today + timedelta(days=range_days + 1)).isoformat()
+
+
+def _refresh_events(
+    item_scope: str,
+    event_scope: Optional[str],
+    params: Tuple,
+    upcoming: Tuple[str, str]
+) -> Tuple[int, int]:
+    """Bring the calendar events of some volumes and chapters up to date.
+
+    Events whose volume or chapter has another release date now are
+    removed. Events are added for the releases that belong in the calendar:
+    all releases of AniList series, and the upcoming releases of other
+    series. The title of existing events is updated when it changed.
+
+    Args:
+        item_scope (str): SQL condition on the volumes or chapters `i`.
+        event_scope (Optional[str]): SQL condition on the calendar events
+            to check for removed releases, or None to only add events.
+        params (Tuple): The parameters of both conditions.
+        upcoming (Tuple[str, str]): The upcoming range, from `_upcoming_range()`.
+
+    Returns:
+        Tuple[int, int]: The number of events removed and added or updated.
+    """
+    removed = added = 0
+    for kind, table, column, number_column, event_type, label in _RELEASE_KINDS:
+        # In both conditions, {kind} is 'volume' or 'chapter' and {column}
+        # the matching column of calendar_events
+        names = {'kind': kind, 'column': column}
+        
+        if event_scope is not None:
+            execute_query(f"""
+                DELETE FROM calendar_events
+                WHERE {column} IS NOT NULL AND ({event_scope.format(**names)})
+                AND NOT EXISTS (
+                    SELECT 1 FROM {table} i
+                    WHERE i.id = calendar_events.{column}
+                    AND i.series_id = calendar_events.series_id
+                    AND i.release_date = calendar_events.event_date
+                )
+            """, params)
+            removed += execute_query("SELECT changes() AS count")[0]['count']
+
+        # The partial UNIQUE indexes on calendar_events make this an upsert
+        execute_query(f"""
+            INSERT INTO calendar_events (series_id, {column}, title, description, event_date, event_type)
+            SELECT
+                i.series_id,
+                i.id,
+                '{label} ' || i.{number_column} || ' - ' || s.title,
+                'Release of {kind} ' || i.{number_column} || COALESCE(': ' || i.title, ''),
+                i.release_date,
+                '{event_type}'
+            FROM {table} i
+            JOIN series s ON s.id = i.series_id
+            WHERE ({item_scope.format(**names)})
+            AND date(i.release_date) IS NOT NULL
+            AND (s.metadata_source = 'AniList' OR (i.release_date >= ? AND i.release_date < ?))
+            ON CONFLICT (series_id, {column}, event_date) WHERE {column} IS NOT NULL
+            DO UPDATE SET
+                title = excluded.title,
+                description = excluded.description,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE title IS NOT excluded.title OR description IS NOT excluded.description
+        """, params + upcoming)
+        added += execute_query("SELECT changes() AS count")[0]['count']
+
+    return removed, added
+
+
 def update_calendar(series_id: Optional[int] = None) -> None:
     """Update the calendar with upcoming releases.
     
+    Only the volumes and chapters that changed since the last update, as
+    recorded in calendar_changes, and the releases that moved into the
+    upcoming range are looked at. Every step is a single statement.
+    
     Args:
         series_id: Optional series ID to update only one specific series.
                   If None, updates all series in the collection.
     """
     try:
         settings = Settings().get_settings()
+        upcoming = _upcoming_range(settings.calendar_range_days)
         
-        # Get either a specific series or all series that we're tracking
-        if series_id is not None:
-            series_list = execute_query("SELECT id, title FROM series WHERE id = ?", (series_id,))
-            LOGGER.info(f"Updating calendar for specific series ID: {series_id}")
-        else:
-            series_list = execute_query("SELECT id, title FROM series")
-            LOGGER.info(f"Updating calendar for all {len(series_list)} series")
-        
-        # If updating a specific series, first remove its existing calendar entries
-        if series_id is not None:
-            execute_query(
-                "DELETE FROM calendar_events WHERE series_id = ?",
-                (series_id,),
-                commit=True
-            )
-            LOGGER.info(f"Cleared existing calendar events for series ID: {series_id}")
-        
-        for series in series_list:
-            series_id = series["id"]
-            
-            # Check for upcoming volume releases
-            volumes = execute_query(
-                """
-                SELECT id, volume_number, title, release_date,
-                       (SELECT metadata_source FROM series WHERE id = ?) as provider 
-                FROM volumes 
-                WHERE series_id = ? AND release_date IS NOT NULL
-                """,
-                (series_id, series_id)
-            )
-            
-            for volume in volumes:
-                try:
-                    release_date = datetime.fromisoformat(volume["release_date"])
-                    
-                    # Check if this is from AniList (which needs special handling)
-                    provider = volume.get('provider', '')
-                    is_anilist = provider == 'AniList'
-                    
-                    # For normal providers, only include upcoming releases
-                    now = datetime.now()
-                    upcoming_days = settings.calendar_range_days  # Use the calendar range from settings
-                    
-                    # Include all AniList volumes or only upcoming ones for other providers
-                    is_valid_for_calendar = is_anilist or (release_date >= now and release_date <= now + timedelta(days=upcoming_days))
-                    
-                    # If it's a valid entry for the calendar, add it
-                    if is_valid_for_calendar:
-                        # Check if this event already exists
-                        existing = execute_query(
-                            """
-                            SELECT id FROM calendar_events 
-                            WHERE series_id = ? AND volume_id = ? AND event_date = ?
-                            """,
-                            (series_id, volume["id"], volume["release_date"])
-                        )
-                        
-                        if not existing:
-                            # Create new calendar event
-                            execute_query(
-                                """
-                                INSERT INTO calendar_events 
-                                (series_id, volume_id, title, description, event_date, event_type) 
-                                VALUES (?, ?, ?, ?, ?, ?)
-                                """,
-                                (
-                                    series_id,
-                                    volume["id"],
-                                    f"Volume {volume['volume_number']} - {series['title']}",
-                                    f"Release of volume {volume['volume_number']}: {volume['title']}",
-                                    volume["release_date"],
-                                    "VOLUME_RELEASE"
-                                ),
-                                commit=True
-                            )
-                except (ValueError, TypeError):
-                    # Skip invalid dates
-                    continue
-            
-            # Check for all chapter releases with dates
-            chapters = execute_query(
-                """
-                SELECT id, chapter_number, title, release_date, 
-                       (SELECT metadata_source FROM series WHERE id = ?) as provider
-                FROM chapters 
-                WHERE series_id = ? AND release_date IS NOT NULL
-                """,
-                (series_id, series_id)
-            )
-            
-            for chapter in chapters:
-                try:
-                    # Debug logging
-                    LOGGER.info(f"Processing chapter: {chapter.get('id')} - {chapter.get('chapter_number')} - {chapter.get('title')} - Date: {chapter.get('release_date')}")
-                    
-                    # Check if release_date is valid
-                    if not chapter.get("release_date"):
-                        LOGGER.warning(f"Missing release date for chapter {chapter.get('chapter_number')} in series {series_id}")
-                        continue
-                    
-                    try:
-                        release_date = datetime.fromisoformat(chapter["release_date"])
-                    except ValueError:
-                        LOGGER.warning(f"Invalid date format for chapter {chapter.get('chapter_number')}: {chapter.get('release_date')}")
-                        continue
-                    
-                    # Check if this is from AniList (which needs special handling)
-                    provider = chapter.get('provider', '')
-                    is_anilist = provider == 'AniList'
-                    
-                    # For normal providers, only include upcoming releases
-                    now = datetime.now()
-                    upcoming_days = settings.calendar_range_days  # Use the calendar range from settings
-                    
-                    # Include all AniList chapters or only upcoming ones for other providers
-                    is_valid_for_calendar = is_anilist or (release_date >= now and release_date <= now + timedelta(days=upcoming_days))
-                    
-                    # If it's a valid entry for the calendar, add it
-                    if is_valid_for_calendar:
-                        # Check if this event already exists
-                        existing = execute_query(
-                            """
-                            SELECT id FROM calendar_events 
-                            WHERE series_id = ? AND chapter_id = ? AND event_date = ?
-                            """,
-                            (series_id, chapter["id"], chapter["release_date"])
-                        )
-                        
-                        if not existing:
-                            # Create new calendar event
-                            event_title = f"Chapter {chapter['chapter_number']} - {series['title']}"
-                            event_desc = f"Release of chapter {chapter['chapter_number']}: {chapter['title']}"
-                            
-                            LOGGER.info(f"Adding calendar event: {event_title} on {chapter['release_date']}")
-                            
-                            execute_query(
-                                """
-                                INSERT INTO calendar_events 
-                                (series_id, chapter_id, title, description, event_date, event_type) 
-                                VALUES (?, ?, ?, ?, ?, ?)
-                                """,
-                                (
-                                    series_id,
-                                    chapter["id"],
-                                    event_title,
-                                    event_desc,
-                                    chapter["release_date"],
-                                    "CHAPTER_RELEASE"
-                                ),
-                                commit=True
-                            )
-                except (ValueError, TypeError):
-                    # Skip invalid dates
-                    continue
-        
-        # For AniList series, ensure volumes AND chapters are included in the calendar
-        # This helps ensure our volume date distribution logic takes effect
-        if series_id is not None:
-            # If we're updating a specific series, check if it's from AniList
-            specific_series = execute_query(
-                "SELECT id, title, metadata_source FROM series WHERE id = ?",
-                (series_id,)
-            )
-            
-            if specific_series and specific_series[0].get('metadata_source') == 'AniList':
-                # Process only this specific AniList series
-                anilist_series = [{'id': series_id, 'title': specific_series[0].get('title')}]
+        with transaction():
+            if series_id is not None:
+                LOGGER.info(f"Updating calendar for specific series ID: {series_id}")
+                removed, added = _refresh_events("i.series_id = ?", "series_id = ?", (series_id,), upcoming)
             else:
-                # Not an AniList series, skip AniList-specific processing
-                anilist_series = []
-        else:
-            # Processing all series, get all AniList series
-            anilist_series = execute_query(
-                "SELECT id, title FROM series WHERE metadata_source = 'AniList'"
-            )
-        
-        # Process AniList volumes and chapters
-        for series in anilist_series:
-            series_id = series['id']
-            series_title = series.get('title')
-            
-            LOGGER.info(f"Special processing for AniList series: {series_title}")
-            
-            # Get volumes for this series
-            volumes = execute_query(
-                """
-                SELECT id, volume_number, title, release_date
-                FROM volumes 
-                WHERE series_id = ? AND release_date IS NOT NULL
-                """,
-                (series_id,)
-            )
-            
-            # Re-add all volumes to calendar
-            for volume in volumes:
-                try:
-                    release_date = datetime.fromisoformat(volume["release_date"])
-                    
-                    # Check if this event already exists
-                    existing = execute_query(
-                        """
-                        SELECT id FROM calendar_events 
-                        WHERE series_id = ? AND volume_id = ? AND event_date = ?
-                        """,
-                        (series_id, volume["id"], volume["release_date"])
-                    )
-                    
-                    if not existing:
-                        # Always include AniList volumes
-                        execute_query(
-                            """
-                            INSERT INTO calendar_events 
-                            (series_id, volume_id, title, description, event_date, event_type) 
-                            VALUES (?, ?, ?, ?, ?, ?)
-                            """,
-                            (
-                                series_id,
-                                volume["id"],
-                                f"Volume {volume['volume_number']} - {series_title}",
-                                f"Release of volume {volume['volume_number']}: {volume['title']}",
-                                volume["release_date"],
-                                "VOLUME_RELEASE"
-                            ),
-                            commit=True
-                        )
-                        LOGGER.info(f"Added AniList volume {volume['volume_number']} for {series_title} to calendar")
-                except (ValueError, TypeError) as e:
-                    LOGGER.warning(f"Skipped AniList volume due to date error: {e}")
-            
-            # Also add all chapters for AniList series to the calendar
-            chapters = execute_query(
-                """
-                SELECT id, chapter_number, title, release_date
-                FROM chapters 
-                WHERE series_id = ? AND release_date IS NOT NULL
-                """,
-                (series_id,)
-            )
-            
-            for chapter in chapters:
-                try:
-                    release_date = datetime.fromisoformat(chapter["release_date"])
-                    
-                    # Check if this event already exists
-                    existing = execute_query(
-                        """
-                        SELECT id FROM calendar_events 
-                        WHERE series_id = ? AND chapter_id = ? AND event_date = ?
-                        """,
-                        (series_id, chapter["id"], chapter["release_date"])
-                    )
-                    
-                    if not existing:
-                        # Always include AniList chapters
-                        execute_query(
-                            """
-                            INSERT INTO calendar_events 
-                            (series_id, chapter_id, title, description, event_date, event_type) 
-                            VALUES (?, ?, ?, ?, ?, ?)
-                            """,
-                            (
-                                series_id,
-                                chapter["id"],
-                                f"Chapter {chapter['chapter_number']} - {series_title}",
-                                f"Release of chapter {chapter['chapter_number']}: {chapter['title']}",
-                                chapter["release_date"],
-                                "CHAPTER_RELEASE"
-                            ),
-                            commit=True
-                        )
-                        LOGGER.info(f"Added AniList chapter {chapter['chapter_number']} for {series_title} to calendar")
-                except (ValueError, TypeError) as e:
-                    LOGGER.warning(f"Skipped AniList chapter due to date error: {e}")
+                LOGGER.info("Updating calendar for the changed volumes and chapters")
+                
+                # The changed volumes and chapters, and everything of changed series
+                removed, added = _refresh_events(
+                    "i.id IN (SELECT item_id FROM calendar_changes WHERE item_type = '{kind}') "
+                    "OR i.series_id IN (SELECT item_id FROM calendar_changes WHERE item_type = 'series')",
+                    "{column} IN (SELECT item_id FROM calendar_changes WHERE item_type = '{kind}') "
+                    "OR series_id IN (SELECT item_id FROM calendar_changes WHERE item_type = 'series')",
+                    (),
+                    upcoming
+                )
+                
+                # Releases that moved into the upcoming range since the last update
+                _, upcoming_added = _refresh_events(
+                    "i.release_date >= ? AND i.release_date < ?", None, upcoming, upcoming
+                )
+                added += upcoming_added
+                
+                execute_query("DELETE FROM calendar_changes")
         
-        # Comment out cleanup to keep all events for testing
-        # execute_query(
-        #     """
-        #     DELETE FROM calendar_events 
-        #     WHERE event_date < date('now', '-7 days')
-        #     """,
-        #     commit=True
-        # )
-        
-        LOGGER.info("Calendar updated successfully")
+        LOGGER.info(f"Calendar updated successfully: {added} events added or updated, {removed} removed")
     except Exception as e:
         LOGGER.error(f"Error updating calendar: {e}")
 
 
-def get_calendar_events(
+def _iter_scheduled_events(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    series_id: Optional[int]
+) -> Iterator[Dict]:
+    """Yield the releases of the release schedules as calendar events."""
+    series_filter, params = ("AND s.id = ?", (series_id,)) if series_id else ("", ())
+    for release in iter_scheduled_releases(start_date, end_date, series_filter, params):
+        number = release["chapter_number"]
+        yield {
+            "id": f"schedule-{release['schedule_id']}-{number}",
+            "title": f"Chapter {number} - {release['series_title']}",
+            "description": f"Release of chapter {number}: Chapter {number}",
+            "date": release["release_date"],
+            "type": "CHAPTER_RELEASE",
+            "series": {
+                "id": release["series_id"],
+                "title": release["series_title"],
+                "cover_url": release["series_cover_url"]
+            },
+            "chapter": {
+                "id": None,
+                "number": number,
+                "title": f"Chapter {number}"
+            }
+        }
+
+
+def _iter_stored_events(query: str, params: Tuple) -> Iterator[Dict]:
+    """Yield the rows of calendar_events, formatted for the frontend."""
+    for event in iter_query(query, params, as_dict=False):
+        formatted_event = {
+            "id": event["id"],
+            "title": event["title"],
+            "description": event["description"],
+            "date": event["event_date"],
+            "type": event["event_type"],
+            "series": {
+                "id": event["series_id"],
+                "title": event["series_title"],
+                "cover_url": event["series_cover_url"]
+            }
+        }
+        
+        if event["volume_id"]:
+            formatted_event["volume"] = {
+                "id": event["volume_id"],
+                "number": event["volume_number"],
+                "title": event["volume_title"]
+            }
+        
+        if event["chapter_id"]:
+            formatted_event["chapter"] = {
+                "id": event["chapter_id"],
+                "number": event["chapter_number"],
+                "title": event["chapter_title"]
+            }
+        
+        yield formatted_event
+
+
+def iter_calendar_events(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     series_id: Optional[int] = None
-) -> List[Dict]:
-    """Get calendar events.
+) -> Iterator[Dict]:
+    """Yield calendar events one by one, formatted for the frontend.
+
+    The releases of the release schedules in the range are merged in by
+    date. They have no row in calendar_events, so their ID is a string.
 
     Args:
         start_date: The start date in ISO format.
         end_date: The end date in ISO format.
         series_id: The series ID to filter by.
 
-    Returns:
-        List[Dict]: The calendar events.
+    Yields:
+        Dict: The calendar events.
     """
     query = """
     SELECT 
@@ -356,38 +260,26 @@ def get_calendar_events(
     
     query += " ORDER BY ce.event_date ASC"
     
-    events = execute_query(query, tuple(params))
-    
-    # Format the events for the frontend
-    formatted_events = []
-    for event in events:
-        formatted_event = {
-            "id": event["id"],
-            "title": event["title"],
-            "description": event["description"],
-            "date": event["event_date"],
-            "type": event["event_type"],
-            "series": {
-                "id": event["series_id"],
-                "title": event["series_title"],
-                "cover_url": event["series_cover_url"]
-            }
-        }
-        
-        if event["volume_id"]:
-            formatted_event["volume"] = {
-                "id": event["volume_id"],
-                "number": event["volume_number"],
-                "title": event["volume_title"]
-            }
-        
-        if event["chapter_id"]:
-            formatted_event["chapter"] = {
-                "id": event["chapter_id"],
-                "number": event["chapter_number"],
-                "title": event["chapter_title"]
-            }
-        
-        formatted_events.append(formatted_event)
-    
-    return formatted_events
+    yield from heapq.merge(
+        _iter_stored_events(query, tuple(params)),
+        _iter_scheduled_events(start_date, end_date, series_id),
+        key=lambda event: event["date"]
+    )
+
+
+def get_calendar_events(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    series_id: Optional[int] = None
+) -> List[Dict]:
+    """Get calendar events.
+
+    Args:
+        start_date: The start date in ISO format.
+        end_date: The end date in ISO format.
+        series_id: The series ID to filter by.
+
+    Returns:
+        List[Dict]: The calendar events.
+    """
+    return list(iter_calendar_events(start_date, end_date, series_id))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+iCalendar feeds of the release calendar.
+
+A feed holds the releases of the whole library, or of a collection or a
+content type, from a month ago on. It is written line by line from the
+calendar events and the release schedules to a file in the data folder,
+and only written again when the calendar version changes or a day
+passes. Calendar apps that poll the feed are served the file, or a 304
+response when they already have it.
+"""
+
+import hashlib
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Tuple
+
+from backend.base.helpers import get_data_dir
+from backend.base.logging import LOGGER
+from backend.features.release_schedules import iter_scheduled_releases
+from backend.internals.db import iter_query
+from .view_cache import CalendarVersion
+
+# Where the feeds are saved, relative to the data directory
+FEEDS_FOLDER = Path("cache") / "calendar_feeds"
+
+# Days before today that are in a feed
+FEED_PAST_DAYS = 30
+
+PRODID = "-//Readloom//Release Calendar//EN"
+
+# Longest line in octets, without the line break
+LINE_LIMIT = 75
+
+_LOCKS_LOCK = threading.Lock()
+_FEED_LOCKS: Dict[str, threading.Lock] = {}
+
+
+class FeedFilter(NamedTuple):
+    """The releases in a feed. Without filters, the whole library."""
+    collection_id: Optional[int] = None
+    content_type: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        parts = ["Readloom"]
+        if self.content_type:
+            parts.append(self.content_type.title())
+        if self.collection_id:
+            parts.append(f"Collection {self.collection_id}")
+        return " - ".join(parts)
+
+    @property
+    def key(self) -> str:
+        return hashlib.blake2b(repr(tuple(self)).encode(), digest_size=8).hexdigest()
+
+
+def _escape(text: str) -> str:
+    """Escape a TEXT value."""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Fold a content line into lines of at most 75 octets, with line breaks."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= LINE_LIMIT:
+        return line + "\r\n"
+
+    parts = []
+    start = 0
+    limit = LINE_LIMIT
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Don't split UTF-8 sequences
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start = end
+        # Continuation lines start with a space
+        limit = LINE_LIMIT - 1
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _series_filter(feed: FeedFilter) -> Tuple[str, Tuple]:
+    """Get the SQL condition on the series `s` of a feed, starting with AND."""
+    conditions = ""
+    params: Tuple = ()
+    if feed.content_type:
+        conditions += " AND s.content_type = ?"
+        params += (feed.content_type,)
+    if feed.collection_id:
+        conditions += " AND s.id IN (SELECT series_id FROM series_collections WHERE collection_id = ?)"
+        params += (feed.collection_id,)
+    return conditions, params
+
+
+def _iter_releases(feed: FeedFilter, start_date: str) -> Iterator[Tuple[str, str, str, str]]:
+    """Yield the UID, date, summary and description of the releases of a feed.
+
+    The calendar events come first, then the releases of the release
+    schedules. Calendar apps don't need the events in order.
+    """
+    series_filter, params = _series_filter(feed)
+
+    for event in iter_query(f"""
+        SELECT ce.id, ce.title, ce.description, ce.event_date
+        FROM calendar_events ce
+        JOIN series s ON s.id = ce.series_id
+        WHERE ce.event_date >= ? {series_filter}
+        ORDER BY ce.event_date
+    """, (start_date,) + params):
+        yield f"event-{event['id']}", event['event_date'], event['title'], event['description'] or ""
+
+    for release in iter_scheduled_releases(start_date, None, series_filter, params):
+        number = release['chapter_number']
+        yield (
+            f"schedule-{release['schedule_id']}-{number}",
+            release['release_date'],
+            f"Chapter {number} - {release['series_title']}",
+            f"Release of chapter {number}: Chapter {number}"
+        )
+
+
+def iter_ical_lines(feed: FeedFilter, version: Optional[CalendarVersion] = None) -> Iterator[str]:
+    """Yield the lines of the iCalendar feed.
+
+    Args:
+        feed (FeedFilter): The releases in the feed.
+        version (Optional[CalendarVersion], optional): The calendar version,
+            for the time stamp of the events. Defaults to None.
+
+    Yields:
+        str: The folded lines, with line breaks.
+    """
+    stamp = (version.changed_at if version else datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+    start_date = (date.today() - timedelta(days=FEED_PAST_DAYS)).isoformat()
+
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield f"PRODID:{PRODID}\r\n"
+    yield "CALSCALE:GREGORIAN\r\n"
+    yield _fold(f"X-WR-CALNAME:{_escape(feed.name)}")
+
+    for uid, event_date, summary, description in _iter_releases(feed, start_date):
+        try:
+            day = date.fromisoformat(event_date[:10])
+        except (TypeError, ValueError):
+            continue
+        yield "BEGIN:VEVENT\r\n"
+        yield _fold(f"UID:{uid}@readloom")
+        yield f"DTSTAMP:{stamp}\r\n"
+        yield f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}\r\n"
+        yield f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}\r\n"
+        yield _fold(f"SUMMARY:{_escape(summary)}")
+        if description:
+            yield _fold(f"DESCRIPTION:{_escape(description)}")
+        yield "TRANSP:TRANSPARENT\r\n"
+        yield "END:VEVENT\r\n"
+
+    yield "END:VCALENDAR\r\n"
+
+
+def _feed_lock(key: str) -> threading.Lock:
+    """Get the lock that makes one thread at a time write a feed."""
+    with _LOCKS_LOCK:
+        return _FEED_LOCKS.setdefault(key, threading.Lock())
+
+
+def open_feed_file(feed: FeedFilter, version: CalendarVersion) -> BinaryIO:
+    """Open the file of a feed, writing it if it is outdated.
+
+    The file is opened before the lock is released, so it can be read even
+    when another request replaces the feed and removes this file right after.
+
+    Args:
+        feed (FeedFilter): The releases in the feed.
+        version (CalendarVersion): The current calendar version.
+
+    Returns:
+        BinaryIO: The file of the feed, opened for reading. The caller
+        closes it.
+    """
+    folder = get_data_dir() / FEEDS_FOLDER
+    # The feed starts a fixed number of days ago, so it changes every day
+    path = folder / f"feed-{feed.key}-{version.version}-{date.today().isoformat()}.ics"
+
+    with _feed_lock(feed.key):
+        if path.exists():
+            return open(path, "rb")
+
+        folder.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8", newline="") as f:
+            f.writelines(iter_ical_lines(feed, version))
+        os.replace(temp_path, path)
+        LOGGER.info(f"Wrote calendar feed {path.name}")
+        feed_file = open(path, "rb")
+
+        for old_path in folder.glob(f"feed-{feed.key}-*.ics"):
+            if old_path != path:
+                try:
+                    old_path.unlink()
+                except OSError as e:
+                    # E.g. on Windows while it is still being sent, it is
+                    # removed when the feed is written again
+                    LOGGER.warning(f"Could not remove old calendar feed {old_path}: {e}")
+
+    return feed_file
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache of calendar views, validated by the version of the calendar data.
+
+Database triggers increase the calendar version whenever the data the
+calendar is built from changes. A calendar view, e.g. a month or a week
+with filters, is cached with the version it was built at and is only used
+while the version is the same. The version also makes up the ETag of the
+view, so clients that already have the current view get a 304 response.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Hashable, NamedTuple, Optional
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+# Most views kept in the cache
+CACHE_SIZE = 64
+
+
+class CalendarVersion(NamedTuple):
+    version: int
+    # When the calendar data last changed, in UTC
+    changed_at: datetime
+
+
+def get_calendar_version() -> Optional[CalendarVersion]:
+    """Get the current version of the calendar data.
+
+    Returns:
+        Optional[CalendarVersion]: The version, or None if it is not tracked,
+        in which case nothing may be cached.
+    """
+    try:
+        rows = execute_query("SELECT version, changed_at FROM calendar_version WHERE id = 1")
+    except Exception as e:
+        LOGGER.warning(f"Could not get the calendar version: {e}")
+        return None
+
+    if not rows:
+        return None
+
+    changed_at = datetime.strptime(rows[0]['changed_at'], "%Y-%m-%d %H:%M:%S")
+    return CalendarVersion(rows[0]['version'], changed_at.replace(tzinfo=timezone.utc))
+
+
+def make_etag(key: Hashable, version: int) -> str:
+    """Get the ETag of a calendar view.
+
+    Args:
+        key (Hashable): The key of the view, e.g. the range and filters.
+        version (int): The calendar version.
+
+    Returns:
+        str: The ETag, without quotes.
+    """
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    return f"calendar-{version}-{digest}"
+
+
+class _CachedView(NamedTuple):
+    version: int
+    view: bytes
+
+
+class CalendarViewCache:
+    """LRU cache of rendered calendar views."""
+
+    def __init__(self, size: int = CACHE_SIZE) -> None:
+        self.size = size
+        self._views: "OrderedDict[Hashable, _CachedView]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[bytes]:
+        """Get a view, if it was built at the given version.
+
+        Args:
+            key (Hashable): The key of the view.
+            version (int): The current calendar version.
+
+        Returns:
+            Optional[bytes]: The view, or None if it is not cached or outdated.
+        """
+        with self._lock:
+            cached = self._views.get(key)
+            if cached is None or cached.version != version:
+                return None
+            self._views.move_to_end(key)
+            return cached.view
+
+    def put(self, key: Hashable, version: int, view: bytes) -> None:
+        """Store a view.
+
+        Args:
+            key (Hashable): The key of the view.
+            version (int): The calendar version the view was built at.
+            view (bytes): The view.
+        """
+        with self._lock:
+            self._views[key] = _CachedView(version, view)
+            self._views.move_to_end(key)
+            while len(self._views) > self.size:
+                self._views.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all views."""
+        with self._lock:
+            self._views.clear()
+
+
+VIEW_CACHE = CalendarViewCache()
@@ -8,7 +8,7 @@ Provides functions for managing manga collection tracking.
 
 from .schema import setup_collection_tables
 from .stats import get_collection_stats, update_collection_stats
-from .queries import get_collection_items, export_collection
+from .queries import get_collection_items, export_collection, iter_collection_export
 from .mutations import (
     add_to_collection,
     remove_from_collection,
@@ -46,6 +46,7 @@ __all__ = [
     # Queries
     "get_collection_items",
     "export_collection",
+    "iter_collection_export",
     
     # Mutations
     "add_to_collection",
@@ -9,7 +9,7 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 
 from backend.base.logging import LOGGER
-from backend.internals.db import execute_query
+from backend.internals.db import execute_query, transaction
 from .stats import update_collection_stats
 
 
@@ -29,7 +29,8 @@ def add_to_collection(
     purchase_price: Optional[float] = None,
     purchase_location: Optional[str] = None,
     notes: Optional[str] = None,
-    custom_tags: Optional[str] = None
+    custom_tags: Optional[str] = None,
+    update_stats: bool = True
 ) -> int:
     """Add an item to the collection.
     
@@ -47,6 +48,8 @@ def add_to_collection(
         purchase_location: The purchase location.
         notes: Notes about the item.
         custom_tags: Custom tags.
+        update_stats: Whether to recalculate the collection stats. Bulk callers
+            pass False and update the stats once at the end.
         
     Returns:
         int: The ID of the created collection item.
@@ -134,7 +137,8 @@ def add_to_collection(
             ), commit=True)
         
         # Update collection stats
-        update_collection_stats()
+        if update_stats:
+            update_collection_stats()
         
         return item_id
     
@@ -177,12 +181,16 @@ def update_collection_item(
     ownership_status: Optional[str] = None,
     read_status: Optional[str] = None,
     format: Optional[str] = None,
+    digital_format: Optional[str] = None,
+    has_file: Optional[int] = None,
+    ebook_file_id: Optional[int] = None,
     condition: Optional[str] = None,
     purchase_date: Optional[str] = None,
     purchase_price: Optional[float] = None,
     purchase_location: Optional[str] = None,
     notes: Optional[str] = None,
-    custom_tags: Optional[str] = None
+    custom_tags: Optional[str] = None,
+    update_stats: bool = True
 ) -> bool:
     """Update a collection item.
     
@@ -191,12 +199,17 @@ def update_collection_item(
         ownership_status: The ownership status.
         read_status: The read status.
         format: The format.
+        digital_format: The digital format.
+        has_file: Whether the item has a file.
+        ebook_file_id: The e-book file of the item.
         condition: The condition.
         purchase_date: The purchase date.
         purchase_price: The purchase price.
         purchase_location: The purchase location.
         notes: Notes about the item.
         custom_tags: Custom tags.
+        update_stats: Whether to recalculate the collection stats. Bulk callers
+            pass False and update the stats once at the end.
         
     Returns:
         bool: True if successful, False otherwise.
@@ -232,6 +245,18 @@ def update_collection_item(
             update_fields.append("format = ?")
             params.append(format)
         
+        if digital_format is not None:
+            update_fields.append("digital_format = ?")
+            params.append(digital_format)
+        
+        if has_file is not None:
+            update_fields.append("has_file = ?")
+            params.append(has_file)
+        
+        if ebook_file_id is not None:
+            update_fields.append("ebook_file_id = ?")
+            params.append(ebook_file_id)
+        
         if condition is not None:
             update_fields.append("condition = ?")
             params.append(condition)
@@ -271,7 +296,7 @@ def update_collection_item(
         """, tuple(params), commit=True)
         
         # Update collection stats if ownership or read status changed
-        if ownership_status is not None or read_status is not None:
+        if update_stats and (ownership_status is not None or read_status is not None):
             update_collection_stats()
         
         return True
@@ -298,34 +323,38 @@ def import_collection(data: List[Dict]) -> Dict:
             'errors': 0
         }
         
-        for item in data:
-            try:
-                # Check required fields
-                if 'series_id' not in item or 'item_type' not in item:
-                    stats['skipped'] += 1
-                    continue
+        # Import all items in a single transaction, each item in its own savepoint
+        with transaction():
+            for item in data:
+                try:
+                    # Check required fields
+                    if 'series_id' not in item or 'item_type' not in item:
+                        stats['skipped'] += 1
+                        continue
+                    
+                    # Add to collection
+                    with transaction():
+                        add_to_collection(
+                            series_id=item['series_id'],
+                            item_type=item['item_type'],
+                            volume_id=item.get('volume_id'),
+                            chapter_id=item.get('chapter_id'),
+                            ownership_status=item.get('ownership_status', 'OWNED'),
+                            read_status=item.get('read_status', 'UNREAD'),
+                            format=item.get('format', 'PHYSICAL'),
+                            condition=item.get('condition', 'NONE'),
+                            purchase_date=item.get('purchase_date'),
+                            purchase_price=item.get('purchase_price'),
+                            purchase_location=item.get('purchase_location'),
+                            notes=item.get('notes'),
+                            custom_tags=item.get('custom_tags'),
+                            update_stats=False
+                        )
+                    
+                    stats['imported'] += 1
                 
-                # Add to collection
-                add_to_collection(
-                    series_id=item['series_id'],
-                    item_type=item['item_type'],
-                    volume_id=item.get('volume_id'),
-                    chapter_id=item.get('chapter_id'),
-                    ownership_status=item.get('ownership_status', 'OWNED'),
-                    read_status=item.get('read_status', 'UNREAD'),
-                    format=item.get('format', 'PHYSICAL'),
-                    condition=item.get('condition', 'NONE'),
-                    purchase_date=item.get('purchase_date'),
-                    purchase_price=item.get('purchase_price'),
-                    purchase_location=item.get('purchase_location'),
-                    notes=item.get('notes'),
-                    custom_tags=item.get('custom_tags')
-                )
-                
-                stats['imported'] += 1
-            
-            except Exception:
-                stats['errors'] += 1
+                except Exception:
+                    stats['errors'] += 1
         
         # Update collection stats
         update_collection_stats()
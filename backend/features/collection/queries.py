@@ -5,10 +5,10 @@
 Collection query functions.
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 
 from backend.base.logging import LOGGER
-from backend.internals.db import execute_query
+from backend.internals.db import execute_query, iter_query
 
 
 def get_collection_items(
@@ -74,6 +74,23 @@ def get_collection_items(
         return []
 
 
+def iter_collection_export() -> Iterator[Dict]:
+    """Yield the collection data for an export row by row.
+    
+    Returns:
+        Iterator[Dict]: The collection items.
+    """
+    return iter_query("""
+    SELECT
+        id, series_id, volume_id, chapter_id, item_type,
+        ownership_status, read_status, format, condition,
+        purchase_date, purchase_price, purchase_location,
+        notes, custom_tags, created_at, updated_at
+    FROM collection_items
+    ORDER BY series_id, volume_id, chapter_id
+    """)
+
+
 def export_collection() -> List[Dict]:
     """Export collection data.
     
@@ -81,15 +98,7 @@ def export_collection() -> List[Dict]:
         List[Dict]: The collection data.
     """
     try:
-        return execute_query("""
-        SELECT
-            id, series_id, volume_id, chapter_id, item_type,
-            ownership_status, read_status, format, condition,
-            purchase_date, purchase_price, purchase_location,
-            notes, custom_tags, created_at, updated_at
-        FROM collection_items
-        ORDER BY series_id, volume_id, chapter_id
-        """)
+        return list(iter_collection_export())
     
     except Exception as e:
         LOGGER.error(f"Error exporting collection: {e}")
@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Optional, Dict, Any, List
 from urllib.parse import urljoin, urlparse
 
+from backend.internals import http_client
 from backend.base.custom_exceptions import FileOperationError
 from backend.base.helpers import ensure_dir_exists, get_data_dir
 from backend.base.logging import LOGGER
@@ -137,7 +138,7 @@ class CoverArtManager:
                         'Sec-Fetch-Site': 'cross-site',
                     }
                     
-                    response = requests.get(cdn_url, headers=headers, timeout=30, stream=True)
+                    response = http_client.get(cdn_url, headers=headers, timeout=30, stream=True)
                     response.raise_for_status()
                     
                     # Verify content type is an image
@@ -175,7 +176,7 @@ class CoverArtManager:
             cover_id = cover_filename.split('.')[0]  # Extract ID from filename
             api_url = f"https://api.mangadex.org/cover/{cover_id}"
             
-            response = requests.get(api_url, timeout=10)
+            response = http_client.get(api_url, timeout=10)
             if response.status_code == 200:
                 cover_data = response.json()
                 if 'data' in cover_data and cover_data['data']:
@@ -189,7 +190,7 @@ class CoverArtManager:
                             LOGGER.info(f"Trying API filename: {api_cdn_url}")
                             
                             try:
-                                response = requests.get(api_cdn_url, headers=headers, timeout=30, stream=True)
+                                response = http_client.get(api_cdn_url, headers=headers, timeout=30, stream=True)
                                 if response.status_code == 200:
                                     with open(local_path, 'wb') as f:
                                         for chunk in response.iter_content(8192):
@@ -265,7 +266,7 @@ class CoverArtManager:
             List of dictionaries with cover information
         """
         try:
-            response = requests.get(
+            response = http_client.get(
                 f"https://api.mangadex.org/manga/{manga_dex_id}",
                 params={"includes[]": "cover_art"},
                 timeout=10
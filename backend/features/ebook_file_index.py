@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+In-memory index of the e-book files of a series.
+
+The e-book scan uses the index to check whether a file is already in the
+library without querying the database and comparing every stored file on
+disk. Files are matched on their normalized path, or on their device and
+inode like `os.path.samefile`. The state of stored files is taken from the
+library walk where possible, so building the index costs one query.
+
+`os.scandir` doesn't fill in the device and inode on Windows, so states
+without an inode are replaced with an `os.stat` of the file when they are
+needed.
+"""
+
+import os
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from backend.internals.db import execute_query, iter_query
+
+
+def normalize_path(path: str) -> str:
+    """Normalize a path for comparison.
+
+    Args:
+        path (str): The path.
+
+    Returns:
+        str: The absolute, normalized path.
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _has_inode(stat_result: os.stat_result) -> bool:
+    """Check whether a state has the device and inode of the file."""
+    return stat_result.st_ino != 0
+
+
+class EbookFileIndex:
+    """The known e-book files of a series, by path and by file identity."""
+
+    def __init__(self, known_stats: Optional[Mapping[str, os.stat_result]] = None):
+        """Create an empty index.
+
+        Args:
+            known_stats (Optional[Mapping[str, os.stat_result]], optional): The
+                state of files that is already known, by normalized path.
+                Defaults to None.
+        """
+        self.known_stats = known_stats or {}
+        # (normalized path, volume ID) -> file ID
+        self.by_path: Dict[Tuple[str, int], int] = {}
+        # (device, inode, volume ID) -> file ID
+        self.by_inode: Dict[Tuple[int, int, int], int] = {}
+        # Stored files whose state is not known yet: (path, volume ID, file ID)
+        self.unresolved: List[Tuple[str, int, int]] = []
+
+    def add(
+        self,
+        file_path: str,
+        volume_id: int,
+        file_id: int,
+        stat_result: Optional[os.stat_result] = None
+    ) -> None:
+        """Add a stored e-book file to the index.
+
+        Args:
+            file_path (str): The path stored for the file.
+            volume_id (int): The volume of the file.
+            file_id (int): The ID of the file.
+            stat_result (Optional[os.stat_result], optional): The state of the
+                file, if known. Defaults to None.
+        """
+        path_key = normalize_path(file_path)
+        self.by_path.setdefault((path_key, volume_id), file_id)
+
+        if stat_result is None:
+            stat_result = self.known_stats.get(path_key)
+        if stat_result is None or not _has_inode(stat_result):
+            self.unresolved.append((file_path, volume_id, file_id))
+        else:
+            self.by_inode.setdefault((stat_result.st_dev, stat_result.st_ino, volume_id), file_id)
+
+    def _resolve(self) -> None:
+        """Get the state of the stored files that were not part of the walk."""
+        unresolved, self.unresolved = self.unresolved, []
+        for file_path, volume_id, file_id in unresolved:
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                # Not on disk anymore, so it can't be the same file
+                continue
+            if not _has_inode(stat_result):
+                # The filesystem has no inodes, so only the path can match
+                continue
+            self.by_inode.setdefault((stat_result.st_dev, stat_result.st_ino, volume_id), file_id)
+
+    def find(self, file_path: str, volume_id: int, stat_result: os.stat_result) -> Optional[int]:
+        """Find a file in the index.
+
+        Args:
+            file_path (str): The path of the file on disk.
+            volume_id (int): The volume the file belongs to.
+            stat_result (os.stat_result): The state of the file.
+
+        Returns:
+            Optional[int]: The ID of the stored e-book file, or None if the file
+            is not known for the volume.
+        """
+        file_id = self.by_path.get((normalize_path(file_path), volume_id))
+        if file_id is not None:
+            return file_id
+
+        if not _has_inode(stat_result):
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                return None
+            if not _has_inode(stat_result):
+                return None
+
+        inode_key = (stat_result.st_dev, stat_result.st_ino, volume_id)
+        file_id = self.by_inode.get(inode_key)
+        if file_id is None and self.unresolved:
+            self._resolve()
+            file_id = self.by_inode.get(inode_key)
+        return file_id
+
+
+def load_ebook_file_index(
+    series_id: int,
+    known_stats: Optional[Mapping[str, os.stat_result]] = None
+) -> EbookFileIndex:
+    """Load the e-book files of a series into an index.
+
+    Args:
+        series_id (int): The series ID.
+        known_stats (Optional[Mapping[str, os.stat_result]], optional): The
+            state of files that is already known, by normalized path.
+            Defaults to None.
+
+    Returns:
+        EbookFileIndex: The index.
+    """
+    index = EbookFileIndex(known_stats)
+    for row in iter_query(
+        "SELECT id, volume_id, file_path FROM ebook_files WHERE series_id = ? ORDER BY id",
+        (series_id,)
+    ):
+        index.add(row['file_path'], row['volume_id'], row['id'])
+    return index
+
+
+def load_volume_ids(series_id: int) -> Dict[str, int]:
+    """Get the volumes of a series by volume number.
+
+    Args:
+        series_id (int): The series ID.
+
+    Returns:
+        Dict[str, int]: The volume ID of every volume number.
+    """
+    volume_ids: Dict[str, int] = {}
+    for row in execute_query(
+        "SELECT id, volume_number FROM volumes WHERE series_id = ? ORDER BY id",
+        (series_id,)
+    ):
+        volume_ids.setdefault(str(row['volume_number']), row['id'])
+    return volume_ids
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cached introspection of e-book archives.
+
+After a scan, the CBZ, CBR and EPUB files that were not introspected yet
+are read with `introspect_archive()` on a pool of worker processes. The
+page count, embedded metadata and cover are stored per file, together
+with the size and modification time of the file, so later scans and API
+calls use the stored result instead of opening the archive again. The
+result of a file is removed when the scan sees that the file changed.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.base.helpers import get_data_dir
+from backend.base.logging import LOGGER
+from backend.features.archive_introspection import introspect_archive
+from backend.internals.db import execute_many, execute_query
+
+# File types that are introspected
+INTROSPECTED_TYPES = ('CBZ', 'CBR', 'EPUB')
+
+# Worker processes that read archives at the same time
+INTROSPECTION_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Fewer files are read in this process, as starting the pool costs more
+POOL_MIN_FILES = 8
+
+# Files saved per query
+BATCH_SIZE = 200
+
+# Where the covers are saved, relative to the data directory
+COVERS_FOLDER = Path("cover_art") / "files"
+
+
+def _cover_target(file_id: int) -> str:
+    """Get where the cover of a file is saved, without extension."""
+    return str(get_data_dir() / COVERS_FOLDER / str(file_id))
+
+
+def _introspect_many(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Introspect files, on the worker pool if there are enough of them.
+
+    Args:
+        files (List[Dict[str, Any]]): The `id`, `file_path` and `file_type` of every file.
+
+    Returns:
+        List[Dict[str, Any]]: The result of every file, in the same order.
+    """
+    paths = [file['file_path'] for file in files]
+    types = [file['file_type'] for file in files]
+    targets = [_cover_target(file['id']) for file in files]
+
+    if len(files) >= POOL_MIN_FILES and INTROSPECTION_WORKERS > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=INTROSPECTION_WORKERS) as executor:
+                chunksize = max(1, len(files) // (INTROSPECTION_WORKERS * 4))
+                return list(executor.map(introspect_archive, paths, types, targets, chunksize=chunksize))
+        except Exception as e:
+            LOGGER.warning(f"Could not introspect files in worker processes, continuing in this process: {e}")
+
+    return [introspect_archive(*args) for args in zip(paths, types, targets)]
+
+
+def introspect_files(files: List[Dict[str, Any]]) -> int:
+    """Introspect e-book files and store the results.
+
+    Args:
+        files (List[Dict[str, Any]]): The `id`, `file_path` and `file_type` of every file.
+
+    Returns:
+        int: The number of files introspected.
+    """
+    # The state is taken before reading, so a change while reading is seen later
+    states = {}
+    for file in files:
+        try:
+            file_stat = os.stat(file['file_path'])
+            states[file['id']] = (file_stat.st_size, file_stat.st_mtime_ns)
+        except OSError:
+            continue
+    files = [file for file in files if file['id'] in states]
+    if not files:
+        return 0
+
+    data_dir = get_data_dir()
+    rows = []
+    for file, result in zip(files, _introspect_many(files)):
+        if result['error']:
+            LOGGER.warning(f"Could not introspect {file['file_path']}: {result['error']}")
+        cover_path = result['cover_path']
+        if cover_path:
+            cover_path = Path(cover_path).relative_to(data_dir).as_posix()
+        rows.append((
+            file['id'],
+            *states[file['id']],
+            result['page_count'],
+            result['metadata_format'],
+            json.dumps(result['metadata']),
+            cover_path,
+            result['error']
+        ))
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        execute_many("""
+            INSERT OR REPLACE INTO ebook_file_metadata (
+                ebook_file_id, file_size, file_mtime_ns, page_count,
+                metadata_format, metadata, cover_path, error, introspected_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, rows[start:start + BATCH_SIZE])
+
+    LOGGER.info(f"Introspected {len(rows)} e-book files")
+    return len(rows)
+
+
+def update_file_metadata(series_ids: Optional[Iterable[int]] = None) -> int:
+    """Introspect the e-book files that were not introspected yet.
+
+    Args:
+        series_ids (Optional[Iterable[int]], optional): Only introspect the
+            files of these series. Defaults to None.
+
+    Returns:
+        int: The number of files introspected.
+    """
+    query = f"""
+        SELECT f.id, f.file_path, f.file_type
+        FROM ebook_files f
+        LEFT JOIN ebook_file_metadata m ON m.ebook_file_id = f.id
+        WHERE m.ebook_file_id IS NULL
+        AND f.file_type IN ({', '.join('?' for _ in INTROSPECTED_TYPES)})
+    """
+
+    if series_ids is None:
+        files = execute_query(query, INTROSPECTED_TYPES)
+    else:
+        files = []
+        for series_id in series_ids:
+            files.extend(execute_query(query + " AND f.series_id = ?", INTROSPECTED_TYPES + (series_id,)))
+
+    return introspect_files(files)
+
+
+def reset_file_metadata(file_ids: Iterable[int]) -> int:
+    """Forget the introspection of files whose content changed.
+
+    Args:
+        file_ids (Iterable[int]): The IDs of the e-book files.
+
+    Returns:
+        int: The number of files reset.
+    """
+    return execute_many(
+        "DELETE FROM ebook_file_metadata WHERE ebook_file_id = ?",
+        ((file_id,) for file_id in file_ids)
+    )
+
+
+def get_file_metadata(file_id: int) -> Optional[Dict[str, Any]]:
+    """Get the introspection of an e-book file.
+
+    The file is introspected first if it wasn't yet, or if it changed since.
+
+    Args:
+        file_id (int): The ID of the e-book file.
+
+    Returns:
+        Optional[Dict[str, Any]]: The `page_count`, `metadata_format`,
+        `metadata`, `cover_url` and `error` of the file, or None if the file
+        is unknown or not an archive that can be introspected.
+    """
+    files = execute_query("SELECT id, file_path, file_type FROM ebook_files WHERE id = ?", (file_id,))
+    if not files or files[0]['file_type'] not in INTROSPECTED_TYPES:
+        return None
+
+    rows = execute_query("SELECT * FROM ebook_file_metadata WHERE ebook_file_id = ?", (file_id,))
+    try:
+        file_stat = os.stat(files[0]['file_path'])
+        state = (file_stat.st_size, file_stat.st_mtime_ns)
+    except OSError:
+        state = None
+
+    if state is not None and (not rows or (rows[0]['file_size'], rows[0]['file_mtime_ns']) != state):
+        introspect_files(files)
+        rows = execute_query("SELECT * FROM ebook_file_metadata WHERE ebook_file_id = ?", (file_id,))
+    if not rows:
+        return None
+
+    row = rows[0]
+    return {
+        'ebook_file_id': file_id,
+        'page_count': row['page_count'],
+        'metadata_format': row['metadata_format'],
+        'metadata': json.loads(row['metadata']) if row['metadata'] else {},
+        'cover_url': f"/api/cover-art/{row['cover_path']}" if row['cover_path'] else None,
+        'error': row['error'],
+        'introspected_at': row['introspected_at']
+    }
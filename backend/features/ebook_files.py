@@ -2,20 +2,49 @@
 # -*- coding: utf-8 -*-
 
 import os
+import threading
 import time
-import hashlib
-import re
-from typing import Dict, List, Optional, Union, Tuple
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
 from pathlib import Path
 
 from backend.base.helpers import (
     get_ebook_storage_dir, organize_ebook_path, 
-    copy_file_to_storage, ensure_dir_exists, get_safe_folder_name,
+    copy_file_to_storage, get_safe_folder_name,
     read_metadata_from_readme
 )
 from backend.base.logging import LOGGER
-from backend.internals.db import execute_query
-from backend.features.collection import add_to_collection, update_collection_item
+from backend.internals.db import execute_many, execute_query, transaction
+from backend.features.collection import add_to_collection, update_collection_item, update_collection_stats
+from backend.features.ebook_file_index import load_ebook_file_index, load_volume_ids, normalize_path
+from backend.features.ebook_file_metadata import reset_file_metadata, update_file_metadata
+from backend.features.file_fingerprints import reset_fingerprints, set_fingerprints, update_fingerprints
+from backend.features.library_walker import DirNode, find_node, walk_directory, walk_library
+from backend.features.volume_numbers import extract_volume_numbers
+from backend.features.scan_manifest import (
+    ManifestEntry, get_manifest, make_entry, remove_entries, save_entries
+)
+from backend.features.scan_shards import (
+    POOL_MIN_SERIES, SUPPORTED_EXTENSIONS, SeriesAnalysis,
+    analyze_series, iter_sharded_analyses
+)
+
+if TYPE_CHECKING:
+    from backend.features.scan_jobs import ScanJob
+
+# Held while a scan runs, so scans of the same series don't add the same
+# file twice. Reentrant, so code run during a scan can't deadlock on it.
+_SCAN_LOCK = threading.RLock()
+
+
+class _PreparedFile(NamedTuple):
+    """An e-book file at its storage location, ready to be added to the database."""
+    series_id: int
+    volume_id: int
+    target_path: Path
+    file_name: str
+    file_size: int
+    file_type: str
+    original_name: str
 
 
 def add_ebook_file(series_id: int, volume_id: int, file_path: str, file_type: Optional[str] = None, max_retries: int = 5) -> Dict:
@@ -31,14 +60,32 @@ def add_ebook_file(series_id: int, volume_id: int, file_path: str, file_type: Op
     Returns:
         Dict: The file information if successful, empty dict otherwise.
     """
-    retries = 0
-    retry_delay = 0.5
+    prepared = _prepare_ebook_file(series_id, volume_id, file_path, file_type)
+    if prepared is None:
+        return {}
+    return _insert_ebook_file(prepared, max_retries)
+
+
+def _prepare_ebook_file(series_id: int, volume_id: int, file_path: str, file_type: Optional[str] = None) -> Optional[_PreparedFile]:
+    """Get the storage location of an e-book file, copying it there if needed.
     
-    # Check if the file exists before entering retry loop
+    This doesn't write to the database, so it can run before a transaction
+    instead of holding the write lock while a file is copied.
+    
+    Args:
+        series_id (int): The series ID.
+        volume_id (int): The volume ID.
+        file_path (str): The path to the e-book file.
+        file_type (Optional[str]): The file type. If None, it will be detected from the file extension.
+        
+    Returns:
+        Optional[_PreparedFile]: The file, or None if it could not be prepared.
+    """
+    # Check if the file exists
     source_path = Path(file_path)
     if not source_path.exists() or not source_path.is_file():
         LOGGER.error(f"File does not exist: {file_path}")
-        return {}
+        return None
     
     # Get file info
     file_name = source_path.name
@@ -72,7 +119,7 @@ def add_ebook_file(series_id: int, volume_id: int, file_path: str, file_type: Op
     series_info = execute_query("SELECT title FROM series WHERE id = ?", (series_id,))
     if not series_info:
         LOGGER.error(f"Series with ID {series_id} not found")
-        return {}
+        return None
     
     series_title = series_info[0]['title']
     safe_series_title = safe_folder_name(series_title)
@@ -122,10 +169,28 @@ def add_ebook_file(series_id: int, volume_id: int, file_path: str, file_type: Op
             LOGGER.info(f"Copying file from {source_path_abs} to {target_path}")
             if not copy_file_to_storage(source_path, target_path):
                 LOGGER.error(f"Failed to copy file: {file_path}")
-                return {}
+                return None
         else:
             LOGGER.info(f"File is already at target path: {target_path}")
+    
+    return _PreparedFile(
+        series_id, volume_id, target_path, unique_file_name, file_size, file_type, file_name
+    )
+
 
+def _insert_ebook_file(prepared: _PreparedFile, max_retries: int = 5) -> Dict:
+    """Add a prepared e-book file to the database.
+    
+    Args:
+        prepared (_PreparedFile): The file, at its storage location.
+        max_retries (int, optional): Maximum number of retries for database operations. Defaults to 5.
+        
+    Returns:
+        Dict: The file information if successful, empty dict otherwise.
+    """
+    series_id, volume_id, target_path, unique_file_name, file_size, file_type, file_name = prepared
+    retries = 0
+    retry_delay = 0.5
     
     # Start retry loop for database operations
     while retries <= max_retries:
@@ -813,30 +878,33 @@ def _process_series_directory(series_dir: Path) -> int:
     return created_count
 
 
-def discover_and_create_series(root_path: Path) -> int:
+def discover_and_create_series(root_path: Path, root_node: Optional[DirNode] = None) -> int:
     """Discover new series folders and create them in the database.
     
     Args:
         root_path (Path): The root path to scan for series folders.
+        root_node (Optional[DirNode]): The walked tree of the root folder.
+            If None, the root folder is walked first.
         
     Returns:
         int: Number of new series created.
     """
     created_count = 0
     
-    if not root_path.exists() or not root_path.is_dir():
+    if root_node is None:
+        root_node = walk_library([root_path]).get(root_path)
+    
+    if root_node is None:
         LOGGER.warning(f"Root folder does not exist or is not a directory: {root_path}")
         return created_count
     
     # Get all series directories directly in the root folder
-    for series_dir in root_path.iterdir():
-        if not series_dir.is_dir():
-            continue
-        
+    for series_node in root_node.subdirs:
+        series_dir = series_node.path
         series_dir_name = series_dir.name
         
         # Read metadata from README if it exists
-        readme_metadata = read_metadata_from_readme(series_dir)
+        readme_metadata = series_node.read_readme()
         metadata_id = readme_metadata.get('metadata_id')
         metadata_source = readme_metadata.get('metadata_source')
         
@@ -844,16 +912,12 @@ def discover_and_create_series(root_path: Path) -> int:
         # Do this FIRST before skipping
         has_book_subdirs = False
         book_subdirs = []
-        try:
-            for subdir in series_dir.iterdir():
-                if subdir.is_dir():
-                    # Check if subdirectory has a book README
-                    sub_readme = read_metadata_from_readme(subdir)
-                    if sub_readme.get('metadata_id') or sub_readme.get('metadata_source'):
-                        has_book_subdirs = True
-                        book_subdirs.append(subdir)
-        except Exception:
-            pass
+        for subdir in series_node.subdirs:
+            # Check if subdirectory has a book README
+            sub_readme = subdir.read_readme()
+            if sub_readme.get('metadata_id') or sub_readme.get('metadata_source'):
+                has_book_subdirs = True
+                book_subdirs.append(subdir.path)
         
         # If this is an author folder, process book subdirectories
         if has_book_subdirs:
@@ -980,26 +1044,326 @@ def discover_and_create_series(root_path: Path) -> int:
     return created_count
 
 
-def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optional[str] = None, content_type_filter: Optional[str] = None) -> Dict:
+def _scan_series_dir(
+    series_dir: Path,
+    content_type: str,
+    series_id: int,
+    stats: Dict,
+    library_nodes: Dict[Path, DirNode],
+    content_type_filter: Optional[str] = None,
+    full_scan: bool = False,
+    analysis: Optional[SeriesAnalysis] = None
+) -> bool:
+    """Scan the folder of a series for new, changed and removed e-book files.
+    
+    Args:
+        series_dir (Path): The folder of the series.
+        content_type (str): The content type of the series.
+        series_id (int): The series ID.
+        stats (Dict): The statistics of the scan, updated in place.
+        library_nodes (Dict[Path, DirNode]): The walked root folders, by path.
+        content_type_filter (Optional[str]): Only scan series of this content type.
+        full_scan (bool): Ignore the scan manifest and process every file. Defaults to False.
+        analysis (Optional[SeriesAnalysis]): The changes in the folder, when
+            already analysed by a scan worker. Defaults to None.
+    
+    Returns:
+        bool: True if the folder changed since the last scan.
+    """
+    if not series_dir.is_dir():
+        LOGGER.warning(f"Skipping {series_dir} as it's not a directory")
+        return False
+    
+    LOGGER.info(f"Processing directory: {series_dir} for series ID: {series_id}")
+    
+    if not series_id:
+        stats['errors'] += 1
+        return False
+    
+    # Get series title and metadata from database
+    series_title_info = execute_query("SELECT title, metadata_source, metadata_id, author, cover_url, description, content_type FROM series WHERE id = ?", (series_id,))
+    series_title = series_title_info[0]['title'] if series_title_info else series_dir.name
+    series_content_type = series_title_info[0]['content_type'] if series_title_info else 'UNKNOWN'
+    
+    # Apply content type filter if specified
+    if content_type_filter:
+        content_type_filter = content_type_filter.upper()
+        if series_content_type.upper() != content_type_filter:
+            LOGGER.info(f"Skipping series {series_id} ({series_title}) - content type {series_content_type} does not match filter {content_type_filter}")
+            return False
+    
+    # Process each file in the series directory (recursive), using
+    # the tree of the library walk if the folder was part of it
+    LOGGER.info(f"Scanning directory {series_dir} for e-book files")
+    series_node = find_node(library_nodes, series_dir)
+    if analysis is None:
+        # The state of the files at the last scan
+        manifest = {} if full_scan else get_manifest(series_id)
+        series_node = series_node or walk_directory(series_dir)
+        analysis = analyze_series(series_dir, series_id, series_node, manifest)
+    
+    if analysis.error is not None:
+        LOGGER.error(f"Error listing files in directory {series_dir}: {analysis.error}")
+        stats['errors'] += 1
+    stats['unchanged'] += analysis.unchanged
+    
+    # Only files that are new or changed since the last scan are processed
+    changed_files = analysis.changed_files
+    manifest_entries = list(analysis.folder_entries)
+    removed_entries = analysis.removed_entries
+    
+    if not analysis.has_changes:
+        LOGGER.info(f"No changes in {series_dir} since the last scan, skipping series {series_id}")
+        stats['series_unchanged'] += 1
+        return False
+    
+    # Enrich metadata if not already enriched (for MANGA and BOOK content types)
+    if series_title_info and content_type in ('MANGA', 'BOOK'):
+        metadata_source = series_title_info[0].get('metadata_source')
+        metadata_id = series_title_info[0].get('metadata_id')
+        author = series_title_info[0].get('author')
+        cover_url = series_title_info[0].get('cover_url')
+        description = series_title_info[0].get('description')
+        
+        # Only enrich if we're missing important display fields (description, author, cover)
+        # Always enrich metadata to get the correct status from provider
+        # Even if we have complete metadata from README, we still need the real status
+        LOGGER.info(f"Enriching metadata for series {series_id}: {series_title} to fetch status from provider")
+        enrich_series_metadata(series_id, series_title, content_type)
+    
+    stats['series_processed'] += 1
+    LOGGER.info(f"Processing series: {series_title} (ID: {series_id}), {len(changed_files)} new or changed files")
+    
+    # Keep track of processed files to avoid duplicates
+    processed_files = set()
+    # Known files whose content changed since the last scan
+    changed_file_ids = []
+    
+    # Fingerprints computed by the scan worker, by path
+    fingerprints = {}
+    
+    # Known files of the series, using the state of the walk where possible
+    known_entries = (
+        series_node.iter_entries() if series_node is not None
+        else ((changed.path, changed.stat_result) for changed in changed_files)
+    )
+    known_stats = {normalize_path(str(path)): entry_stat for path, entry_stat in known_entries}
+    file_index = load_ebook_file_index(series_id, known_stats)
+    
+    # Create the volumes of all files at once
+    volume_ids = get_or_create_volumes(series_id, [
+        changed.volume_number for changed in changed_files
+        if changed.volume_number and changed.readable
+    ])
+    
+    # Copy the new files that are not in the series folder to storage first,
+    # so the transaction doesn't hold the write lock while files are copied
+    new_files = []
+    for changed in changed_files:
+        file_path, file_stat = changed.path, changed.stat_result
+        LOGGER.debug(f"Checking file: {file_path.name}")
+            
+        # Skip if already processed (can happen with symlinks)
+        file_key = changed.resolved
+        if file_key in processed_files:
+            LOGGER.debug(f"Skipping already processed file: {file_path.name}")
+            continue
+            
+        processed_files.add(file_key)
+        
+        # Try to fix file permissions if not readable
+        if not changed.readable:
+            LOGGER.debug(f"File not readable, attempting to fix permissions: {file_path.name}")
+            if fix_file_permissions(file_path):
+                LOGGER.debug(f"Successfully fixed permissions for: {file_path.name}")
+            else:
+                LOGGER.warning(f"Could not fix permissions for: {file_path.name}, skipping")
+                stats['skipped'] = stats.get('skipped', 0) + 1
+                continue
+        
+        # Get file extension and check if supported
+        file_ext = file_path.suffix.lower()
+        
+        # Special handling for CBZ files
+        if file_ext == '.cbz':
+            LOGGER.debug(f"Found CBZ file: {file_path.name}")
+        
+        if file_ext not in SUPPORTED_EXTENSIONS:
+            LOGGER.debug(f"Skipping unsupported file type: {file_path.name}")
+            stats['skipped'] = stats.get('skipped', 0) + 1
+            manifest_entries.append(make_entry(str(file_path), file_stat, series_id))
+            continue
+        else:
+            LOGGER.debug(f"Found supported file type: {file_ext} for file {file_path.name}")
+            # Count this file as scanned
+            stats['scanned'] = stats.get('scanned', 0) + 1
+            
+        LOGGER.info(f"Found supported file: {file_path.name} with extension {file_ext}")
+        
+        # Extract volume number from filename or path
+        volume_number = changed.volume_number
+        
+        if not volume_number:
+            LOGGER.warning(f"Could not extract volume number from {file_path}")
+            stats['skipped'] = stats.get('skipped', 0) + 1
+            manifest_entries.append(make_entry(str(file_path), file_stat, series_id))
+            continue
+        
+        LOGGER.info(f"Successfully extracted volume number: {volume_number} from {file_path}")
+        
+        # Get or create volume
+        volume_id = volume_ids.get(volume_number)
+        if volume_id is None:
+            volume_id = get_or_create_volume(series_id, volume_number)
+            if volume_id:
+                volume_ids[volume_number] = volume_id
+        
+        if not volume_id:
+            LOGGER.error(f"Failed to get or create volume for series {series_id}, volume {volume_number}")
+            stats['errors'] = stats.get('errors', 0) + 1
+            continue
+            
+        LOGGER.info(f"Using volume ID: {volume_id} for volume {volume_number}")
+        
+        # Check if the file is already in the database, by path or as the same file on disk
+        existing_file_id = file_index.find(str(file_path), volume_id, file_stat)
+        
+        if existing_file_id:
+            LOGGER.info(f"Skipping existing file: {file_path}")
+            if changed.scanned_before:
+                # Scanned before, so the content changed since
+                changed_file_ids.append(existing_file_id)
+                if changed.fingerprint:
+                    fingerprints[existing_file_id] = changed.fingerprint
+            stats['skipped'] = stats.get('skipped', 0) + 1
+            manifest_entries.append(make_entry(str(file_path), file_stat, series_id, volume_id, existing_file_id))
+            continue
+        
+        # Get file type from extension
+        file_type = SUPPORTED_EXTENSIONS[file_ext]
+        LOGGER.info(f"File type: {file_type} for file: {file_path}")
+        
+        # Copy the file to storage if needed
+        prepared = _prepare_ebook_file(series_id, volume_id, str(file_path), file_type)
+        if prepared is None:
+            LOGGER.error(f"Failed to add file to database: {file_path.name}")
+            stats['errors'] = stats.get('errors', 0) + 1
+            continue
+        new_files.append((changed, volume_number, prepared))
+    
+    # Add all files of this series in a single transaction
+    with transaction():
+        for changed, volume_number, prepared in new_files:
+            file_path, file_stat = changed.path, changed.stat_result
+            volume_id, file_type = prepared.volume_id, prepared.file_type
+            
+            # The same file on disk may have been added under another path just now
+            existing_file_id = file_index.find(str(file_path), volume_id, file_stat)
+            if existing_file_id:
+                LOGGER.info(f"Skipping existing file: {file_path}")
+                stats['skipped'] = stats.get('skipped', 0) + 1
+                manifest_entries.append(make_entry(str(file_path), file_stat, series_id, volume_id, existing_file_id))
+                continue
+            
+            # Add file to database
+            LOGGER.info(f"Adding file to database: {file_path}")
+            file_info = _insert_ebook_file(prepared)
+            
+            if file_info:
+                stats['added'] = stats.get('added', 0) + 1
+                LOGGER.info(f"Successfully added file: {file_path.name} as Volume {volume_number}")
+                manifest_entries.append(make_entry(str(file_path), file_stat, series_id, volume_id, file_info['id']))
+                if changed.fingerprint:
+                    fingerprints[file_info['id']] = changed.fingerprint
+                file_index.add(
+                    file_info['file_path'], volume_id, file_info['id'],
+                    file_stat if file_info['file_path'] == str(file_path) else None
+                )
+                
+                # Update collection item to mark it as having a file
+                update_collection_for_volume(series_id, volume_id, file_type)
+            else:
+                LOGGER.error(f"Failed to add file to database: {file_path.name}")
+                stats['errors'] = stats.get('errors', 0) + 1
+        
+        # Files that failed are not recorded, so they are retried on the next scan
+        save_entries(manifest_entries)
+        reset_fingerprints(changed_file_ids)
+        set_fingerprints((fingerprint, file_id) for file_id, fingerprint in fingerprints.items())
+        reset_file_metadata(changed_file_ids)
+    
+    if removed_entries:
+        stats['removed'] += _forget_removed_files(removed_entries)
+    
+    # Fingerprint the rest of the new and changed files outside of the
+    # transaction, as it reads from disk
+    try:
+        update_fingerprints(series_id)
+    except Exception as e:
+        LOGGER.warning(f"Could not fingerprint the files of series {series_id}: {e}")
+    
+    # Also scan for folder-based structures (Volume folders with Individual Images)
+    LOGGER.info(f"Scanning {series_dir} for folder-based volume structures...")
+    folder_stats = scan_folder_structure(series_id, series_dir)
+    # Merge folder stats into main stats
+    if folder_stats.get('volumes_found', 0) > 0:
+        stats['added'] = stats.get('added', 0) + folder_stats.get('volumes_found', 0)
+    if folder_stats.get('errors', 0) > 0:
+        stats['errors'] = stats.get('errors', 0) + folder_stats.get('errors', 0)
+    
+    return True
+
+
+def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optional[str] = None, content_type_filter: Optional[str] = None, full_scan: bool = False, job: Optional['ScanJob'] = None, workers: Optional[int] = None) -> Dict:
     """Scan the data directory for e-book files and add them to the database.
     
+    Files that did not change since the last scan, according to the scan
+    manifest, are skipped. Series without any changes are not enriched again.
+    
+    Only one scan runs at a time in the process, whether it is started by the
+    periodic task, a scan job or the library watcher. Otherwise two scans of
+    the same series could both add a new file.
+    
     Args:
         specific_series_id (Optional[int]): If provided, only scan for this specific series.
         custom_path (Optional[str]): Custom path for series-specific scanning.
         content_type_filter (Optional[str]): Filter by content type ('book' or 'manga').
+        full_scan (bool): Ignore the scan manifest and process every file. Defaults to False.
+        job (Optional[ScanJob]): The background job running the scan. Series
+            folders already scanned by the job are skipped, progress is
+            recorded after every folder and the scan stops when the job is
+            cancelled. Defaults to None.
+        workers (Optional[int]): The number of worker processes that analyse
+            the series folders, 0 or 1 to analyse them in this process.
+            Defaults to None, which uses the scan_workers setting.
         
     Returns:
         Dict: Statistics about the scan.
     """
-    LOGGER.info(f"Starting e-book scan with specific_series_id={specific_series_id}, custom_path={custom_path}, content_type_filter={content_type_filter}")
+    if not _SCAN_LOCK.acquire(blocking=False):
+        LOGGER.info("Waiting for the running e-book scan to finish")
+        _SCAN_LOCK.acquire()
+    try:
+        return _scan_for_ebooks(specific_series_id, custom_path, content_type_filter, full_scan, job, workers)
+    finally:
+        _SCAN_LOCK.release()
+
+
+def _scan_for_ebooks(specific_series_id: Optional[int], custom_path: Optional[str], content_type_filter: Optional[str], full_scan: bool, job: Optional['ScanJob'], workers: Optional[int]) -> Dict:
+    """Scan for e-book files, see `scan_for_ebooks()`."""
+    LOGGER.info(f"Starting e-book scan with specific_series_id={specific_series_id}, custom_path={custom_path}, content_type_filter={content_type_filter}, full_scan={full_scan}")
     try:
         stats = {
             'scanned': 0,
             'added': 0,
             'skipped': 0,
             'errors': 0,
-            'series_processed': 0
+            'series_processed': 0,
+            'unchanged': 0,
+            'removed': 0,
+            'series_unchanged': 0
         }
+        series_created = 0
         
         # Get root folders from settings
         from backend.internals.settings import Settings
@@ -1043,6 +1407,9 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
         
         LOGGER.info(f"Manga root folders: {len(manga_root_paths)}, Book root folders: {len(book_root_paths)}")
         
+        # The walked root folders, by path
+        library_nodes = {}
+        
         # If scanning for a specific series, get its details
         if specific_series_id:
             # Get series info with all needed fields
@@ -1127,19 +1494,28 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
             # Initialize series directories
             series_dirs = []
             
+            # Walk all root folders once; discovery and the file scan below both use the result
+            library_nodes = walk_library(manga_root_paths + book_root_paths)
+            
             # First, discover and create any new series (separate manga and books)
             LOGGER.info("Discovering new series folders...")
             LOGGER.info(f"Manga root paths: {manga_root_paths}")
             LOGGER.info(f"Book root paths: {book_root_paths}")
             
             for root_path in manga_root_paths:
+                if root_path not in library_nodes:
+                    continue
                 LOGGER.info(f"Scanning manga root folder: {root_path}")
-                created = discover_and_create_series(root_path)
+                created = discover_and_create_series(root_path, library_nodes[root_path])
+                series_created += created
                 if created > 0:
                     LOGGER.info(f"Created {created} new manga series in {root_path}")
             for root_path in book_root_paths:
+                if root_path not in library_nodes:
+                    continue
                 LOGGER.info(f"Scanning book root folder: {root_path}")
-                created = discover_and_create_series(root_path)
+                created = discover_and_create_series(root_path, library_nodes[root_path])
+                series_created += created
                 if created > 0:
                     LOGGER.info(f"Created {created} new book series in {root_path}")
             
@@ -1147,36 +1523,27 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
             
             # Process each manga root folder
             for root_path in manga_root_paths:
-                if not root_path.exists() or not root_path.is_dir():
+                if root_path not in library_nodes:
                     LOGGER.warning(f"Root folder does not exist or is not a directory: {root_path}")
                     continue
                     
                 # Get all series directories directly in the root folder
-                for series_dir in root_path.iterdir():
-                    if not series_dir.is_dir():
-                        continue
+                for series_node in library_nodes[root_path].subdirs:
+                    series_dir = series_node.path
                     
                     # Check if this is an author folder by looking for book subdirectories
                     # Author folders are identified by having subdirectories with book READMEs
-                    has_book_subdirs = False
-                    book_subdirs = []
-                    try:
-                        for subdir in series_dir.iterdir():
-                            if subdir.is_dir():
-                                sub_readme = read_metadata_from_readme(subdir)
-                                if sub_readme.get('metadata_id'):
-                                    has_book_subdirs = True
-                                    book_subdirs.append(subdir)
-                    except Exception:
-                        pass
+                    book_subdirs = [
+                        subdir for subdir in series_node.subdirs
+                        if subdir.read_readme().get('metadata_id')
+                    ]
                     
-                    if has_book_subdirs:
+                    if book_subdirs:
                         LOGGER.info(f"Detected author folder: {series_dir.name}, processing {len(book_subdirs)} book subdirectories")
                         # Process each book subdirectory directly
-                        for book_dir in book_subdirs:
+                        for book_node in book_subdirs:
                             # Try to find the series in the database
-                            book_dir_name = book_dir.name
-                            book_readme = read_metadata_from_readme(book_dir)
+                            book_readme = book_node.read_readme()
                             book_metadata_id = book_readme.get('metadata_id')
                             book_metadata_source = book_readme.get('metadata_source')
                             
@@ -1188,7 +1555,7 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
                                 )
                             
                             if book_series_info:
-                                series_dirs.append((book_dir, book_series_info[0]['content_type'], book_series_info[0]['id']))
+                                series_dirs.append((book_node.path, book_series_info[0]['content_type'], book_series_info[0]['id']))
                         continue
                     
                     # If not an author folder, treat it as a direct book folder
@@ -1197,7 +1564,7 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
                     LOGGER.info(f"Checking if {series_dir_name} is a book series (not an author folder)")
                     
                     # First, try to read metadata from README if it exists
-                    readme_metadata = read_metadata_from_readme(series_dir)
+                    readme_metadata = series_node.read_readme()
                     metadata_id = readme_metadata.get('metadata_id')
                     metadata_source = readme_metadata.get('metadata_source')
                     
@@ -1240,35 +1607,26 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
             
             # Process each book root folder
             for root_path in book_root_paths:
-                if not root_path.exists() or not root_path.is_dir():
+                if root_path not in library_nodes:
                     LOGGER.warning(f"Root folder does not exist or is not a directory: {root_path}")
                     continue
                     
                 # Get all series directories directly in the root folder (author folders for books)
-                for series_dir in root_path.iterdir():
-                    if not series_dir.is_dir():
-                        continue
+                for series_node in library_nodes[root_path].subdirs:
+                    series_dir = series_node.path
                     
                     # Check if this is an author folder by looking for book subdirectories
-                    has_book_subdirs = False
-                    book_subdirs = []
-                    try:
-                        for subdir in series_dir.iterdir():
-                            if subdir.is_dir():
-                                sub_readme = read_metadata_from_readme(subdir)
-                                if sub_readme.get('metadata_id'):
-                                    has_book_subdirs = True
-                                    book_subdirs.append(subdir)
-                    except Exception:
-                        pass
+                    book_subdirs = [
+                        subdir for subdir in series_node.subdirs
+                        if subdir.read_readme().get('metadata_id')
+                    ]
                     
-                    if has_book_subdirs:
+                    if book_subdirs:
                         LOGGER.info(f"Detected author folder: {series_dir.name}, processing {len(book_subdirs)} book subdirectories")
                         # Process each book subdirectory directly
-                        for book_dir in book_subdirs:
+                        for book_node in book_subdirs:
                             # Try to find the series in the database
-                            book_dir_name = book_dir.name
-                            book_readme = read_metadata_from_readme(book_dir)
+                            book_readme = book_node.read_readme()
                             book_metadata_id = book_readme.get('metadata_id')
                             book_metadata_source = book_readme.get('metadata_source')
                             
@@ -1280,212 +1638,65 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
                                 )
                             
                             if book_series_info:
-                                series_dirs.append((book_dir, book_series_info[0]['content_type'], book_series_info[0]['id']))
-        
-        # Define supported file extensions
-        supported_extensions = {
-            '.pdf': 'PDF',
-            '.epub': 'EPUB',
-            '.cbz': 'CBZ',
-            '.cbr': 'CBR',
-            '.mobi': 'MOBI',
-            '.azw': 'AZW',
-            '.azw3': 'AZW'
-        }
+                                series_dirs.append((book_node.path, book_series_info[0]['content_type'], book_series_info[0]['id']))
         
         # Process each series directory
-        for series_dir, content_type, series_id in series_dirs:
-            if not series_dir.is_dir():
-                LOGGER.warning(f"Skipping {series_dir} as it's not a directory")
-                continue
-            
-            LOGGER.info(f"Processing directory: {series_dir} for series ID: {series_id}")
-            
-            if not series_id:
-                stats['errors'] += 1
-                continue
-            
-            # Get series title and metadata from database
-            series_title_info = execute_query("SELECT title, metadata_source, metadata_id, author, cover_url, description, content_type FROM series WHERE id = ?", (series_id,))
-            series_title = series_title_info[0]['title'] if series_title_info else series_dir.name
-            series_content_type = series_title_info[0]['content_type'] if series_title_info else 'UNKNOWN'
-            
-            # Apply content type filter if specified
-            if content_type_filter:
-                content_type_filter = content_type_filter.upper()
-                if series_content_type.upper() != content_type_filter:
-                    LOGGER.info(f"Skipping series {series_id} ({series_title}) - content type {series_content_type} does not match filter {content_type_filter}")
-                    continue
-            
-            # Enrich metadata if not already enriched (for MANGA and BOOK content types)
-            if series_title_info and content_type in ('MANGA', 'BOOK'):
-                metadata_source = series_title_info[0].get('metadata_source')
-                metadata_id = series_title_info[0].get('metadata_id')
-                author = series_title_info[0].get('author')
-                cover_url = series_title_info[0].get('cover_url')
-                description = series_title_info[0].get('description')
+        changed_series_dirs = []
+        if job is not None:
+            job.set_folders_total(len(series_dirs))
+            # Scanned before the job was interrupted
+            series_dirs = [item for item in series_dirs if str(item[0]) not in job.done_folders]
+        
+        # Large scans are analysed on worker processes, this process applies the changes
+        if workers is None:
+            workers = settings.scan_workers
+        if workers > 1 and len(series_dirs) >= POOL_MIN_SERIES:
+            analyses = iter_sharded_analyses(series_dirs, library_nodes, workers, full_scan)
+        else:
+            analyses = ((item, None) for item in series_dirs)
+        
+        try:
+            for (series_dir, content_type, series_id), analysis in analyses:
+                if job is not None and job.is_cancelled():
+                    LOGGER.info(f"Scan job {job.id} was cancelled, stopping the scan")
+                    stats['cancelled'] = True
+                    break
                 
-                # Only enrich if we're missing important display fields (description, author, cover)
-                # Always enrich metadata to get the correct status from provider
-                # Even if we have complete metadata from README, we still need the real status
-                LOGGER.info(f"Enriching metadata for series {series_id}: {series_title} to fetch status from provider")
-                enrich_series_metadata(series_id, series_title, content_type)
-            
-            stats['series_processed'] += 1
-            LOGGER.info(f"Processing series: {series_title} (ID: {series_id})")
-            
-            # Keep track of processed files to avoid duplicates
-            processed_files = set()
-            
-            # Process each file in the series directory (recursive)
-            LOGGER.info(f"Scanning directory {series_dir} for e-book files")
+                if _scan_series_dir(series_dir, content_type, series_id, stats, library_nodes, content_type_filter, full_scan, analysis):
+                    changed_series_dirs.append((series_dir, series_id))
+                
+                if job is not None:
+                    job.folder_done(str(series_dir), stats)
+        finally:
+            analyses.close()
+        
+        # Read the archives of all changed series at once, so the worker
+        # processes are only started once
+        if changed_series_dirs:
             try:
-                # Check if we have permission to access the directory
-                if not os.access(str(series_dir), os.R_OK):
-                    LOGGER.error(f"No read permission for directory: {series_dir}")
-                    stats['errors'] += 1
-                    all_files = []
-                else:
-                    LOGGER.info(f"Have read permission for directory: {series_dir}")
-                    all_files = list(series_dir.glob('**/*'))
-                    LOGGER.info(f"Found {len(all_files)} total files/directories")
-                    # Log the first 10 files for debugging
-                    for i, f in enumerate(all_files[:10]):
-                        LOGGER.debug(f"File {i}: {f} (is_file: {f.is_file()})")
+                update_file_metadata(dict.fromkeys(series_id for _, series_id in changed_series_dirs))
             except Exception as e:
-                LOGGER.error(f"Error listing files in directory {series_dir}: {e}")
-                all_files = []
-            
-            for file_path in all_files:
-                if not file_path.is_file():
-                    continue
-                    
-                LOGGER.debug(f"Checking file: {file_path.name}")
-                    
-                # Skip if already processed (can happen with symlinks)
-                file_key = str(file_path.resolve())
-                if file_key in processed_files:
-                    LOGGER.debug(f"Skipping already processed file: {file_path.name}")
-                    continue
-                    
-                processed_files.add(file_key)
-                
-                # Try to fix file permissions if not readable
-                if not os.access(str(file_path), os.R_OK):
-                    LOGGER.debug(f"File not readable, attempting to fix permissions: {file_path.name}")
-                    if fix_file_permissions(file_path):
-                        LOGGER.debug(f"Successfully fixed permissions for: {file_path.name}")
-                    else:
-                        LOGGER.warning(f"Could not fix permissions for: {file_path.name}, skipping")
-                        stats['skipped'] = stats.get('skipped', 0) + 1
-                        continue
-                
-                # Get file extension and check if supported
-                file_ext = file_path.suffix.lower()
-                
-                # Special handling for CBZ files
-                if file_ext == '.cbz':
-                    LOGGER.debug(f"Found CBZ file: {file_path.name}")
-                
-                if file_ext not in supported_extensions:
-                    LOGGER.debug(f"Skipping unsupported file type: {file_path.name}")
-                    stats['skipped'] = stats.get('skipped', 0) + 1
-                    continue
-                else:
-                    LOGGER.debug(f"Found supported file type: {file_ext} for file {file_path.name}")
-                    # Count this file as scanned
-                    stats['scanned'] = stats.get('scanned', 0) + 1
-                    
-                LOGGER.info(f"Found supported file: {file_path.name} with extension {file_ext}")
-                
-                # Extract volume number from filename or path
-                LOGGER.debug(f"Attempting to extract volume number from {file_path.name}")
-                volume_number = extract_volume_number(file_path)
-                
-                if not volume_number:
-                    LOGGER.warning(f"Could not extract volume number from {file_path}")
-                    stats['skipped'] = stats.get('skipped', 0) + 1
-                    continue
-                
-                LOGGER.info(f"Successfully extracted volume number: {volume_number} from {file_path}")
-                
-                # Get or create volume
-                volume_id = get_or_create_volume(series_id, volume_number)
-                
-                if not volume_id:
-                    LOGGER.error(f"Failed to get or create volume for series {series_id}, volume {volume_number}")
-                    stats['errors'] = stats.get('errors', 0) + 1
-                    continue
-                    
-                LOGGER.info(f"Using volume ID: {volume_id} for volume {volume_number}")
-                
-                # Check if file already exists in database
-                existing_files = get_ebook_files_for_volume(volume_id)
-                LOGGER.info(f"Found {len(existing_files)} existing files for volume {volume_id}")
-                
-                # Check if file path matches or if file is identical (same path after resolving symlinks)
-                file_exists = False
-                for ef in existing_files:
-                    if not os.path.exists(ef['file_path']):
-                        LOGGER.debug(f"Existing file path not found: {ef['file_path']}")
-                        continue
-                        
-                    try:
-                        if os.path.samefile(file_path, Path(ef['file_path'])):
-                            LOGGER.info(f"File already exists in database: {file_path}")
-                            file_exists = True
-                            break
-                    except OSError as e:
-                        LOGGER.warning(f"Error comparing files: {e}")
-                        # Handle case where files can't be compared
-                        pass
-                
-                if file_exists:
-                    LOGGER.info(f"Skipping existing file: {file_path}")
-                    stats['skipped'] = stats.get('skipped', 0) + 1
-                    continue
-                
-                # Get file type from extension
-                file_type = supported_extensions[file_ext]
-                LOGGER.info(f"File type: {file_type} for file: {file_path}")
-                
-                # Add file to database
-                LOGGER.info(f"Adding file to database: {file_path}")
-                file_info = add_ebook_file(series_id, volume_id, str(file_path), file_type)
-                
-                if file_info:
-                    stats['added'] = stats.get('added', 0) + 1
-                    LOGGER.info(f"Successfully added file: {file_path.name} as Volume {volume_number}")
-                    
-                    # Update collection item to mark it as having a file
-                    update_collection_for_volume(series_id, volume_id, file_type)
-                else:
-                    LOGGER.error(f"Failed to add file to database: {file_path.name}")
-                    stats['errors'] = stats.get('errors', 0) + 1
-        
-        # Also scan for folder-based structures (Volume folders with Individual Images)
-        LOGGER.info("Scanning for folder-based volume structures...")
-        for series_dir, content_type, series_id in series_dirs:
-            if series_dir.is_dir():
-                folder_stats = scan_folder_structure(series_id, series_dir)
-                # Merge folder stats into main stats
-                if folder_stats.get('volumes_found', 0) > 0:
-                    stats['added'] = stats.get('added', 0) + folder_stats.get('volumes_found', 0)
-                if folder_stats.get('errors', 0) > 0:
-                    stats['errors'] = stats.get('errors', 0) + folder_stats.get('errors', 0)
+                LOGGER.warning(f"Could not introspect the e-book files: {e}")
+        
+        # Collection stats are not updated per file during the scan
+        if stats.get('added'):
+            update_collection_stats()
         
         # Log the final stats
         LOGGER.info(f"Scan completed with stats: {stats}")
         
         # Update the calendar to include any newly discovered series with release dates
-        try:
-            from backend.features.calendar import update_calendar
-            LOGGER.info("Updating calendar after e-book scan...")
-            update_calendar()
-            LOGGER.info("Calendar updated successfully after e-book scan")
-        except Exception as e:
-            LOGGER.error(f"Error updating calendar after e-book scan: {e}")
-            # Continue anyway - we don't want to fail the scan if calendar update fails
+        if changed_series_dirs or series_created:
+            try:
+                from backend.features.calendar import update_calendar
+                LOGGER.info("Updating calendar after e-book scan...")
+                update_calendar()
+                LOGGER.info("Calendar updated successfully after e-book scan")
+            except Exception as e:
+                LOGGER.error(f"Error updating calendar after e-book scan: {e}")
+                # Continue anyway - we don't want to fail the scan if calendar update fails
+        else:
+            LOGGER.info("No changes found, skipping calendar update")
         
         # Convert any None values to 0 to avoid 'undefined' in the UI
         for key in stats:
@@ -1493,7 +1704,7 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
                 stats[key] = 0
                 
         # Make sure all required keys exist
-        required_keys = ['scanned', 'added', 'skipped', 'errors', 'series_processed']
+        required_keys = ['scanned', 'added', 'skipped', 'errors', 'series_processed', 'unchanged', 'removed', 'series_unchanged']
         for key in required_keys:
             if key not in stats:
                 stats[key] = 0
@@ -1503,7 +1714,34 @@ def scan_for_ebooks(specific_series_id: Optional[int] = None, custom_path: Optio
     
     except Exception as e:
         LOGGER.error(f"Error scanning for e-books: {e}")
-        return {'error': str(e), 'scanned': 0, 'added': 0, 'skipped': 0, 'errors': 1, 'series_processed': 0}
+        return {'error': str(e), 'scanned': 0, 'added': 0, 'skipped': 0, 'errors': 1, 'series_processed': 0,
+                'unchanged': 0, 'removed': 0, 'series_unchanged': 0}
+
+
+def _forget_removed_files(entries: List[ManifestEntry]) -> int:
+    """Remove files that no longer exist from the library and the scan manifest.
+
+    Args:
+        entries (List[ManifestEntry]): The manifest entries of the removed paths.
+
+    Returns:
+        int: The number of e-book files removed from the library.
+    """
+    removed = 0
+    
+    for entry in entries:
+        if not entry.ebook_file_id:
+            continue
+        
+        # Files copied into the storage folder are still there
+        file_info = get_ebook_file(entry.ebook_file_id)
+        if file_info and not os.path.exists(file_info['file_path']):
+            LOGGER.info(f"File was removed, removing it from the library: {file_info['file_path']}")
+            if delete_ebook_file(entry.ebook_file_id):
+                removed += 1
+    
+    remove_entries(entry.path for entry in entries)
+    return removed
 
 
 def get_or_create_series(title: str, content_type: str) -> Optional[int]:
@@ -1578,7 +1816,8 @@ def update_collection_for_volume(series_id: int, volume_id: int, file_type: str)
                 item_id=item_id,
                 format=new_format,
                 digital_format=file_type,
-                has_file=1
+                has_file=1,
+                update_stats=False
             )
         else:
             # Create new collection item
@@ -1590,7 +1829,8 @@ def update_collection_for_volume(series_id: int, volume_id: int, file_type: str)
                 read_status='UNREAD',
                 format='DIGITAL',
                 digital_format=file_type,
-                has_file=1
+                has_file=1,
+                update_stats=False
             )
         
         return True
@@ -1625,12 +1865,13 @@ def get_or_create_volume(series_id: int, volume_number: str, max_retries: int =
                 return volume[0]['id']
             
             # Create new volume
-            volume_id = execute_query("""
-            INSERT INTO volumes (series_id, volume_number)
-            VALUES (?, ?)
-            """, (series_id, volume_number), commit=True)
+            with transaction() as conn:
+                cursor = conn.execute("""
+                INSERT INTO volumes (series_id, volume_number)
+                VALUES (?, ?)
+                """, (series_id, volume_number))
             
-            return volume_id
+            return cursor.lastrowid
         
         except Exception as e:
             if "database is locked" in str(e) and retries < max_retries:
@@ -1646,6 +1887,35 @@ def get_or_create_volume(series_id: int, volume_number: str, max_retries: int =
     return None
 
 
+def get_or_create_volumes(series_id: int, volume_numbers: List[str]) -> Dict[str, int]:
+    """Get or create the volumes with the given volume numbers in one go.
+    
+    Args:
+        series_id (int): The series ID.
+        volume_numbers (List[str]): The volume numbers.
+        
+    Returns:
+        Dict[str, int]: The volume ID of every volume number of the series,
+        including the ones that were not asked for. Volumes that could not be
+        created are missing.
+    """
+    try:
+        volume_ids = load_volume_ids(series_id)
+        missing = [number for number in dict.fromkeys(volume_numbers) if number not in volume_ids]
+        if missing:
+            with transaction():
+                execute_many(
+                    "INSERT INTO volumes (series_id, volume_number) VALUES (?, ?)",
+                    ((series_id, number) for number in missing)
+                )
+            volume_ids = load_volume_ids(series_id)
+        return volume_ids
+    except Exception as e:
+        # The volumes are then created one by one
+        LOGGER.error(f"Error getting/creating volumes for series {series_id}: {e}")
+        return {}
+
+
 def scan_folder_structure(series_id: int, series_dir: Path) -> Dict:
     """Scan for folder-based volume structure with individual images.
     
@@ -1679,12 +1949,13 @@ def scan_folder_structure(series_id: int, series_dir: Path) -> Dict:
             LOGGER.info(f"No volume folders found in {series_dir.name}")
             return stats
         
+        volume_numbers = extract_volume_numbers(volume_folders)
         for volume_folder in volume_folders:
             volume_folder_name = volume_folder.name
             LOGGER.info(f"Found volume folder: {volume_folder_name}")
             
             # Try to extract volume number from folder name
-            volume_number = extract_volume_number(volume_folder)
+            volume_number = volume_numbers[volume_folder]
             
             if not volume_number:
                 LOGGER.debug(f"Could not extract volume number from folder: {volume_folder_name}")
@@ -1739,87 +2010,3 @@ def scan_folder_structure(series_id: int, series_dir: Path) -> Dict:
         LOGGER.error(f"Error scanning folder structure: {e}")
         stats['errors'] += 1
         return stats
-
-
-def extract_volume_number(file_path: Path) -> Optional[str]:
-    """Extract the volume number from a file path.
-    
-    Args:
-        file_path (Path): The file path.
-        
-    Returns:
-        Optional[str]: The volume number, or None if it couldn't be extracted.
-    """
-    # Try to extract from filename without extension
-    filename = file_path.stem  # Get filename without extension
-    LOGGER.debug(f"Extracting volume number from filename: {filename}")
-    
-    # Special case for filenames like "Vol 1.cbz", "Vol 2.cbz", etc.
-    if filename.startswith("Vol ") and filename[4:].isdigit():
-        vol_num = filename[4:]
-        LOGGER.debug(f"Direct match for 'Vol N' pattern: {vol_num}")
-        return vol_num
-    
-    # Common patterns for volume numbers (in order of specificity)
-    patterns = [
-        # Explicit volume indicators
-        r'[vV]ol(?:ume)?[\s._-]*(\d+(?:\.\d+)?)',  # Vol 1, Volume 1, Vol.1, Vol 1.5, etc.
-        r'[vV](\d+(?:\.\d+)?)',                     # v1, V1, v1.5, etc.
-        
-        # Common abbreviations
-        r'\bv[\s._-]*(\d+(?:\.\d+)?)',              # v 1, v.1, v_1, v-1, v1.5, etc.
-        r'\btome[\s._-]*(\d+(?:\.\d+)?)',           # tome 1, tome.1, etc.
-        r'\bch(?:apter)?[\s._-]*(\d+(?:\.\d+)?)',    # ch 1, chapter 1, ch.1, etc.
-        
-        # Numbers with context
-        r'\#(\d+(?:\.\d+)?)',                        # #1, #1.5, etc.
-        r'\b(\d+(?:\.\d+)?)\s*(?:of|\/|\\)\s*\d+\b',    # 1 of 10, 1/10, etc.
-        
-        # Standalone numbers (last resort)
-        r'^(\d+(?:\.\d+)?)$',                       # Filename is just a number like "1" or "1.5"
-        r'\b(\d+(?:\.\d+)?)\b',                     # Any number in the filename
-    ]
-    
-    # First try the filename
-    for pattern in patterns:
-        match = re.search(pattern, filename)
-        if match:
-            vol_num = match.group(1)
-            LOGGER.debug(f"Found volume number {vol_num} using pattern {pattern} in filename")
-            return vol_num
-    
-    # Then try the full filename with extension
-    full_filename = file_path.name
-    LOGGER.debug(f"Trying full filename: {full_filename}")
-    for pattern in patterns:
-        match = re.search(pattern, full_filename)
-        if match:
-            vol_num = match.group(1)
-            LOGGER.debug(f"Found volume number {vol_num} using pattern {pattern} in full filename")
-            return vol_num
-    
-    # If no match in filename, try parent directory name
-    parent_dir = file_path.parent.name
-    LOGGER.debug(f"Trying parent directory name: {parent_dir}")
-    for pattern in patterns:
-        match = re.search(pattern, parent_dir)
-        if match:
-            vol_num = match.group(1)
-            LOGGER.debug(f"Found volume number {vol_num} using pattern {pattern} in parent directory")
-            return vol_num
-    
-    # If still no match, check if the filename itself is a number or starts with a number
-    if filename.isdigit():
-        LOGGER.debug(f"Filename is a digit: {filename}")
-        return filename
-    
-    # Extract leading digits if filename starts with numbers
-    match = re.match(r'^(\d+)', filename)
-    if match:
-        vol_num = match.group(1)
-        LOGGER.debug(f"Found volume number {vol_num} from leading digits in filename")
-        return vol_num
-    
-    # If still no match, use a default
-    LOGGER.debug(f"No volume number found, defaulting to 1")
-    return '1'  # Default to volume 1
\ No newline at end of file
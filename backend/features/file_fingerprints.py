@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Content fingerprints of e-book files, to find copies of the same file.
+
+The fingerprint of a file is a hash of its size and of a block at the
+start, in the middle and at the end, so it costs three small reads no
+matter how large the file is. Files with a different fingerprint are
+different. Files with the same fingerprint are most likely the same, which
+is confirmed with a hash of the whole file. The full hash is only
+computed for files that share their fingerprint with another file.
+
+Hashing runs on a pool of threads, as it mostly waits for the disk and
+`hashlib` releases the GIL while hashing large buffers.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.base.logging import LOGGER
+from backend.features.ebook_file_index import normalize_path
+from backend.internals.db import execute_many, execute_query
+
+# Size of the blocks read for the fingerprint
+BLOCK_SIZE = 64 * 1024
+
+# Size of the chunks read for the full hash
+CHUNK_SIZE = 1024 * 1024
+
+# Threads that hash files at the same time
+FINGERPRINT_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+# Files updated per query
+BATCH_SIZE = 500
+
+
+def _new_hash() -> Any:
+    """Create the hash object used for fingerprints and full hashes."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def compute_fingerprint(file_path: str) -> Optional[str]:
+    """Compute the fingerprint of a file from its size and three blocks.
+
+    Files of at most three blocks are hashed as a whole.
+
+    Args:
+        file_path (str): The file.
+
+    Returns:
+        Optional[str]: The fingerprint, or None if the file can't be read.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            digest = _new_hash()
+            digest.update(size.to_bytes(8, 'little'))
+            if size <= 3 * BLOCK_SIZE:
+                digest.update(f.read())
+            else:
+                for offset in (0, (size - BLOCK_SIZE) // 2, size - BLOCK_SIZE):
+                    f.seek(offset)
+                    digest.update(f.read(BLOCK_SIZE))
+            return digest.hexdigest()
+    except OSError as e:
+        LOGGER.warning(f"Could not fingerprint {file_path}: {e}")
+        return None
+
+
+def compute_full_hash(file_path: str) -> Optional[str]:
+    """Compute the hash of the whole content of a file.
+
+    Args:
+        file_path (str): The file.
+
+    Returns:
+        Optional[str]: The hash, or None if the file can't be read.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            digest = _new_hash()
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+            return digest.hexdigest()
+    except OSError as e:
+        LOGGER.warning(f"Could not hash {file_path}: {e}")
+        return None
+
+
+def _hash_files(
+    files: List[Tuple[int, str]],
+    hash_function: Callable[[str], Optional[str]]
+) -> List[Tuple[str, int]]:
+    """Hash files on the worker pool.
+
+    Args:
+        files (List[Tuple[int, str]]): The ID and path of every file.
+        hash_function (Callable[[str], Optional[str]]): The hash to compute.
+
+    Returns:
+        List[Tuple[str, int]]: The hash and ID of every file that could be read.
+    """
+    if not files:
+        return []
+
+    with ThreadPoolExecutor(
+        max_workers=min(FINGERPRINT_WORKERS, len(files)),
+        thread_name_prefix="fingerprint"
+    ) as executor:
+        hashes = executor.map(hash_function, (file_path for _, file_path in files))
+        return [
+            (file_hash, file_id)
+            for (file_id, _), file_hash in zip(files, hashes)
+            if file_hash is not None
+        ]
+
+
+def reset_fingerprints(file_ids: Iterable[int]) -> int:
+    """Forget the fingerprints of files whose content changed.
+
+    Args:
+        file_ids (Iterable[int]): The IDs of the e-book files.
+
+    Returns:
+        int: The number of files reset.
+    """
+    return execute_many(
+        "UPDATE ebook_files SET fingerprint = NULL, full_hash = NULL WHERE id = ?",
+        ((file_id,) for file_id in file_ids)
+    )
+
+
+def set_fingerprints(fingerprints: Iterable[Tuple[str, int]]) -> int:
+    """Store fingerprints that were computed elsewhere, e.g. by a scan worker.
+
+    Files that already have a fingerprint keep it.
+
+    Args:
+        fingerprints (Iterable[Tuple[str, int]]): The fingerprint and ID of every file.
+
+    Returns:
+        int: The number of files updated.
+    """
+    return execute_many(
+        "UPDATE ebook_files SET fingerprint = ? WHERE id = ? AND fingerprint IS NULL",
+        fingerprints
+    )
+
+
+def update_fingerprints(series_id: Optional[int] = None) -> Dict[str, int]:
+    """Fingerprint the e-book files without a fingerprint, and compute the
+    full hash of the files whose fingerprint collides with another file.
+
+    Args:
+        series_id (Optional[int], optional): Only fingerprint the files of
+            this series. Collisions with files of other series are still
+            resolved. Defaults to None.
+
+    Returns:
+        Dict[str, int]: The number of files that got a fingerprint and a full hash.
+    """
+    series_filter = "" if series_id is None else " AND series_id = ?"
+    params: Tuple = () if series_id is None else (series_id,)
+
+    files = [
+        (row['id'], row['file_path']) for row in execute_query(
+            "SELECT id, file_path FROM ebook_files WHERE fingerprint IS NULL" + series_filter,
+            params
+        )
+    ]
+    fingerprints = _hash_files(files, compute_fingerprint)
+    for start in range(0, len(fingerprints), BATCH_SIZE):
+        execute_many(
+            "UPDATE ebook_files SET fingerprint = ? WHERE id = ?",
+            fingerprints[start:start + BATCH_SIZE]
+        )
+
+    # Only files that share their fingerprint need the full hash
+    series_fingerprints = "" if series_id is None else (
+        " AND fingerprint IN (SELECT fingerprint FROM ebook_files WHERE series_id = ?)"
+    )
+    colliding = [
+        (row['id'], row['file_path']) for row in execute_query(f"""
+            SELECT id, file_path FROM ebook_files
+            WHERE full_hash IS NULL AND fingerprint IN (
+                SELECT fingerprint FROM ebook_files
+                WHERE fingerprint IS NOT NULL{series_fingerprints}
+                GROUP BY fingerprint
+                HAVING COUNT(*) > 1
+            )
+        """, params)
+    ]
+    full_hashes = _hash_files(colliding, compute_full_hash)
+    for start in range(0, len(full_hashes), BATCH_SIZE):
+        execute_many(
+            "UPDATE ebook_files SET full_hash = ? WHERE id = ?",
+            full_hashes[start:start + BATCH_SIZE]
+        )
+
+    if fingerprints or full_hashes:
+        LOGGER.info(f"Fingerprinted {len(fingerprints)} files, fully hashed {len(full_hashes)} files")
+    return {'fingerprinted': len(fingerprints), 'hashed': len(full_hashes)}
+
+
+def find_duplicate_files() -> List[Dict[str, Any]]:
+    """Find e-book files that are stored more than once.
+
+    Files are duplicates when they have the same full hash. Rows that point
+    to the same path are counted once.
+
+    Returns:
+        List[Dict[str, Any]]: The groups of duplicates, the most space that
+        can be reclaimed first. Every group has the `full_hash`, the
+        `file_size`, the `files` and the `reclaimable` bytes when keeping
+        one copy.
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for row in execute_query("""
+        SELECT f.id, f.series_id, f.volume_id, f.file_path, f.file_name, f.file_size,
+               f.full_hash, s.title AS series_title, v.volume_number
+        FROM ebook_files f
+        LEFT JOIN series s ON s.id = f.series_id
+        LEFT JOIN volumes v ON v.id = f.volume_id
+        WHERE f.full_hash IS NOT NULL AND f.full_hash IN (
+            SELECT full_hash FROM ebook_files
+            WHERE full_hash IS NOT NULL
+            GROUP BY full_hash
+            HAVING COUNT(*) > 1
+        )
+        ORDER BY f.full_hash, f.id
+    """):
+        group = groups.setdefault(row.pop('full_hash'), {'paths': set(), 'files': []})
+        path_key = normalize_path(row['file_path'])
+        if path_key in group['paths']:
+            continue
+        group['paths'].add(path_key)
+        group['files'].append(row)
+
+    duplicates = []
+    for full_hash, group in groups.items():
+        files = group['files']
+        if len(files) < 2:
+            continue
+        file_size = files[0]['file_size'] or 0
+        duplicates.append({
+            'full_hash': full_hash,
+            'file_size': file_size,
+            'files': files,
+            'reclaimable': file_size * (len(files) - 1)
+        })
+
+    duplicates.sort(key=lambda group: group['reclaimable'], reverse=True)
+    return duplicates
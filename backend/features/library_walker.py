@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Single-pass walker for the library root folders.
+
+The root folders are walked once with `os.scandir`, every entry is stat'ed
+once, and the result is kept as an in-memory tree. Series discovery and the
+e-book scan both work on that tree instead of listing the folders again.
+The series folders are walked in parallel, which mostly helps on network
+filesystems where every `stat` is a round trip.
+"""
+
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.base.helpers import read_metadata_from_readme
+from backend.base.logging import LOGGER
+
+
+# Threads that walk series folders at the same time
+DEFAULT_WALK_WORKERS = 8
+
+README_FILE = "README.txt"
+
+
+@dataclass
+class FileNode:
+    """A file found by the walker."""
+    path: Path
+    stat_result: os.stat_result
+
+
+@dataclass
+class DirNode:
+    """A folder found by the walker, with everything below it."""
+    path: Path
+    stat_result: Optional[os.stat_result] = None
+    files: List[FileNode] = field(default_factory=list)
+    subdirs: List["DirNode"] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def has_readme(self) -> bool:
+        return any(f.path.name == README_FILE for f in self.files)
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether every folder in the tree could be listed."""
+        return self.error is None and all(subdir.is_complete for subdir in self.subdirs)
+
+    def read_readme(self) -> dict:
+        """Read the metadata from the README.txt of this folder.
+
+        Returns:
+            dict: The metadata, or an empty dict if there is no README.txt.
+        """
+        if not self.has_readme:
+            return {}
+        return read_metadata_from_readme(self.path)
+
+    def iter_entries(self) -> Iterator[Tuple[Path, os.stat_result]]:
+        """Yield this folder and every folder and file below it.
+
+        Yields:
+            Tuple[Path, os.stat_result]: The path and state of each entry.
+        """
+        if self.stat_result is not None:
+            yield self.path, self.stat_result
+        for file_node in self.files:
+            yield file_node.path, file_node.stat_result
+        for subdir in self.subdirs:
+            yield from subdir.iter_entries()
+
+
+def _scan_level(node: DirNode, follow_symlinks: bool = False) -> List[Tuple[Path, os.DirEntry]]:
+    """Fill the files of a folder and return its subfolders.
+
+    Args:
+        node (DirNode): The folder.
+        follow_symlinks (bool, optional): Also return symlinked subfolders.
+            Defaults to False.
+
+    Returns:
+        List[Tuple[Path, os.DirEntry]]: The subfolders.
+    """
+    subdirs = []
+    try:
+        with os.scandir(node.path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=follow_symlinks):
+                        subdirs.append((Path(entry.path), entry))
+                    elif entry.is_file():
+                        node.files.append(FileNode(Path(entry.path), entry.stat()))
+                except OSError as e:
+                    LOGGER.debug(f"Could not get state of {entry.path}: {e}")
+    except OSError as e:
+        LOGGER.error(f"Error listing files in directory {node.path}: {e}")
+        node.error = str(e)
+    return subdirs
+
+
+def walk_directory(path: Path, stat_result: Optional[os.stat_result] = None) -> DirNode:
+    """Walk a folder and everything below it.
+
+    Args:
+        path (Path): The folder.
+        stat_result (Optional[os.stat_result], optional): The state of the folder,
+            if already known. Defaults to None.
+
+    Returns:
+        DirNode: The tree of the folder.
+    """
+    if stat_result is None:
+        try:
+            stat_result = path.stat()
+        except OSError as e:
+            return DirNode(path, error=str(e))
+
+    root = DirNode(path, stat_result)
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        # Like a recursive glob, symlinked folders inside the folder are not
+        # followed, which also prevents loops
+        for subdir_path, entry in _scan_level(node):
+            try:
+                subdir = DirNode(subdir_path, entry.stat(follow_symlinks=False))
+            except OSError as e:
+                LOGGER.debug(f"Could not get state of {subdir_path}: {e}")
+                continue
+            node.subdirs.append(subdir)
+            pending.append(subdir)
+
+    # Keep the order stable, like sorted directory listings
+    _sort_tree(root)
+    return root
+
+
+def _sort_tree(node: DirNode) -> None:
+    """Sort the files and folders of a tree by name."""
+    node.files.sort(key=lambda f: f.path.name)
+    node.subdirs.sort(key=lambda d: d.path.name)
+    for subdir in node.subdirs:
+        _sort_tree(subdir)
+
+
+def walk_library(root_paths: Iterable[Path], max_workers: int = DEFAULT_WALK_WORKERS) -> Dict[Path, DirNode]:
+    """Walk the root folders, walking their series folders in parallel.
+
+    Args:
+        root_paths (Iterable[Path]): The root folders.
+        max_workers (int, optional): The maximum number of folders walked at the
+            same time. Defaults to DEFAULT_WALK_WORKERS.
+
+    Returns:
+        Dict[Path, DirNode]: The tree of every root folder that exists, by path.
+    """
+    roots: Dict[Path, DirNode] = {}
+    series_entries: List[Tuple[DirNode, Path, os.DirEntry]] = []
+
+    for root_path in dict.fromkeys(root_paths):
+        try:
+            root_stat = root_path.stat()
+        except OSError:
+            root_stat = None
+        if root_stat is None or not stat.S_ISDIR(root_stat.st_mode):
+            LOGGER.warning(f"Root folder does not exist or is not a directory: {root_path}")
+            continue
+
+        root = DirNode(root_path, root_stat)
+        roots[root_path] = root
+        # Symlinked series folders are followed
+        for subdir_path, entry in _scan_level(root, follow_symlinks=True):
+            series_entries.append((root, subdir_path, entry))
+
+    def walk_series(item: Tuple[DirNode, Path, os.DirEntry]) -> Tuple[DirNode, DirNode]:
+        root, subdir_path, entry = item
+        try:
+            stat_result = entry.stat()
+        except OSError as e:
+            return root, DirNode(subdir_path, error=str(e))
+        return root, walk_directory(subdir_path, stat_result)
+
+    if series_entries:
+        workers = max(1, min(max_workers, len(series_entries)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="library-walker") as executor:
+            for root, series_node in executor.map(walk_series, series_entries):
+                if series_node.stat_result is not None:
+                    root.subdirs.append(series_node)
+
+    for root in roots.values():
+        root.files.sort(key=lambda f: f.path.name)
+        root.subdirs.sort(key=lambda d: d.path.name)
+
+    LOGGER.info(
+        f"Walked {len(roots)} root folders with {len(series_entries)} series folders "
+        f"using {min(max_workers, max(1, len(series_entries)))} threads"
+    )
+    return roots
+
+
+def find_node(roots: Dict[Path, DirNode], path: Path) -> Optional[DirNode]:
+    """Find the tree of a folder in the walked root folders.
+
+    Args:
+        roots (Dict[Path, DirNode]): The walked root folders.
+        path (Path): The folder to find.
+
+    Returns:
+        Optional[DirNode]: The tree of the folder, or None if it was not walked.
+    """
+    for root_path, root in roots.items():
+        try:
+            relative = path.relative_to(root_path)
+        except ValueError:
+            continue
+
+        node = root
+        for part in relative.parts:
+            node = next((d for d in node.subdirs if d.path.name == part), None)
+            if node is None:
+                break
+        if node is not None:
+            return node
+    return None
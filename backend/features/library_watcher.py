@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Watcher that keeps the library up to date between scans.
+
+Changes in the root folders are picked up with inotify on Linux, or by
+polling the state of the folders where inotify is not available. Changes are
+debounced and grouped per series, after which only the folders of the
+affected series are scanned with `scan_for_ebooks(specific_series_id=...,
+custom_path=...)`. Changes that can not be linked to a known series, like a
+new series folder, result in one incremental scan of the library.
+
+Polling only lists the folders whose modification time changed, plus the
+folders that changed in the previous poll, so files that are still being
+written are seen until they stop growing. Other folders cost one `stat` per
+poll.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+from backend.internals.settings import Settings, get_settings_version
+
+
+# Seconds without new changes before a folder is scanned
+DEFAULT_DEBOUNCE_SECONDS = 5.0
+# Seconds after the first change at which a folder is scanned, even if it
+# keeps changing
+MAX_DELAY_SECONDS = 60.0
+# Seconds between two checks of the folders when polling
+DEFAULT_POLL_INTERVAL_SECONDS = 30.0
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class SeriesFolder(NamedTuple):
+    """A folder that holds the files of a series."""
+    series_id: int
+    path: Path
+
+
+def _get_root_paths() -> List[Path]:
+    """Get the root folders to watch from the settings.
+
+    Returns:
+        List[Path]: The root folders.
+    """
+    settings = Settings().get_settings()
+    return [Path(folder['path']) for folder in settings.root_folders or []]
+
+
+def _is_ignored(name: str) -> bool:
+    """Check whether changes to an entry should be ignored.
+
+    Hidden entries are skipped, which also covers the temporary files that
+    tools like rsync write before renaming them to their final name.
+
+    Args:
+        name (str): The name of the entry.
+
+    Returns:
+        bool: True if the entry should be ignored.
+    """
+    return name.startswith('.')
+
+
+def resolve_series_folders(folders: Set[Path], root_paths: List[Path]) -> Dict[Path, Optional[SeriesFolder]]:
+    """Link changed folders to the series folders they belong to.
+
+    A folder belongs to the series of the deepest folder above it (or the
+    folder itself) that is known from the scan manifest or is the custom
+    path of a series.
+
+    Args:
+        folders (Set[Path]): The changed folders.
+        root_paths (List[Path]): The root folders.
+
+    Returns:
+        Dict[Path, Optional[SeriesFolder]]: The series folder of every
+        folder, or None if the folder is not part of a known series.
+    """
+    candidates: Dict[Path, List[str]] = {}
+    for folder in folders:
+        root = next((r for r in root_paths if folder == r or r in folder.parents), None)
+        if root is None:
+            candidates[folder] = []
+            continue
+        # Deepest folder first, stopping at the root folder
+        candidates[folder] = [
+            str(p) for p in (folder, *folder.parents)
+            if p != root and root in p.parents
+        ]
+
+    paths = sorted({p for paths in candidates.values() for p in paths})
+    known: Dict[str, int] = {}
+    # Stay below the limit of SQLite variables
+    for start in range(0, len(paths), 500):
+        chunk = paths[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        rows = execute_query(f"""
+            SELECT path, series_id FROM scan_manifest WHERE path IN ({placeholders})
+            UNION ALL
+            SELECT custom_path, id FROM series WHERE custom_path IN ({placeholders})
+        """, tuple(chunk) * 2)
+        for row in rows:
+            known.setdefault(row['path'], row['series_id'])
+
+    return {
+        folder: next((SeriesFolder(known[p], Path(p)) for p in paths if p in known), None)
+        for folder, paths in candidates.items()
+    }
+
+
+class _InotifyBackend:
+    """Reports changed folders using inotify."""
+
+    def __init__(self, root_paths: List[Path]):
+        """Set up the watches on the root folders and everything below them.
+
+        Args:
+            root_paths (List[Path]): The root folders.
+
+        Raises:
+            OSError: inotify is not available or the watches could not be added.
+        """
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise OSError(errno.ENOSYS, "libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._add_watch.restype = ctypes.c_int
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self.root_paths = set(root_paths)
+        self.watches: Dict[int, Path] = {}
+        try:
+            for root_path in root_paths:
+                self._watch_tree(root_path)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, path: Path) -> None:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                # Removed in the meantime or not readable, nothing to watch
+                return
+            # Most likely ENOSPC: the limit of watches is reached
+            raise OSError(err, f"{os.strerror(err)}: {path}")
+        self.watches[wd] = path
+
+    def _watch_tree(self, path: Path) -> None:
+        """Watch a folder and every folder below it."""
+        self._watch(path)
+        pending = [path]
+        while pending:
+            folder = pending.pop()
+            # Like the scan, only symlinked series folders are followed
+            follow_symlinks = folder in self.root_paths
+            subdirs = []
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if not _is_ignored(entry.name) and entry.is_dir(follow_symlinks=follow_symlinks):
+                            subdirs.append(Path(entry.path))
+            except OSError as e:
+                LOGGER.debug(f"Could not list folders in {folder}: {e}")
+
+            for subdir in subdirs:
+                self._watch(subdir)
+                pending.append(subdir)
+
+    def read_changes(self, timeout: float) -> Optional[Set[Path]]:
+        """Wait for changes.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait.
+
+        Returns:
+            Optional[Set[Path]]: The changed folders, or None if changes were
+            lost because the event queue overflowed.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed: Set[Path] = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                folder = self.watches.get(wd)
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                if folder is None or (name and _is_ignored(name)):
+                    continue
+
+                changed.add(folder)
+                if name and mask & IN_ISDIR:
+                    path = folder / name
+                    changed.add(path)
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            self._watch_tree(path)
+                        except OSError as e:
+                            LOGGER.warning(f"Could not watch new folder {path}: {e}")
+
+        return None if overflow else changed
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class _FolderState(NamedTuple):
+    mtime_ns: int
+    # Hash of the name, inode, size and modification time of every file
+    files: int
+    subdirs: Tuple[Path, ...]
+
+
+class _PollingBackend:
+    """Reports changed folders by comparing the state of the root folders."""
+
+    def __init__(self, root_paths: List[Path], interval: float):
+        self.root_paths = root_paths
+        self.interval = interval
+        self.folders: Dict[Path, _FolderState] = {}
+        # Folders that changed in the last poll, listed again until they
+        # stop changing, as writing to a file doesn't change its folder
+        self.unsettled: Set[Path] = set()
+        self._poll()
+        self.next_poll = time.monotonic() + interval
+
+    @staticmethod
+    def _list_folder(path: Path, mtime_ns: int, follow_symlinks: bool) -> Optional[_FolderState]:
+        """Get the state of the entries in a folder.
+
+        Args:
+            path (Path): The folder.
+            mtime_ns (int): The modification time of the folder.
+            follow_symlinks (bool): Also return symlinked subfolders.
+
+        Returns:
+            Optional[_FolderState]: The state, or None if the folder could
+            not be listed.
+        """
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if _is_ignored(entry.name):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=follow_symlinks):
+                            subdirs.append(Path(entry.path))
+                        elif entry.is_file():
+                            stat_result = entry.stat()
+                            files.append((entry.name, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns))
+                    except OSError as e:
+                        LOGGER.debug(f"Could not get state of {entry.path}: {e}")
+        except OSError as e:
+            LOGGER.debug(f"Could not list folder {path}: {e}")
+            return None
+        return _FolderState(mtime_ns, hash(tuple(sorted(files))), tuple(sorted(subdirs)))
+
+    def _poll(self) -> Set[Path]:
+        """Update the state of the folders.
+
+        Returns:
+            Set[Path]: The folders below the root folders that changed.
+        """
+        changed: Set[Path] = set()
+        unsettled: Set[Path] = set()
+        seen: Set[Path] = set()
+        # Like the scan, only symlinked series folders are followed
+        pending = [(root, True) for root in self.root_paths]
+        while pending:
+            path, is_root = pending.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(path)
+
+            old = self.folders.get(path)
+            state = old
+            if old is None or old.mtime_ns != mtime_ns or path in self.unsettled:
+                state = self._list_folder(path, mtime_ns, follow_symlinks=is_root) or old
+            if state is None:
+                continue
+            if state != old:
+                self.folders[path] = state
+                unsettled.add(path)
+                if not is_root and (old is None or (state.files, state.subdirs) != (old.files, old.subdirs)):
+                    changed.add(path)
+            pending.extend((subdir, False) for subdir in state.subdirs)
+
+        for path in self.folders.keys() - seen:
+            del self.folders[path]
+            if path not in self.root_paths:
+                changed.add(path)
+        self.unsettled = unsettled
+        return changed
+
+    def read_changes(self, timeout: float) -> Optional[Set[Path]]:
+        """Wait for changes.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait.
+
+        Returns:
+            Optional[Set[Path]]: The changed folders.
+        """
+        wait = self.next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(0.0, wait))
+
+        changed = self._poll()
+        self.next_poll = time.monotonic() + self.interval
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class LibraryWatcher:
+    """Scans series as soon as their files change."""
+
+    def __init__(
+        self,
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+        use_inotify: bool = True
+    ):
+        """Initialize the library watcher.
+
+        Args:
+            debounce_seconds (float, optional): Seconds without new changes
+                before a folder is scanned. Defaults to DEFAULT_DEBOUNCE_SECONDS.
+            poll_interval (float, optional): Seconds between two checks of the
+                folders when inotify is not used. Defaults to DEFAULT_POLL_INTERVAL_SECONDS.
+            use_inotify (bool, optional): Use inotify when it is available.
+                Defaults to True.
+        """
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        # Changed folder -> (first change, last change)
+        self.pending: Dict[Path, List[float]] = {}
+        self.rescan_library = False
+
+    def start(self) -> None:
+        """Start watching the root folders."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self._watch_handler, name="library-watcher")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop watching the root folders."""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def _create_backend(self, root_paths: List[Path]):
+        if self.use_inotify:
+            try:
+                backend = _InotifyBackend(root_paths)
+                LOGGER.info(f"Watching {len(root_paths)} root folders with inotify ({len(backend.watches)} folders)")
+                return backend
+            except OSError as e:
+                LOGGER.warning(f"Could not use inotify, falling back to polling: {e}")
+
+        LOGGER.info(f"Watching {len(root_paths)} root folders by polling every {self.poll_interval} seconds")
+        return _PollingBackend(root_paths, self.poll_interval)
+
+    def _watch_handler(self) -> None:
+        """Collect changes and scan the affected series."""
+        backend = None
+        settings_version = None
+        root_paths: List[Path] = []
+
+        while self.running:
+            try:
+                # Pick up changed root folders
+                if settings_version != get_settings_version():
+                    settings_version = get_settings_version()
+                    new_root_paths = _get_root_paths()
+                    if backend is None or new_root_paths != root_paths:
+                        if backend is not None:
+                            backend.close()
+                        root_paths = new_root_paths
+                        backend = self._create_backend(root_paths)
+
+                changed = backend.read_changes(timeout=1.0)
+                now = time.monotonic()
+                if changed is None:
+                    LOGGER.warning("Missed library changes, scanning the whole library")
+                    self.rescan_library = True
+                    changed = set()
+                for folder in changed:
+                    self.pending.setdefault(folder, [now, now])[1] = now
+
+                self._flush(root_paths, now)
+
+            except Exception as e:
+                LOGGER.error(f"Error in library watcher: {e}")
+                for _ in range(60):
+                    if not self.running:
+                        break
+                    time.sleep(1)
+
+        if backend is not None:
+            backend.close()
+
+    def _flush(self, root_paths: List[Path], now: float) -> None:
+        """Scan the series of the folders that stopped changing.
+
+        Args:
+            root_paths (List[Path]): The root folders.
+            now (float): The current monotonic time.
+        """
+        due = {
+            folder for folder, (first, last) in self.pending.items()
+            if now - last >= self.debounce_seconds or now - first >= MAX_DELAY_SECONDS
+        }
+        if not due and not self.rescan_library:
+            return
+        for folder in due:
+            del self.pending[folder]
+
+        from backend.features.ebook_files import scan_for_ebooks
+
+        series_folders: Set[SeriesFolder] = set()
+        for series_folder in resolve_series_folders(due, root_paths).values():
+            if series_folder is None or not series_folder.path.is_dir():
+                # A new series folder, something outside of a series, or a
+                # series folder that was removed or renamed
+                self.rescan_library = True
+            else:
+                series_folders.add(series_folder)
+
+        if self.rescan_library:
+            self.rescan_library = False
+            LOGGER.info("Library changed outside of known series, running an incremental scan")
+            scan_for_ebooks()
+            return
+
+        for series_id, path in sorted(series_folders):
+            if not self.running:
+                break
+            LOGGER.info(f"Files of series {series_id} changed, scanning {path}")
+            result = scan_for_ebooks(specific_series_id=series_id, custom_path=str(path))
+            if 'error' in result:
+                LOGGER.warning(f"Scan of series {series_id} failed: {result['error']}")
@@ -11,8 +11,9 @@ import calendar
 from datetime import datetime, timedelta, date
 from typing import Dict, List, Any, Optional, Union, Tuple
 
-import requests
 
+from backend.internals.http_client import create_session
+from backend.features.release_schedules import ReleaseSchedule, schedule_chapters
 from ..base import MetadataProvider
 from ..anilist_client import make_graphql_request
 from ..anilist_constants import KNOWN_VOLUMES, POPULAR_MANGA_PATTERNS
@@ -42,7 +43,7 @@ class AniListProvider(MetadataProvider):
             "Accept": "application/json",
             "User-Agent": "Readloom/1.0.0",
         }
-        self.session = requests.Session()
+        self.session = create_session()
 
         # Initialize the manga info provider if available
         self.info_provider = None
@@ -380,7 +381,6 @@ class AniListProvider(MetadataProvider):
             if not manga_details:
                 return {"chapters": []}
 
-            chapters: List[Dict[str, Any]] = []
             total_chapters = manga_details.get("chapters", 0)
             # Use volume_count which already has scraped data from get_manga_details()
             total_volumes = manga_details.get("volume_count", 0)
@@ -442,57 +442,52 @@ class AniListProvider(MetadataProvider):
                 except (ValueError, TypeError):
                     end_date_dt = None
 
+            # The chapters are projected, so they are described as schedules
+            schedules: List[ReleaseSchedule] = []
             if not end_date_dt or manga_details.get("status") == "ONGOING":
                 future_chapters = max(3, int(total_chapters * 0.1))
-                if future_chapters > 0:
-                    past_chapters = total_chapters - future_chapters
+                past_chapters = total_chapters - future_chapters
 
-                    if past_chapters > 1:
-                        past_interval = (datetime.now() - start_date_dt) / past_chapters
-                    else:
-                        past_interval = timedelta(days=14)
-
-                    publication_day, future_interval = determine_publication_schedule(
-                        manga_details
-                    )
-
-                    for i in range(1, total_chapters + 1):
-                        if i <= past_chapters:
-                            chapter_date = start_date_dt + (past_interval * (i - 1))
-                        else:
-                            future_i = i - past_chapters
-                            base_next_date = datetime.now() + (future_interval * future_i)
-                            days_to_add = (publication_day - base_next_date.weekday()) % 7
-                            chapter_date = base_next_date + timedelta(days=days_to_add)
+                if past_chapters > 1:
+                    past_interval = (datetime.now() - start_date_dt) / past_chapters
+                else:
+                    past_interval = timedelta(days=14)
 
-                        is_confirmed = i <= past_chapters
+                publication_day, future_interval = determine_publication_schedule(
+                    manga_details
+                )
 
-                        chapters.append(
-                            {
-                                "id": f"{manga_id}_{i}",
-                                "number": str(i),
-                                "title": f"Chapter {i}",
-                                "date": chapter_date.strftime("%Y-%m-%d"),
-                                "source": self.name,
-                                "is_confirmed_date": 1 if is_confirmed else 0,
-                            }
-                        )
+                if past_chapters > 0:
+                    schedules.append(ReleaseSchedule(
+                        first_number=1,
+                        start=start_date_dt,
+                        interval=past_interval,
+                        count=past_chapters,
+                        confirmed=True
+                    ))
+
+                first_future = max(1, past_chapters + 1)
+                schedules.append(ReleaseSchedule(
+                    first_number=first_future,
+                    start=datetime.now() + future_interval * (first_future - past_chapters),
+                    interval=future_interval,
+                    count=total_chapters - first_future + 1,
+                    weekday=publication_day
+                ))
             else:
-                interval = (end_date_dt - start_date_dt) / total_chapters
-                for i in range(1, total_chapters + 1):
-                    chapter_date = start_date_dt + (interval * (i - 1))
-                    chapters.append(
-                        {
-                            "id": f"{manga_id}_{i}",
-                            "number": str(i),
-                            "title": f"Chapter {i}",
-                            "date": chapter_date.strftime("%Y-%m-%d"),
-                            "source": self.name,
-                            "is_confirmed_date": 1,
-                        }
-                    )
-
-            return {"chapters": chapters}
+                schedules.append(ReleaseSchedule(
+                    first_number=1,
+                    start=start_date_dt,
+                    interval=(end_date_dt - start_date_dt) / total_chapters,
+                    count=total_chapters,
+                    confirmed=True
+                ))
+
+            schedules = [schedule for schedule in schedules if schedule.count > 0]
+            return {
+                "chapters": schedule_chapters(schedules, manga_id, self.name),
+                "schedule": [schedule.to_dict() for schedule in schedules]
+            }
         except Exception as e:
             self.logger.error(f"Error getting chapter list from AniList: {e}")
             return {"chapters": []}
@@ -6,15 +6,64 @@ Base classes for metadata providers.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any, Union
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Any, Union
 import logging
+import threading
+import time
 
 from backend.base.logging import LOGGER
+from backend.internals.http_client import request_deadline
+
+# Threads shared by all fan-outs to the providers
+FAN_OUT_WORKERS = 8
+
+# Seconds a provider gets to answer in a fan-out, unless it sets its own deadline
+PROVIDER_DEADLINE = 10.0
+
+# Seconds a whole fan-out may take
+FAN_OUT_BUDGET = 15.0
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared by all fan-outs, creating it on first use."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=FAN_OUT_WORKERS,
+                thread_name_prefix="provider"
+            )
+        return _EXECUTOR
+
+
+def _call_until(deadline: float, call: Callable[["MetadataProvider"], List[Dict[str, Any]]], provider: "MetadataProvider") -> List[Dict[str, Any]]:
+    """Call a provider, with its requests not waiting for a rate limit past the deadline."""
+    with request_deadline(deadline):
+        return call(provider)
+
+
+class ProviderResults(dict):
+    """The results of a fan-out, by provider name.
+
+    Providers that didn't answer before their deadline have an empty
+    result, and are listed in `timed_out`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timed_out: List[str] = []
 
 
 class MetadataProvider(ABC):
     """Base class for metadata providers."""
 
+    # Seconds the provider gets to answer in a fan-out to all providers
+    deadline: float = PROVIDER_DEADLINE
+
     def __init__(self, name: str, enabled: bool = True):
         """Initialize the metadata provider.
         
@@ -144,6 +193,55 @@ class MetadataProviderManager:
         """
         return {name: provider for name, provider in self.providers.items() if provider.enabled}
 
+    def _fan_out(self, call: Callable[[MetadataProvider], List[Dict[str, Any]]], action: str) -> ProviderResults:
+        """Call all enabled providers concurrently.
+
+        Every provider gets until its deadline, and all of them together
+        until the budget of the fan-out, so a slow provider doesn't hold up
+        the others. Providers that are too late keep running in the
+        background, but their result is dropped.
+
+        Args:
+            call: Calls a provider and returns its result.
+            action: What is done, for the log.
+
+        Returns:
+            The results by provider name, in the order of the providers.
+        """
+        providers = self.get_enabled_providers()
+        start = time.monotonic()
+        executor = _get_executor()
+
+        deadlines = {
+            name: start + min(provider.deadline, FAN_OUT_BUDGET)
+            for name, provider in providers.items()
+        }
+
+        futures: Dict[str, Future] = {}
+        for name, provider in providers.items():
+            futures[name] = executor.submit(_call_until, deadlines[name], call, provider)
+
+        # Waiting in the order of the deadlines waits for every provider
+        # until its own deadline at most
+        answers: Dict[str, List[Dict[str, Any]]] = {}
+        timed_out = set()
+        for name in sorted(futures, key=deadlines.__getitem__):
+            future = futures[name]
+            try:
+                answers[name] = future.result(timeout=max(0.0, deadlines[name] - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                self.logger.warning(f"Provider {name} did not answer in time when {action}")
+                answers[name] = []
+                timed_out.add(name)
+            except Exception as e:
+                self.logger.error(f"Error {action} with provider {name}: {e}")
+                answers[name] = []
+
+        results = ProviderResults((name, answers[name]) for name in providers)
+        results.timed_out = [name for name in providers if name in timed_out]
+        return results
+
     def search_all(self, query: str, page: int = 1) -> Dict[str, List[Dict[str, Any]]]:
         """Search for manga across all enabled providers.
         
@@ -154,18 +252,14 @@ class MetadataProviderManager:
         Returns:
             A dictionary mapping provider names to search results.
         """
-        results = {}
-        for name, provider in self.get_enabled_providers().items():
-            try:
-                results[name] = provider.search(query, page)
-            except Exception as e:
-                self.logger.error(f"Error searching with provider {name}: {e}")
-                results[name] = []
-        return results
+        return self._fan_out(lambda provider: provider.search(query, page), "searching")
         
     def search_all_with_type(self, query: str, page: int = 1, search_type: str = "title") -> Dict[str, List[Dict[str, Any]]]:
         """Search for manga across all enabled providers with search type.
         
+        The providers are searched concurrently. Providers that don't answer
+        in time have no results, and are listed in `timed_out` of the result.
+        
         Args:
             query: The search query.
             page: The page number.
@@ -174,37 +268,28 @@ class MetadataProviderManager:
         Returns:
             A dictionary mapping provider names to search results.
         """
-        results = {}
-        for name, provider in self.get_enabled_providers().items():
-            try:
-                # Check if the provider supports the search_type parameter
-                if "search_type" in provider.search.__code__.co_varnames:
-                    results[name] = provider.search(query, page, search_type)
-                else:
-                    # Fallback for providers that don't support search_type
-                    results[name] = provider.search(query, page)
-            except Exception as e:
-                self.logger.error(f"Error searching with provider {name}: {e}")
-                results[name] = []
-        return results
+        def search(provider: MetadataProvider) -> List[Dict[str, Any]]:
+            # Check if the provider supports the search_type parameter
+            if "search_type" in provider.search.__code__.co_varnames:
+                return provider.search(query, page, search_type)
+            # Fallback for providers that don't support search_type
+            return provider.search(query, page)
+
+        return self._fan_out(search, "searching")
 
     def get_latest_releases_all(self, page: int = 1) -> Dict[str, List[Dict[str, Any]]]:
         """Get the latest manga releases across all enabled providers.
         
+        The providers are asked concurrently. Providers that don't answer in
+        time have no releases, and are listed in `timed_out` of the result.
+        
         Args:
             page: The page number.
             
         Returns:
             A dictionary mapping provider names to latest releases.
         """
-        results = {}
-        for name, provider in self.get_enabled_providers().items():
-            try:
-                results[name] = provider.get_latest_releases(page)
-            except Exception as e:
-                self.logger.error(f"Error getting latest releases with provider {name}: {e}")
-                results[name] = []
-        return results
+        return self._fan_out(lambda provider: provider.get_latest_releases(page), "getting latest releases")
 
 
 # Create a global instance of the metadata provider manager
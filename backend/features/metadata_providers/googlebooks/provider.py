@@ -10,8 +10,8 @@ import re
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Union
 
-import requests
 
+from backend.internals.http_client import create_session
 from ..base import MetadataProvider
 
 
@@ -33,7 +33,7 @@ class GoogleBooksProvider(MetadataProvider):
             "Accept": "application/json",
             "User-Agent": "Readloom/1.0.0",
         }
-        self.session = requests.Session()
+        self.session = create_session()
 
     def search(self, query: str, page: int = 1, search_type: str = "title") -> List[Dict[str, Any]]:
         """Search for books on Google Books API.
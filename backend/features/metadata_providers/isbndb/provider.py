@@ -10,8 +10,8 @@ import re
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Union
 
-import requests
 
+from backend.internals.http_client import create_session
 from ..base import MetadataProvider
 
 
@@ -38,7 +38,7 @@ class ISBNdbProvider(MetadataProvider):
         if self.api_key:
             self.headers["Authorization"] = self.api_key
             
-        self.session = requests.Session()
+        self.session = create_session()
 
     def search(self, query: str, page: int = 1) -> List[Dict[str, Any]]:
         """Search for books on ISBNdb.
@@ -5,7 +5,6 @@
 Jikan API client for MyAnimeList.
 """
 
-import time
 from typing import Dict, Any, Optional
 import requests
 import logging
@@ -14,17 +13,18 @@ logger = logging.getLogger(__name__)
 
 
 def make_request(session: requests.Session, base_url: str, endpoint: str, 
-                headers: Dict[str, str], params: Optional[Dict[str, Any]] = None, 
-                rate_limit_delay: float = 0.4) -> Dict[str, Any]:
+                headers: Dict[str, str], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Make a request to the Jikan API.
     
+    The session is expected to come from `create_session()`, which keeps
+    to the rate limit of the Jikan API.
+    
     Args:
         session: The requests session.
         base_url: The base URL for the API.
         endpoint: The API endpoint.
         headers: The request headers.
         params: The query parameters.
-        rate_limit_delay: Delay between requests to respect rate limits.
         
     Returns:
         The JSON response.
@@ -32,9 +32,6 @@ def make_request(session: requests.Session, base_url: str, endpoint: str,
     url = f"{base_url}/{endpoint}"
     try:
         logger.info(f"Making request to {url} with params {params}")
-        # Rate limiting
-        time.sleep(rate_limit_delay)
-        
         response = session.get(url, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         logger.info(f"Request successful, status code: {response.status_code}")
@@ -14,6 +14,3 @@ DEFAULT_HEADERS = {
     "User-Agent": "Readloom/1.0.0",
     "Accept": "application/json"
 }
-
-# Rate limiting
-RATE_LIMIT_DELAY = 0.4  # seconds, Jikan API has a rate limit of 3 requests per second
@@ -6,11 +6,11 @@ Jikan API metadata provider for MyAnimeList.
 Documentation: https://docs.api.jikan.moe/
 """
 
-import requests
 from typing import Dict, List, Any
 
+from backend.internals.http_client import create_session
 from ..base import MetadataProvider
-from .constants import BASE_URL, MAL_URL, DEFAULT_HEADERS, RATE_LIMIT_DELAY
+from .constants import BASE_URL, MAL_URL, DEFAULT_HEADERS
 from .client import make_request
 from .mapper import map_search_results, map_manga_details, map_latest_releases
 from .chapters import generate_chapter_list
@@ -29,8 +29,7 @@ class JikanProvider(MetadataProvider):
         self.base_url = BASE_URL
         self.mal_url = MAL_URL
         self.headers = DEFAULT_HEADERS
-        self.session = requests.Session()
-        self.rate_limit_delay = RATE_LIMIT_DELAY
+        self.session = create_session()
 
     def _make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Make a request to the Jikan API.
@@ -48,8 +47,7 @@ class JikanProvider(MetadataProvider):
                 self.base_url, 
                 endpoint, 
                 self.headers, 
-                params, 
-                self.rate_limit_delay
+                params
             )
         except Exception as e:
             self.logger.error(f"Error making request to {endpoint}: {e}")
@@ -11,6 +11,7 @@ from typing import Dict, List, Any, Optional
 import requests
 from urllib.parse import quote
 
+from backend.internals.http_client import create_session
 from .base import MetadataProvider
 
 
@@ -30,7 +31,7 @@ class MangaAPIProvider(MetadataProvider):
             "User-Agent": "Readloom/1.0.0",
             "Accept": "application/json"
         }
-        self.session = requests.Session()
+        self.session = create_session()
 
     def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Make a request to the Manga-API.
@@ -6,8 +6,8 @@ MangaDex metadata provider implementation.
 """
 
 from typing import Dict, List, Any, Optional
-import requests
 
+from backend.internals.http_client import create_session
 from ..base import MetadataProvider
 from ..mangadex_client import (
     search_manga,
@@ -37,7 +37,7 @@ class MangaDexProvider(MetadataProvider):
         super().__init__("MangaDex", enabled)
         self.base_url = BASE_URL
         self.headers = DEFAULT_HEADERS.copy()
-        self.session = requests.Session()
+        self.session = create_session()
 
     def search(self, query: str, page: int = 1) -> List[Dict[str, Any]]:
         """Search for manga on MangaDex.
@@ -8,6 +8,7 @@ MangaFire metadata provider implementation.
 from typing import Dict, List, Any, Optional
 import requests
 
+from backend.internals.http_client import create_session
 from ..base import MetadataProvider
 from ..mangafire_client import make_request
 from ..mangafire_constants import DEFAULT_HEADERS, BASE_URL, SEARCH_URL, MANGA_URL, LATEST_URL
@@ -36,7 +37,7 @@ class MangaFireProvider(MetadataProvider):
         self.latest_url = LATEST_URL
         self.headers = DEFAULT_HEADERS.copy()
         self.headers["Referer"] = self.base_url
-        self.session = requests.Session()
+        self.session = create_session()
 
     def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
         """Make a request to the MangaFire API.
@@ -13,6 +13,7 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import quote
 
+from backend.internals.http_client import create_session
 from .base import MetadataProvider
 
 
@@ -40,7 +41,7 @@ class MangaFireDebugProvider(MetadataProvider):
             "Upgrade-Insecure-Requests": "1",
             "Cache-Control": "max-age=0"
         }
-        self.session = requests.Session()
+        self.session = create_session()
 
     def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
         """Make a request to the MangaFire API.
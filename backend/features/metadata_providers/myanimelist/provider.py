@@ -6,8 +6,8 @@ MyAnimeList metadata provider implementation.
 """
 
 from typing import Dict, List, Any, Optional
-import requests
 
+from backend.internals.http_client import create_session
 from ..base import MetadataProvider
 from ..myanimelist_client import (
     search_manga,
@@ -38,7 +38,7 @@ class MyAnimeListProvider(MetadataProvider):
         self.headers = {
             "X-MAL-CLIENT-ID": client_id
         }
-        self.session = requests.Session()
+        self.session = create_session()
 
     def search(self, query: str, page: int = 1) -> List[Dict[str, Any]]:
         """Search for manga on MyAnimeList.
@@ -12,8 +12,8 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional, Union
 from urllib.parse import quote_plus
 
-import requests
 
+from backend.internals.http_client import create_session
 from ..base import MetadataProvider
 
 
@@ -34,7 +34,7 @@ class WorldCatProvider(MetadataProvider):
             "Accept": "application/atom+xml",
             "User-Agent": "Readloom/1.0.0",
         }
-        self.session = requests.Session()
+        self.session = create_session()
         
         # Define namespaces for XML parsing
         self.namespaces = {
@@ -6,7 +6,10 @@
 Re-exports all public functions from facade.
 """
 
-from .cache import save_to_cache, get_from_cache, clear_cache
+from .cache import (
+    save_to_cache, get_from_cache, clear_cache, sweep_metadata_cache,
+    get_cache_stats
+)
 from .facade import (
     init_metadata_service,
     search_manga,
@@ -25,6 +28,8 @@ __all__ = [
     "save_to_cache",
     "get_from_cache",
     "clear_cache",
+    "sweep_metadata_cache",
+    "get_cache_stats",
     
     # Facade functions
     "init_metadata_service",
@@ -3,46 +3,123 @@
 
 """
 Caching helpers for metadata_service.
+
+The cache has two tiers. The metadata_cache table keeps cached data across
+restarts, and an in-process LRU in front of it answers repeated lookups
+without a query. Data is kept for `metadata_cache_days` days, or a shorter
+time given when it is saved. Expired rows are removed by
+`sweep_metadata_cache()`, which the task handler runs periodically.
 """
 
 import json
-from datetime import datetime
-from typing import Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
 
 from backend.base.logging import LOGGER
-from backend.internals.db import execute_query
+from backend.internals.db import execute_query, transaction
+from backend.internals.settings import Settings, get_settings_version
+
+# Most entries kept in memory
+MEMORY_CACHE_SIZE = 512
+
+_SQL_TIME = "%Y-%m-%d %H:%M:%S"
+
+
+class _MemoryEntry(NamedTuple):
+    provider: str
+    created_at: float
+    expires_at: float
+    # The data is kept as JSON, so callers can't change the cached data
+    # through the objects they get
+    data: str
+
+
+class _CacheState:
+    """The memory tier and the counters of the cache."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Tuple[str, str], _MemoryEntry]" = OrderedDict()
+        self.counters: Dict[str, int] = {
+            "memory_hits": 0,
+            "database_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+        self.settings_version: Optional[int] = None
+        self.max_age_days = 7
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[counter] += amount
+
+    def remember(self, key: Tuple[str, str], entry: _MemoryEntry) -> None:
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > MEMORY_CACHE_SIZE:
+                self.entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
 
+_STATE = _CacheState()
 
-def save_to_cache(id: str, type: str, data: Any) -> bool:
+
+def _get_max_age_days() -> int:
+    """Get the `metadata_cache_days` setting, re-read when the settings change."""
+    version = get_settings_version()
+    if _STATE.settings_version != version:
+        _STATE.max_age_days = Settings().get_settings().metadata_cache_days
+        _STATE.settings_version = version
+    return _STATE.max_age_days
+
+
+def _sql_time(timestamp: float) -> str:
+    return time.strftime(_SQL_TIME, time.gmtime(timestamp))
+
+
+def _is_valid(entry: _MemoryEntry, now: float, max_age_days: int) -> bool:
+    return entry.expires_at > now and entry.created_at > now - max_age_days * 86400
+
+
+def save_to_cache(id: str, type: str, data: Any, ttl: Optional[float] = None) -> bool:
     """Save data to the metadata cache.
 
     Args:
         id: The cache ID.
         type: The cache type.
         data: The data to cache.
+        ttl: Seconds to keep the data, if shorter than `metadata_cache_days`.
 
     Returns:
         True if successful, False otherwise.
     """
     try:
         json_data = json.dumps(data)
+        provider = id.split('_')[0]
+        now = time.time()
+        lifetime = _get_max_age_days() * 86400
+        if ttl is not None:
+            lifetime = min(lifetime, ttl)
 
-        existing = execute_query(
-            "SELECT id FROM metadata_cache WHERE id = ? AND type = ?",
-            (id, type),
+        execute_query(
+            """
+            INSERT INTO metadata_cache (type, id, provider, data, created_at, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(type, id) DO UPDATE SET
+                provider = excluded.provider,
+                data = excluded.data,
+                created_at = excluded.created_at,
+                expires_at = excluded.expires_at
+            """,
+            (type, id, provider, json_data, _sql_time(now), _sql_time(now + lifetime)),
+            commit=True
         )
 
-        if existing:
-            execute_query(
-                "UPDATE metadata_cache SET data = ?, timestamp = CURRENT_TIMESTAMP WHERE id = ? AND type = ?",
-                (json_data, id, type),
-            )
-        else:
-            execute_query(
-                "INSERT INTO metadata_cache (id, provider, type, data) VALUES (?, ?, ?, ?)",
-                (id, id.split('_')[0], type, json_data),
-            )
-
+        _STATE.remember((type, id), _MemoryEntry(provider, now, now + lifetime, json_data))
         return True
     except Exception as e:
         LOGGER.error(f"Error saving to cache: {e}")
@@ -57,36 +134,111 @@ def get_from_cache(id: str, type: str) -> Optional[Any]:
         type: The cache type.
 
     Returns:
-        The cached data, or None if not found.
+        The cached data, or None if not found or expired.
     """
     try:
-        cache_entry = execute_query(
-            "SELECT data, timestamp FROM metadata_cache WHERE id = ? AND type = ?",
-            (id, type),
-        )
+        key = (type, id)
+        now = time.time()
+        max_age_days = _get_max_age_days()
 
-        if not cache_entry:
-            return None
+        with _STATE.lock:
+            entry = _STATE.entries.get(key)
+            if entry is not None:
+                if _is_valid(entry, now, max_age_days):
+                    _STATE.entries.move_to_end(key)
+                    _STATE.counters["memory_hits"] += 1
+                    return json.loads(entry.data)
+                del _STATE.entries[key]
 
-        cache_time = datetime.fromisoformat(cache_entry[0]["timestamp"])  # type: ignore[index]
-        current_time = datetime.now()
+        rows = execute_query(
+            """
+            SELECT provider, data,
+                CAST(strftime('%s', created_at) AS INTEGER) AS created,
+                CAST(strftime('%s', expires_at) AS INTEGER) AS expires
+            FROM metadata_cache
+            WHERE type = ? AND id = ?
+            """,
+            (type, id),
+        )
+        if not rows:
+            _STATE.count("misses")
+            return None
 
-        if (current_time - cache_time).days > 7:
-            execute_query(
-                "DELETE FROM metadata_cache WHERE id = ? AND type = ?",
-                (id, type),
-            )
+        row = rows[0]
+        entry = _MemoryEntry(row["provider"], row["created"], row["expires"], row["data"])
+        if not _is_valid(entry, now, max_age_days):
+            # Left for the sweep to remove
+            _STATE.count("misses")
             return None
 
-        return json.loads(cache_entry[0]["data"])  # type: ignore[index]
+        _STATE.remember(key, entry)
+        _STATE.count("database_hits")
+        return json.loads(entry.data)
     except Exception as e:
         LOGGER.error(f"Error getting from cache: {e}")
         return None
 
 
+def sweep_metadata_cache() -> int:
+    """Remove the expired data from the metadata cache.
+
+    Returns:
+        The number of removed rows.
+    """
+    now = time.time()
+    max_age_days = _get_max_age_days()
+
+    with _STATE.lock:
+        for key in [
+            key for key, entry in _STATE.entries.items()
+            if not _is_valid(entry, now, max_age_days)
+        ]:
+            del _STATE.entries[key]
+
+    with transaction():
+        execute_query(
+            "DELETE FROM metadata_cache WHERE expires_at <= ? OR created_at <= ?",
+            (_sql_time(now), _sql_time(now - max_age_days * 86400))
+        )
+        removed = execute_query("SELECT changes() AS removed")[0]["removed"]
+    _STATE.count("expired", removed)
+    if removed:
+        LOGGER.info(f"Removed {removed} expired entries from the metadata cache")
+    return removed
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get the counters and size of the metadata cache.
+
+    Returns:
+        The hits of both tiers, the misses, the entries evicted from memory,
+        the expired rows removed, and the number of entries in both tiers.
+    """
+    with _STATE.lock:
+        stats: Dict[str, Any] = dict(_STATE.counters)
+        stats["memory_entries"] = len(_STATE.entries)
+
+    try:
+        stats["database_entries"] = execute_query(
+            "SELECT COUNT(*) AS entries FROM metadata_cache"
+        )[0]["entries"]
+    except Exception as e:
+        LOGGER.error(f"Error counting cache entries: {e}")
+        stats["database_entries"] = None
+    return stats
+
+
 def clear_cache(provider: Optional[str] = None, type: Optional[str] = None):
     """Clear entries from the metadata cache."""
     try:
+        with _STATE.lock:
+            for key in [
+                key for key, entry in _STATE.entries.items()
+                if (not provider or entry.provider == provider)
+                and (not type or key[0] == type)
+            ]:
+                del _STATE.entries[key]
+
         if provider and type:
             execute_query(
                 "DELETE FROM metadata_cache WHERE provider = ? AND type = ?",
@@ -11,7 +11,9 @@ from typing import Dict, List, Any, Optional, Union
 
 from backend.base.logging import LOGGER
 from backend.features.metadata_providers.setup import initialize_providers, get_provider_settings, update_provider_settings
-from .cache import save_to_cache, get_from_cache, clear_cache
+from backend.features.release_schedules import ReleaseSchedule, save_release_schedules, unscheduled_chapters
+from .cache import save_to_cache, get_from_cache
+from .search_cache import SEARCH_CACHE, make_search_key
 from .provider_gateway import (
     search_with_provider,
     search_with_all_providers,
@@ -134,7 +136,7 @@ def find_mangadex_equivalent(anilist_id: str, series_title: str) -> Optional[str
         The MangaDex ID or None if not found
     """
     try:
-        import requests
+        from backend.internals import http_client
         
         # Try different search terms
         search_terms = [
@@ -151,7 +153,7 @@ def find_mangadex_equivalent(anilist_id: str, series_title: str) -> Optional[str
         
         for term in search_terms:
             try:
-                response = requests.get(
+                response = http_client.get(
                     "https://api.mangadex.org/manga",
                     params={"title": term, "limit": 10, "includes[]": "cover_art"},
                     timeout=10
@@ -186,6 +188,24 @@ def find_mangadex_equivalent(anilist_id: str, series_title: str) -> Optional[str
         return None
 
 
+def _get_release_schedules(chapter_list_result: Any) -> List[ReleaseSchedule]:
+    """Get the release schedules from the result of `get_chapter_list()`.
+
+    Args:
+        chapter_list_result (Any): The chapter list result of a provider.
+
+    Returns:
+        List[ReleaseSchedule]: The schedules, empty if the provider has real chapters.
+    """
+    if not isinstance(chapter_list_result, dict):
+        return []
+    try:
+        return [ReleaseSchedule.from_dict(schedule) for schedule in chapter_list_result.get("schedule") or []]
+    except (KeyError, TypeError, ValueError) as e:
+        LOGGER.warning(f"Invalid release schedule from provider: {e}")
+        return []
+
+
 def populate_volumes_and_chapters(series_id: int, manga_details: Dict[str, Any], provider: str, metadata_id: Optional[str] = None) -> int:
     """Populate volumes and chapters with release dates for a series.
     
@@ -201,11 +221,12 @@ def populate_volumes_and_chapters(series_id: int, manga_details: Dict[str, Any],
     Returns:
         int: Number of chapters added
     """
-    from backend.internals.db import execute_query, get_db_connection
+    from backend.internals.db import execute_many, transaction
     
     try:
         # Get chapter list - first try from manga_details, then fetch from provider if available
         chapter_list = manga_details.get("chapters", [])
+        schedules: List[ReleaseSchedule] = []
         
         # If no chapters in manga_details and we have metadata_id, fetch actual chapters from provider
         if (not chapter_list or not isinstance(chapter_list, list)) and metadata_id:
@@ -220,6 +241,7 @@ def populate_volumes_and_chapters(series_id: int, manga_details: Dict[str, Any],
                         chapter_list = []
                     else:
                         chapter_list = chapter_list_result.get("chapters", [])
+                        schedules = _get_release_schedules(chapter_list_result)
                 elif isinstance(chapter_list_result, list):
                     chapter_list = chapter_list_result
                 else:
@@ -242,74 +264,6 @@ def populate_volumes_and_chapters(series_id: int, manga_details: Dict[str, Any],
         create_volumes = True
         volume_count = 4  # Default minimum volume count
         
-        if "volumes" in manga_details and isinstance(manga_details["volumes"], list) and manga_details["volumes"]:
-            LOGGER.info(f"Importing {len(manga_details['volumes'])} volumes from {provider}")
-            for volume in manga_details["volumes"]:
-                create_volumes = False  # We're creating them from the provider data
-                try:
-                    conn = get_db_connection()
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        """
-                        INSERT INTO volumes (
-                            series_id, volume_number, title, description, cover_url, release_date
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            series_id,
-                            volume.get("number", "0"),
-                            volume.get("title", f"Volume {volume.get('number', '0')}"),
-                            volume.get("description", ""),
-                            volume.get("cover_url", ""),
-                            volume.get("release_date", "") or volume.get("date", "")
-                        )
-                    )
-                    conn.commit()
-                    volume_id = cursor.lastrowid
-                    
-                    if volume_id:
-                        volumes[volume.get("number", "0")] = volume_id
-                except Exception as e:
-                    LOGGER.error(f"Error inserting volume: {e}")
-        
-        # Create default volumes if none provided by the API
-        if create_volumes:
-            LOGGER.info(f"Creating {volume_count} default volumes since none provided by {provider}")
-            start_date = datetime.now()  # Start from today, not the past
-            
-            for i in range(1, volume_count + 1):
-                volume_date = start_date + timedelta(days=i * 90)
-                release_date_str = volume_date.strftime("%Y-%m-%d")
-                
-                try:
-                    conn = get_db_connection()
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        """
-                        INSERT INTO volumes (
-                            series_id, volume_number, title, description, cover_url, release_date
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            series_id,
-                            str(i),
-                            f"Volume {i}",
-                            "",
-                            "",
-                            release_date_str
-                        )
-                    )
-                    conn.commit()
-                    volume_id = cursor.lastrowid
-                    
-                    if volume_id:
-                        volumes[str(i)] = volume_id
-                        LOGGER.info(f"Created default volume {i} with date {release_date_str}")
-                except Exception as e:
-                    LOGGER.error(f"Error creating default volume {i}: {e}")
-        
-        # Insert chapters
-        chapters_added = 0
         # Ensure chapter_list is actually a list (fix for when it's an int from AniList)
         # AniList returns chapter COUNT as an integer, not actual chapter data
         if not isinstance(chapter_list, list):
@@ -322,46 +276,112 @@ def populate_volumes_and_chapters(series_id: int, manga_details: Dict[str, Any],
             ]
             LOGGER.info("Created 3 placeholder chapters since provider returned chapter count instead of data")
         
-        for chapter in chapter_list:
-            # Try to determine volume number from chapter number
-            volume_number = "0"
-            if "number" in chapter:
-                try:
-                    chapter_num = float(chapter["number"])
-                    volume_number = str(max(1, int(chapter_num / 10)))
-                except (ValueError, TypeError):
-                    volume_number = "0"
-            
-            # Get volume ID if available
-            volume_id = volumes.get(volume_number, None)
-            
-            # If no matching volume, try to use volume 1
-            if volume_id is None and "1" in volumes:
-                volume_id = volumes.get("1", None)
-            
-            # Get release date - prioritize standardized format
-            chapter_date = chapter.get("date", "") or chapter.get("release_date", "")
-            
-            # Log chapter data for debugging
-            LOGGER.info(f"Importing chapter: {chapter.get('number', 'Unknown')} with date {chapter_date}")
+        # Write all volumes and chapters of the series in a single transaction
+        with transaction() as conn:
+            if "volumes" in manga_details and isinstance(manga_details["volumes"], list) and manga_details["volumes"]:
+                LOGGER.info(f"Importing {len(manga_details['volumes'])} volumes from {provider}")
+                for volume in manga_details["volumes"]:
+                    create_volumes = False  # We're creating them from the provider data
+                    try:
+                        cursor = conn.execute(
+                            """
+                            INSERT INTO volumes (
+                                series_id, volume_number, title, description, cover_url, release_date
+                            ) VALUES (?, ?, ?, ?, ?, ?)
+                            """,
+                            (
+                                series_id,
+                                volume.get("number", "0"),
+                                volume.get("title", f"Volume {volume.get('number', '0')}"),
+                                volume.get("description", ""),
+                                volume.get("cover_url", ""),
+                                volume.get("release_date", "") or volume.get("date", "")
+                            )
+                        )
+                        volume_id = cursor.lastrowid
+                        
+                        if volume_id:
+                            volumes[volume.get("number", "0")] = volume_id
+                    except Exception as e:
+                        LOGGER.error(f"Error inserting volume: {e}")
             
-            # Validate the date format
-            if chapter_date:
-                try:
-                    # Try to parse the date to verify format
-                    test_date = datetime.fromisoformat(chapter_date)
-                    # It's valid, keep it
-                except (ValueError, TypeError):
-                    # Invalid format, log warning but continue with the date
-                    LOGGER.warning(f"Potentially invalid date format: {chapter_date} for chapter {chapter.get('number', 'Unknown')}")
+            # Create default volumes if none provided by the API
+            if create_volumes:
+                LOGGER.info(f"Creating {volume_count} default volumes since none provided by {provider}")
+                start_date = datetime.now()  # Start from today, not the past
+                
+                for i in range(1, volume_count + 1):
+                    volume_date = start_date + timedelta(days=i * 90)
+                    release_date_str = volume_date.strftime("%Y-%m-%d")
+                    
+                    try:
+                        cursor = conn.execute(
+                            """
+                            INSERT INTO volumes (
+                                series_id, volume_number, title, description, cover_url, release_date
+                            ) VALUES (?, ?, ?, ?, ?, ?)
+                            """,
+                            (
+                                series_id,
+                                str(i),
+                                f"Volume {i}",
+                                "",
+                                "",
+                                release_date_str
+                            )
+                        )
+                        volume_id = cursor.lastrowid
+                        
+                        if volume_id:
+                            volumes[str(i)] = volume_id
+                            LOGGER.info(f"Created default volume {i} with date {release_date_str}")
+                    except Exception as e:
+                        LOGGER.error(f"Error creating default volume {i}: {e}")
             
-            execute_query(
-                """
-                INSERT INTO chapters (
-                    series_id, volume_id, chapter_number, title, description, release_date, status, read_status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
+            # Projected chapters are stored as release schedules instead of rows
+            scheduled = 0
+            if schedules:
+                save_release_schedules(series_id, schedules)
+                unscheduled = unscheduled_chapters(chapter_list, schedules)
+                scheduled = len(chapter_list) - len(unscheduled)
+                chapter_list = unscheduled
+
+            # Insert chapters
+            chapter_rows = []
+            for chapter in chapter_list:
+                # Try to determine volume number from chapter number
+                volume_number = "0"
+                if "number" in chapter:
+                    try:
+                        chapter_num = float(chapter["number"])
+                        volume_number = str(max(1, int(chapter_num / 10)))
+                    except (ValueError, TypeError):
+                        volume_number = "0"
+                
+                # Get volume ID if available
+                volume_id = volumes.get(volume_number, None)
+                
+                # If no matching volume, try to use volume 1
+                if volume_id is None and "1" in volumes:
+                    volume_id = volumes.get("1", None)
+                
+                # Get release date - prioritize standardized format
+                chapter_date = chapter.get("date", "") or chapter.get("release_date", "")
+                
+                # Log chapter data for debugging
+                LOGGER.debug(f"Importing chapter: {chapter.get('number', 'Unknown')} with date {chapter_date}")
+                
+                # Validate the date format
+                if chapter_date:
+                    try:
+                        # Try to parse the date to verify format
+                        test_date = datetime.fromisoformat(chapter_date)
+                        # It's valid, keep it
+                    except (ValueError, TypeError):
+                        # Invalid format, log warning but continue with the date
+                        LOGGER.warning(f"Potentially invalid date format: {chapter_date} for chapter {chapter.get('number', 'Unknown')}")
+                
+                chapter_rows.append((
                     series_id,
                     volume_id,
                     chapter.get("number", "0") or "0",  # Ensure chapter_number is never null
@@ -370,10 +390,17 @@ def populate_volumes_and_chapters(series_id: int, manga_details: Dict[str, Any],
                     chapter_date,  # Use our validated date
                     "ANNOUNCED",
                     "UNREAD"
-                )
-            )
+                ))
             
-            chapters_added += 1
+            execute_many(
+                """
+                INSERT INTO chapters (
+                    series_id, volume_id, chapter_number, title, description, release_date, status, read_status
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                chapter_rows
+            )
+            chapters_added = len(chapter_rows) + scheduled
         
         LOGGER.info(f"Populated {chapters_added} chapters for series {series_id}")
         return chapters_added
@@ -386,26 +413,15 @@ def populate_volumes_and_chapters(series_id: int, manga_details: Dict[str, Any],
 
 
 def init_metadata_service() -> None:
-    """Initialize the metadata service."""
+    """Initialize the metadata service.
+    
+    The metadata cache table is kept, so the cache survives restarts.
+    Expired data is removed by `sweep_metadata_cache()`.
+    """
     try:
         # Initialize metadata providers
         initialize_providers()
         
-        # Drop and recreate metadata cache table to ensure proper schema
-        from backend.internals.db import execute_query
-        execute_query("DROP TABLE IF EXISTS metadata_cache")
-        
-        # Create metadata cache table with proper schema
-        execute_query("""
-            CREATE TABLE IF NOT EXISTS metadata_cache (
-                id TEXT PRIMARY KEY,
-                provider TEXT NOT NULL,
-                type TEXT NOT NULL,
-                data TEXT NOT NULL,
-                timestamp TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """, commit=True)
-        
         LOGGER.info("Metadata service initialized")
     except Exception as e:
         LOGGER.error(f"Error initializing metadata service: {e}")
@@ -414,6 +430,9 @@ def init_metadata_service() -> None:
 def search_manga(query: str, provider: Optional[str] = None, page: int = 1, search_type: str = "title") -> Dict[str, Any]:
     """Search for manga across all enabled providers or a specific provider.
     
+    Results are cached for a few minutes, and identical searches that are
+    running at the same time share one search of the providers.
+    
     Args:
         query: The search query.
         provider: The provider name (optional).
@@ -424,19 +443,33 @@ def search_manga(query: str, provider: Optional[str] = None, page: int = 1, sear
         A dictionary containing search results.
     """
     try:
-        if provider:
-            # Search with a specific provider
-            results = {provider: search_with_provider(query, provider, page, search_type)}
-        else:
-            # Search with all enabled providers
-            results = search_with_all_providers(query, page, search_type)
+        def search() -> Dict[str, Any]:
+            if provider:
+                # Search with a specific provider
+                results = {provider: search_with_provider(query, provider, page, search_type)}
+            else:
+                # Search with all enabled providers
+                results = search_with_all_providers(query, page, search_type)
+            return {
+                "results": dict(results),
+                "timed_out": getattr(results, "timed_out", [])
+            }
+        
+        # Results missing providers that timed out are not kept
+        found, cached = SEARCH_CACHE.get_or_search(
+            make_search_key(query, provider, page, search_type),
+            search,
+            cacheable=lambda found: not found["timed_out"]
+        )
         
         # Format the response
         response = {
             "query": query,
             "page": page,
             "search_type": search_type,
-            "results": results,
+            "results": found["results"],
+            "timed_out": found["timed_out"],
+            "cached": cached,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -572,6 +605,7 @@ def get_latest_releases(provider: Optional[str] = None, page: int = 1) -> Dict[s
         response = {
             "page": page,
             "results": results,
+            "timed_out": getattr(results, "timed_out", []),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -615,6 +649,8 @@ def update_provider(name: str, enabled: bool, settings: Dict[str, Any]) -> Dict[
         success = update_provider_settings(name, enabled, settings)
         
         if success:
+            # Searches of all providers depend on which are enabled
+            SEARCH_CACHE.clear()
             return {
                 "success": True,
                 "message": f"Provider {name} updated successfully"
@@ -980,6 +1016,14 @@ def import_manga_to_collection(
             LOGGER.debug(f"chapter_list is not a list (got {type(chapter_list)}: {chapter_list}), skipping chapter creation")
             chapter_list = []
         
+        # Projected chapters are stored as release schedules instead of rows
+        schedules = _get_release_schedules(chapter_list_result)
+        if schedules:
+            save_release_schedules(series_id, schedules)
+            unscheduled = unscheduled_chapters(chapter_list, schedules)
+            chapters_added += len(chapter_list) - len(unscheduled)
+            chapter_list = unscheduled
+        
         for chapter in chapter_list:
             # Try to determine volume number from chapter number
             volume_number = "0"
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache of search results for metadata_service.
+
+Searches are keyed by the normalized query, the provider, the page and the
+search type, so "One Piece" and " one  piece" share results. Results are
+kept for `SEARCH_CACHE_TTL` in an in-memory LRU in front of the metadata
+cache table, which also has them after a restart. When the same search is
+already being run by another request, the request waits for its results
+instead of asking the providers again.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import clear_cache, get_from_cache, save_to_cache
+
+# Seconds search results are used for
+SEARCH_CACHE_TTL = 10 * 60
+
+# Most searches kept in memory
+SEARCH_CACHE_SIZE = 128
+
+# Type of the search results in the metadata cache table
+CACHE_TYPE = "search"
+
+SearchKey = Tuple[str, str, int, str]
+
+
+def make_search_key(query: str, provider: Optional[str], page: int, search_type: str) -> SearchKey:
+    """Get the cache key of a search.
+
+    Args:
+        query: The search query.
+        provider: The provider name, or None for all enabled providers.
+        page: The page number.
+        search_type: The type of search (title or author).
+
+    Returns:
+        The key, with the query in lowercase and its whitespace collapsed.
+    """
+    return (
+        " ".join(query.split()).casefold(),
+        provider or "",
+        int(page),
+        (search_type or "title").lower()
+    )
+
+
+class SearchCache:
+    """LRU cache of search results, with a persistent tier and deduplication."""
+
+    def __init__(self, size: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL) -> None:
+        self.size = size
+        self.ttl = ttl
+        self._results: "OrderedDict[SearchKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[SearchKey, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_id(key: SearchKey) -> str:
+        return "search_" + hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+    def get(self, key: SearchKey) -> Optional[Dict[str, Any]]:
+        """Get the results of a search, if they are not expired.
+
+        Args:
+            key: The key of the search.
+
+        Returns:
+            The results, or None if they are not cached or expired.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                if cached[0] > now:
+                    self._results.move_to_end(key)
+                    return cached[1]
+                del self._results[key]
+
+        stored = get_from_cache(self._cache_id(key), CACHE_TYPE)
+        if not stored or stored.get("expires_at", 0) <= now:
+            return None
+
+        self._remember(key, stored["expires_at"], stored["results"])
+        return stored["results"]
+
+    def put(self, key: SearchKey, results: Dict[str, Any]) -> None:
+        """Store the results of a search.
+
+        Args:
+            key: The key of the search.
+            results: The results, which must be JSON serializable.
+        """
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, results)
+        save_to_cache(self._cache_id(key), CACHE_TYPE, {
+            "expires_at": expires_at,
+            "results": results
+        }, ttl=self.ttl)
+
+    def _remember(self, key: SearchKey, expires_at: float, results: Dict[str, Any]) -> None:
+        with self._lock:
+            self._results[key] = (expires_at, results)
+            self._results.move_to_end(key)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+    def get_or_search(
+        self,
+        key: SearchKey,
+        search: Callable[[], Dict[str, Any]],
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda _: True
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Get the results of a search, running it if they are not cached.
+
+        Only one search per key runs at a time. Other requests for the same
+        key wait for it and get its results.
+
+        Args:
+            key: The key of the search.
+            search: Runs the search.
+            cacheable: Whether results may be stored, e.g. not when a
+                provider timed out. Defaults to always.
+
+        Returns:
+            The results, and whether they came from the cache or another
+            request.
+        """
+        results = self.get(key)
+        if results is not None:
+            return results, True
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                # Another request may have just finished the search
+                cached = self._results.get(key)
+                if cached is not None and cached[0] > time.time():
+                    return cached[1], True
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            results = search()
+            if cacheable(results):
+                self.put(key, results)
+            future.set_result(results)
+            return results, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def clear(self) -> None:
+        """Forget all search results."""
+        with self._lock:
+            self._results.clear()
+        # The cache IDs start with "search_", which is their provider
+        clear_cache(provider="search", type=CACHE_TYPE)
+
+
+SEARCH_CACHE = SearchCache()
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List
 
 from backend.base.logging import LOGGER
+from backend.features.release_schedules import iter_scheduled_releases
 from backend.internals.db import execute_query
 from .settings import get_notification_settings
 from .subscriptions import get_subscriptions
@@ -69,6 +70,22 @@ def check_upcoming_releases() -> List[Dict]:
                 chapter_query,
                 tuple(subscribed_series_ids) + (today, future_date)
             )
+            
+            # Projected chapters are expanded from the release schedules
+            series_filter = "AND s.id IN ({})".format(','.join('?' * len(subscribed_series_ids)))
+            for release in iter_scheduled_releases(
+                today, future_date, series_filter, tuple(subscribed_series_ids)
+            ):
+                upcoming_chapters.append({
+                    'id': None,
+                    'series_id': release['series_id'],
+                    'volume_id': None,
+                    'chapter_number': release['chapter_number'],
+                    'title': f"Chapter {release['chapter_number']}",
+                    'release_date': release['release_date'],
+                    'series_title': release['series_title'],
+                    'series_author': release['series_author']
+                })
         
         # Send notifications for upcoming releases
         notified_releases = []
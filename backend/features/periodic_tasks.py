@@ -8,7 +8,7 @@ from typing import Dict, List, Optional
 
 from backend.base.logging import LOGGER
 from backend.features.ebook_files import scan_for_ebooks
-from backend.internals.settings import Settings
+from backend.internals.settings import Settings, get_settings_version
 
 
 class PeriodicTaskManager:
@@ -30,6 +30,7 @@ class PeriodicTaskManager:
         self._stop_event = threading.Event()
         self._thread = None
         self._last_scan_time = None
+        self._settings_version = get_settings_version()
         self._settings = Settings().get_settings()
         self._scan_interval_minutes = self._settings.task_interval_minutes
     
@@ -61,6 +62,10 @@ class PeriodicTaskManager:
         
         while not self._stop_event.is_set():
             try:
+                # Pick up changed settings, like the scan interval
+                if get_settings_version() != self._settings_version:
+                    self.update_settings()
+                
                 # Check if it's time to run the scan
                 current_time = datetime.now()
                 
@@ -85,6 +90,7 @@ class PeriodicTaskManager:
     
     def update_settings(self):
         """Update settings from the database."""
+        self._settings_version = get_settings_version()
         self._settings = Settings().get_settings()
         self._scan_interval_minutes = self._settings.task_interval_minutes
         LOGGER.info(f"Updated scan interval: {self._scan_interval_minutes} minutes")
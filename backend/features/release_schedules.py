@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compact release schedules of projected chapters.
+
+Providers without real chapter data, like AniList, project the release
+dates of chapters from the start date and the publication cadence of a
+series. Instead of one chapters row and one calendar event per projected
+chapter, the projection is stored as a few schedule segments per series:
+the first chapter number, the first release, the interval between
+releases, an optional weekday the releases move to, the number of releases
+and exceptions for single chapters. The calendar, the series pages and the
+release notifications expand the segments for the dates they show only.
+"""
+
+import heapq
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_many, execute_query, transaction
+
+
+@dataclass
+class ReleaseSchedule:
+    """Releases of chapters at a fixed interval."""
+    first_number: int
+    start: datetime
+    interval: timedelta
+    count: int
+    # Day of the week the releases move forward to (0=Monday), if any
+    weekday: Optional[int] = None
+    # Whether the dates are known, or only projected
+    confirmed: bool = False
+    # Release dates of single chapters by number, None to skip the chapter
+    exceptions: Dict[int, Optional[str]] = field(default_factory=dict)
+    id: Optional[int] = None
+
+    @property
+    def last_number(self) -> int:
+        return self.first_number + self.count - 1
+
+    def release_date(self, index: int) -> date:
+        """Get the regular release date of a release in the schedule.
+
+        Args:
+            index (int): The index of the release, 0 for the first.
+
+        Returns:
+            date: The release date.
+        """
+        release = self.start + self.interval * index
+        if self.weekday is not None:
+            release += timedelta(days=(self.weekday - release.weekday()) % 7)
+        return release.date()
+
+    def _index_range(self, start: Optional[date], end: Optional[date]) -> range:
+        """Get the indexes of the releases that may fall in a date range."""
+        seconds = self.interval.total_seconds()
+        if seconds <= 0:
+            return range(self.count)
+
+        first, last = 0, self.count - 1
+        if start is not None:
+            # Moving to the weekday adds up to six days
+            earliest = datetime.combine(start, time()) - timedelta(days=6)
+            first = max(first, math.floor((earliest - self.start).total_seconds() / seconds))
+        if end is not None:
+            latest = datetime.combine(end, time()) + timedelta(days=1)
+            last = min(last, math.ceil((latest - self.start).total_seconds() / seconds))
+        return range(first, last + 1)
+
+    def expand(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Tuple[int, str]]:
+        """Yield the releases in a date range, ordered by date.
+
+        Only the releases that can fall in the range are computed, so the
+        cost depends on the range and not on the length of the schedule.
+
+        Args:
+            start (Optional[date], optional): The first day. Defaults to None.
+            end (Optional[date], optional): The last day. Defaults to None.
+
+        Yields:
+            Tuple[int, str]: The chapter number and the release date as ISO date.
+        """
+        releases = []
+        for index in self._index_range(start, end):
+            number = self.first_number + index
+            if number in self.exceptions:
+                continue
+            release = self.release_date(index)
+            if (start is None or release >= start) and (end is None or release <= end):
+                releases.append((release.isoformat(), number))
+
+        for number, release_date in self.exceptions.items():
+            if release_date is None or not self.first_number <= number <= self.last_number:
+                continue
+            if (start is None or release_date >= start.isoformat()) and (end is None or release_date <= end.isoformat()):
+                releases.append((release_date, number))
+
+        for release_date, number in sorted(releases):
+            yield number, release_date
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the schedule as JSON compatible dict, e.g. for the metadata cache."""
+        return {
+            'first_number': self.first_number,
+            'start': self.start.isoformat(),
+            'interval_seconds': self.interval.total_seconds(),
+            'count': self.count,
+            'weekday': self.weekday,
+            'confirmed': self.confirmed,
+            'exceptions': {str(number): release for number, release in self.exceptions.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReleaseSchedule":
+        """Create a schedule from the result of `to_dict()`.
+
+        Args:
+            data (Dict[str, Any]): The schedule.
+
+        Returns:
+            ReleaseSchedule: The schedule.
+        """
+        return cls(
+            first_number=int(data['first_number']),
+            start=datetime.fromisoformat(data['start']),
+            interval=timedelta(seconds=float(data['interval_seconds'])),
+            count=int(data['count']),
+            weekday=data.get('weekday'),
+            confirmed=bool(data.get('confirmed')),
+            exceptions={int(number): release for number, release in (data.get('exceptions') or {}).items()}
+        )
+
+
+def schedule_chapters(schedules: Iterable[ReleaseSchedule], manga_id: str, source: str) -> List[Dict[str, Any]]:
+    """Expand schedules into a full chapter list in the format of the providers.
+
+    Args:
+        schedules (Iterable[ReleaseSchedule]): The schedules.
+        manga_id (str): The ID of the manga at the provider.
+        source (str): The name of the provider.
+
+    Returns:
+        List[Dict[str, Any]]: The chapters, ordered by number.
+    """
+    chapters = []
+    for schedule in schedules:
+        for number, release_date in schedule.expand():
+            chapters.append({
+                "id": f"{manga_id}_{number}",
+                "number": str(number),
+                "title": f"Chapter {number}",
+                "date": release_date,
+                "source": source,
+                "is_confirmed_date": 1 if schedule.confirmed else 0,
+            })
+    chapters.sort(key=lambda chapter: int(chapter["number"]))
+    return chapters
+
+
+def unscheduled_chapters(chapters: List[Dict[str, Any]], schedules: Iterable[ReleaseSchedule]) -> List[Dict[str, Any]]:
+    """Get the chapters of a chapter list that are not covered by schedules.
+
+    Args:
+        chapters (List[Dict[str, Any]]): The chapters, in the format of the providers.
+        schedules (Iterable[ReleaseSchedule]): The schedules.
+
+    Returns:
+        List[Dict[str, Any]]: The chapters that have to be stored as rows.
+    """
+    ranges = [(schedule.first_number, schedule.last_number) for schedule in schedules]
+
+    def is_scheduled(chapter: Dict[str, Any]) -> bool:
+        try:
+            number = int(str(chapter.get("number")))
+        except ValueError:
+            return False
+        return any(first <= number <= last for first, last in ranges)
+
+    return [chapter for chapter in chapters if not is_scheduled(chapter)]
+
+
+def save_release_schedules(series_id: int, schedules: List[ReleaseSchedule]) -> int:
+    """Replace the release schedules of a series.
+
+    Chapter rows with a number the schedules cover, e.g. projected by an
+    earlier import, are removed, so the chapters are not listed twice.
+
+    Args:
+        series_id (int): The series ID.
+        schedules (List[ReleaseSchedule]): The new schedules.
+
+    Returns:
+        int: The number of schedules saved.
+    """
+    with transaction():
+        execute_query("DELETE FROM release_schedules WHERE series_id = ?", (series_id,))
+        saved = execute_many("""
+            INSERT INTO release_schedules (
+                series_id, first_number, start_at, interval_seconds,
+                release_count, weekday, confirmed, exceptions
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                series_id,
+                schedule.first_number,
+                schedule.start.isoformat(),
+                schedule.interval.total_seconds(),
+                schedule.count,
+                schedule.weekday,
+                int(schedule.confirmed),
+                json.dumps({str(number): release for number, release in schedule.exceptions.items()})
+                if schedule.exceptions else None
+            )
+            for schedule in schedules
+        ])
+        # Numbers like "12.5" are never part of a schedule
+        execute_many("""
+            DELETE FROM chapters
+            WHERE series_id = ?
+                AND CAST(chapter_number AS INTEGER) BETWEEN ? AND ?
+                AND CAST(CAST(chapter_number AS INTEGER) AS TEXT) = chapter_number
+        """, [
+            (series_id, schedule.first_number, schedule.last_number)
+            for schedule in schedules
+        ])
+
+    LOGGER.info(f"Saved {saved} release schedules for series {series_id}")
+    return saved
+
+
+def _from_row(row: Dict[str, Any]) -> ReleaseSchedule:
+    """Create a schedule from a row of the release_schedules table."""
+    return ReleaseSchedule(
+        first_number=row['first_number'],
+        start=datetime.fromisoformat(row['start_at']),
+        interval=timedelta(seconds=row['interval_seconds']),
+        count=row['release_count'],
+        weekday=row['weekday'],
+        confirmed=bool(row['confirmed']),
+        exceptions={
+            int(number): release
+            for number, release in json.loads(row['exceptions']).items()
+        } if row['exceptions'] else {},
+        id=row['id']
+    )
+
+
+def get_release_schedules(series_id: int) -> List[ReleaseSchedule]:
+    """Get the release schedules of a series.
+
+    Args:
+        series_id (int): The series ID.
+
+    Returns:
+        List[ReleaseSchedule]: The schedules, ordered by first chapter number.
+    """
+    return [
+        _from_row(row) for row in execute_query(
+            "SELECT * FROM release_schedules WHERE series_id = ? ORDER BY first_number",
+            (series_id,)
+        )
+    ]
+
+
+def iter_scheduled_releases(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    series_filter: str = "",
+    params: Tuple = ()
+) -> Iterator[Dict[str, Any]]:
+    """Yield the scheduled chapter releases in a date range, ordered by date.
+
+    Args:
+        start_date (Optional[str], optional): The first day, as ISO date.
+            Defaults to None.
+        end_date (Optional[str], optional): The last day, as ISO date.
+            Defaults to None.
+        series_filter (str, optional): SQL condition on the series `s`,
+            starting with AND. Defaults to "".
+        params (Tuple, optional): The parameters of the condition. Defaults to ().
+
+    Yields:
+        Dict[str, Any]: The `schedule_id`, `series_id`, `series_title`,
+        `series_cover_url`, `content_type`, `series_author`,
+        `chapter_number`, `release_date` and `confirmed` of every release.
+    """
+    start = date.fromisoformat(start_date[:10]) if start_date else None
+    end = date.fromisoformat(end_date[:10]) if end_date else None
+
+    rows = execute_query(f"""
+        SELECT r.*, s.title AS series_title, s.cover_url AS series_cover_url,
+               s.content_type, s.author AS series_author
+        FROM release_schedules r
+        JOIN series s ON s.id = r.series_id
+        WHERE 1=1 {series_filter}
+    """, params)
+
+    def releases(row: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        schedule = _from_row(row)
+        for number, release_date in schedule.expand(start, end):
+            yield {
+                'schedule_id': schedule.id,
+                'series_id': row['series_id'],
+                'series_title': row['series_title'],
+                'series_cover_url': row['series_cover_url'],
+                'content_type': row['content_type'],
+                'series_author': row['series_author'],
+                'chapter_number': str(number),
+                'release_date': release_date,
+                'confirmed': schedule.confirmed
+            }
+
+    yield from heapq.merge(*(releases(row) for row in rows), key=lambda release: release['release_date'])
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Background e-book scan jobs.
+
+A scan job runs `scan_for_ebooks()` on a worker thread, so the request
+that started it can return right away. Jobs run one at a time, in the
+order they were submitted. After every series folder, the job records the
+folder and the statistics so far, which makes it possible to follow its
+progress, to cancel it between two folders, and to resume it after a
+restart without scanning the finished folders again.
+"""
+
+import json
+import queue
+import threading
+from enum import Enum, auto
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query, transaction
+
+
+# The counters of the scan statistics, added up over the runs of a job
+STAT_KEYS = (
+    'scanned', 'added', 'skipped', 'errors', 'series_processed',
+    'unchanged', 'removed', 'series_unchanged'
+)
+
+# Finished jobs that are kept in the database
+MAX_FINISHED_JOBS = 100
+
+
+class ScanJobStatus(Enum):
+    """Status of a scan job."""
+    QUEUED = auto()
+    RUNNING = auto()
+    COMPLETED = auto()
+    FAILED = auto()
+    CANCELLED = auto()
+
+
+ACTIVE_STATUSES = (ScanJobStatus.QUEUED.name, ScanJobStatus.RUNNING.name)
+
+
+def _merge_stats(base: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, int]:
+    """Add up the counters of two sets of scan statistics.
+
+    Args:
+        base (Dict[str, Any]): The statistics of earlier runs.
+        stats (Dict[str, Any]): The statistics of the current run.
+
+    Returns:
+        Dict[str, int]: The combined counters.
+    """
+    return {
+        key: (base.get(key) or 0) + (stats.get(key) or 0)
+        for key in STAT_KEYS
+    }
+
+
+class ScanJob:
+    """A scan job that is queued or running in this process."""
+
+    def __init__(
+        self,
+        job_id: int,
+        series_id: Optional[int] = None,
+        content_type: Optional[str] = None,
+        custom_path: Optional[str] = None,
+        full_scan: bool = False,
+        done_folders: Iterable[str] = (),
+        base_stats: Optional[Dict[str, Any]] = None
+    ):
+        """Create the runtime state of a job.
+
+        Args:
+            job_id (int): The ID of the job.
+            series_id (Optional[int], optional): Only scan this series. Defaults to None.
+            content_type (Optional[str], optional): Only scan series of this
+                content type. Defaults to None.
+            custom_path (Optional[str], optional): The folder of the series.
+                Defaults to None.
+            full_scan (bool, optional): Ignore the scan manifest. Defaults to False.
+            done_folders (Iterable[str], optional): The folders scanned by an
+                earlier run of the job. Defaults to ().
+            base_stats (Optional[Dict[str, Any]], optional): The statistics of
+                an earlier run of the job. Defaults to None.
+        """
+        self.id = job_id
+        self.series_id = series_id
+        self.content_type = content_type
+        self.custom_path = custom_path
+        self.full_scan = full_scan
+        self.done_folders: Set[str] = set(done_folders)
+        self.base_stats = _merge_stats(base_stats or {}, {})
+        self._cancel_event = threading.Event()
+
+    def matches(
+        self,
+        series_id: Optional[int],
+        content_type: Optional[str],
+        custom_path: Optional[str],
+        full_scan: bool
+    ) -> bool:
+        """Check whether the job scans the same as a new job would."""
+        return (
+            self.series_id == series_id
+            and self.content_type == content_type
+            and self.custom_path == custom_path
+            and self.full_scan == full_scan
+        )
+
+    def cancel(self) -> None:
+        """Ask the job to stop after the current folder."""
+        self._cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        """Check whether the job was cancelled.
+
+        Returns:
+            bool: True if the job should stop.
+        """
+        return self._cancel_event.is_set()
+
+    def set_folders_total(self, total: int) -> None:
+        """Record the number of series folders the scan goes through.
+
+        Args:
+            total (int): The number of folders, including the ones scanned
+                by an earlier run.
+        """
+        execute_query("""
+            UPDATE scan_jobs
+            SET folders_total = ?, folders_done = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (total, len(self.done_folders), self.id), commit=True)
+
+    def folder_done(self, path: str, stats: Dict[str, Any]) -> None:
+        """Record that a series folder was scanned.
+
+        Args:
+            path (str): The folder.
+            stats (Dict[str, Any]): The statistics of the current run so far.
+        """
+        self.done_folders.add(path)
+        try:
+            with transaction():
+                execute_query(
+                    "INSERT OR IGNORE INTO scan_job_folders (job_id, path) VALUES (?, ?)",
+                    (self.id, path)
+                )
+                execute_query("""
+                    UPDATE scan_jobs
+                    SET folders_done = ?, stats = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (
+                    len(self.done_folders),
+                    json.dumps(_merge_stats(self.base_stats, stats)),
+                    self.id
+                ))
+        except Exception as e:
+            # Only the progress is lost, the scan itself can continue
+            LOGGER.warning(f"Could not record progress of scan job {self.id}: {e}")
+
+
+# Jobs that are queued or running in this process, by ID
+_JOBS: Dict[int, ScanJob] = {}
+_JOBS_LOCK = threading.Lock()
+_QUEUE: "queue.Queue[ScanJob]" = queue.Queue()
+_WORKER: Optional[threading.Thread] = None
+
+
+def _row_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a scan_jobs row into the job as returned by the API.
+
+    Args:
+        row (Dict[str, Any]): The row.
+
+    Returns:
+        Dict[str, Any]: The job.
+    """
+    job = dict(row)
+    job['full_scan'] = bool(job['full_scan'])
+    job['stats'] = json.loads(job['stats']) if job['stats'] else _merge_stats({}, {})
+    total = job['folders_total']
+    job['progress'] = round(100 * job['folders_done'] / total, 1) if total else None
+    job['files_seen'] = sum(job['stats'].get(key, 0) for key in ('scanned', 'skipped', 'unchanged'))
+    return job
+
+
+def _finish_job(job: ScanJob, status: ScanJobStatus, stats: Dict[str, Any], error: Optional[str] = None) -> None:
+    """Record the end of a job and prune old finished jobs.
+
+    Args:
+        job (ScanJob): The job.
+        status (ScanJobStatus): The final status.
+        stats (Dict[str, Any]): The statistics of the last run.
+        error (Optional[str], optional): The error the job failed with. Defaults to None.
+    """
+    with transaction():
+        execute_query("""
+            UPDATE scan_jobs
+            SET status = ?, stats = ?, error = ?, finished_at = CURRENT_TIMESTAMP,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status.name, json.dumps(_merge_stats(job.base_stats, stats)), error, job.id))
+        execute_query("""
+            DELETE FROM scan_jobs
+            WHERE status NOT IN (?, ?) AND id NOT IN (
+                SELECT id FROM scan_jobs WHERE status NOT IN (?, ?)
+                ORDER BY id DESC LIMIT ?
+            )
+        """, ACTIVE_STATUSES + ACTIVE_STATUSES + (MAX_FINISHED_JOBS,))
+
+
+def _run_job(job: ScanJob) -> None:
+    """Run a job on the worker thread.
+
+    Args:
+        job (ScanJob): The job.
+    """
+    from backend.features.ebook_files import scan_for_ebooks
+
+    if job.is_cancelled():
+        _finish_job(job, ScanJobStatus.CANCELLED, {})
+        return
+
+    LOGGER.info(f"Starting scan job {job.id}")
+    execute_query("""
+        UPDATE scan_jobs
+        SET status = ?, started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    """, (ScanJobStatus.RUNNING.name, job.id), commit=True)
+
+    stats = scan_for_ebooks(
+        specific_series_id=job.series_id,
+        custom_path=job.custom_path,
+        content_type_filter=job.content_type,
+        full_scan=job.full_scan,
+        job=job
+    )
+
+    if 'error' in stats:
+        status = ScanJobStatus.FAILED
+    elif job.is_cancelled():
+        status = ScanJobStatus.CANCELLED
+    else:
+        status = ScanJobStatus.COMPLETED
+    _finish_job(job, status, stats, stats.get('error'))
+    LOGGER.info(f"Scan job {job.id} finished with status {status.name}")
+
+
+def _worker() -> None:
+    """Run the queued jobs one at a time."""
+    while True:
+        job = _QUEUE.get()
+        try:
+            _run_job(job)
+        except Exception as e:
+            LOGGER.error(f"Error running scan job {job.id}: {e}")
+            try:
+                _finish_job(job, ScanJobStatus.FAILED, {}, str(e))
+            except Exception as e:
+                LOGGER.error(f"Could not record failure of scan job {job.id}: {e}")
+        finally:
+            with _JOBS_LOCK:
+                _JOBS.pop(job.id, None)
+            _QUEUE.task_done()
+
+
+def _enqueue(job: ScanJob) -> None:
+    """Queue a job and make sure the worker thread is running.
+
+    Args:
+        job (ScanJob): The job.
+    """
+    global _WORKER
+    _JOBS[job.id] = job
+    _QUEUE.put(job)
+    if _WORKER is None or not _WORKER.is_alive():
+        _WORKER = threading.Thread(target=_worker, name="scan-jobs", daemon=True)
+        _WORKER.start()
+
+
+def submit_scan_job(
+    series_id: Optional[int] = None,
+    content_type: Optional[str] = None,
+    custom_path: Optional[str] = None,
+    full_scan: bool = False
+) -> Dict[str, Any]:
+    """Start an e-book scan in the background.
+
+    If the same scan is already queued or running, that job is returned
+    instead of starting another one.
+
+    Args:
+        series_id (Optional[int], optional): Only scan this series. Defaults to None.
+        content_type (Optional[str], optional): Only scan series of this
+            content type. Defaults to None.
+        custom_path (Optional[str], optional): The folder of the series.
+            Defaults to None.
+        full_scan (bool, optional): Ignore the scan manifest and process every
+            file. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: The job.
+    """
+    if content_type:
+        content_type = content_type.upper()
+
+    with _JOBS_LOCK:
+        for job in _JOBS.values():
+            if not job.is_cancelled() and job.matches(series_id, content_type, custom_path, full_scan):
+                LOGGER.info(f"Same scan is already queued as job {job.id}")
+                return get_scan_job(job.id)
+
+        with transaction():
+            execute_query("""
+                INSERT INTO scan_jobs (status, series_id, content_type, custom_path, full_scan)
+                VALUES (?, ?, ?, ?, ?)
+            """, (ScanJobStatus.QUEUED.name, series_id, content_type, custom_path, int(full_scan)))
+            job_id = execute_query("SELECT last_insert_rowid() AS id")[0]['id']
+
+        _enqueue(ScanJob(job_id, series_id, content_type, custom_path, full_scan))
+
+    LOGGER.info(f"Queued scan job {job_id}")
+    return get_scan_job(job_id)
+
+
+def get_scan_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """Get a scan job.
+
+    Args:
+        job_id (int): The ID of the job.
+
+    Returns:
+        Optional[Dict[str, Any]]: The job, or None if it doesn't exist.
+    """
+    rows = execute_query("SELECT * FROM scan_jobs WHERE id = ?", (job_id,))
+    return _row_to_dict(rows[0]) if rows else None
+
+
+def get_scan_jobs(limit: int = 20) -> List[Dict[str, Any]]:
+    """Get the most recent scan jobs.
+
+    Args:
+        limit (int, optional): The maximum number of jobs. Defaults to 20.
+
+    Returns:
+        List[Dict[str, Any]]: The jobs, newest first.
+    """
+    rows = execute_query("SELECT * FROM scan_jobs ORDER BY id DESC LIMIT ?", (limit,))
+    return [_row_to_dict(row) for row in rows]
+
+
+def cancel_scan_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """Cancel a scan job.
+
+    A queued job is cancelled right away, a running job stops after the
+    series folder it is scanning. Finished jobs are left as they are.
+
+    Args:
+        job_id (int): The ID of the job.
+
+    Returns:
+        Optional[Dict[str, Any]]: The job, or None if it doesn't exist.
+    """
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    # Jobs that have not started yet, or that are not active in this
+    # process anymore, are not picked up by the worker
+    execute_query("""
+        UPDATE scan_jobs
+        SET status = ?, finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND (status = ? OR (status = ? AND ?))
+    """, (
+        ScanJobStatus.CANCELLED.name, job_id,
+        ScanJobStatus.QUEUED.name, ScanJobStatus.RUNNING.name, int(job is None)
+    ), commit=True)
+
+    if job is not None:
+        LOGGER.info(f"Cancelled scan job {job_id}")
+    return get_scan_job(job_id)
+
+
+def resume_scan_jobs() -> int:
+    """Queue the jobs that were queued or running when Readloom stopped.
+
+    Running jobs continue after the last folder they finished.
+
+    Returns:
+        int: The number of jobs queued.
+    """
+    try:
+        rows = execute_query(
+            "SELECT * FROM scan_jobs WHERE status IN (?, ?) ORDER BY id",
+            ACTIVE_STATUSES
+        )
+    except Exception as e:
+        LOGGER.warning(f"Could not load interrupted scan jobs: {e}")
+        return 0
+
+    resumed = 0
+    with _JOBS_LOCK:
+        for row in rows:
+            if row['id'] in _JOBS:
+                continue
+
+            done_folders = [
+                folder['path'] for folder in execute_query(
+                    "SELECT path FROM scan_job_folders WHERE job_id = ?",
+                    (row['id'],)
+                )
+            ]
+            _enqueue(ScanJob(
+                row['id'],
+                row['series_id'],
+                row['content_type'],
+                row['custom_path'],
+                bool(row['full_scan']),
+                done_folders,
+                json.loads(row['stats']) if row['stats'] else None
+            ))
+            LOGGER.info(f"Resuming scan job {row['id']} after {len(done_folders)} folders")
+            resumed += 1
+
+    return resumed
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persisted file state of the e-book scan.
+
+For every entry in a series folder, the scan manifest stores the inode,
+size and modification time seen by the last scan. A rescan compares these
+with a fresh `stat()` and only processes the entries that are new or
+changed, and cleans up the entries that were removed.
+"""
+
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_many, execute_query
+
+
+class ManifestEntry(NamedTuple):
+    """The state of a path as recorded by the last scan."""
+    path: str
+    series_id: int
+    volume_id: Optional[int]
+    ebook_file_id: Optional[int]
+    inode: int
+    size: int
+    mtime_ns: int
+
+
+def get_manifest(series_id: int) -> Dict[str, ManifestEntry]:
+    """Get the manifest entries of a series.
+
+    Args:
+        series_id (int): The series ID.
+
+    Returns:
+        Dict[str, ManifestEntry]: The entries, by path.
+    """
+    try:
+        rows = execute_query("""
+            SELECT path, series_id, volume_id, ebook_file_id, inode, size, mtime_ns
+            FROM scan_manifest
+            WHERE series_id = ?
+        """, (series_id,))
+    except Exception as e:
+        # Without a manifest, everything is scanned like before
+        LOGGER.warning(f"Could not load scan manifest for series {series_id}: {e}")
+        return {}
+
+    return {row['path']: ManifestEntry(**row) for row in rows}
+
+
+def is_unchanged(entry: Optional[ManifestEntry], stat_result: os.stat_result) -> bool:
+    """Check whether a path is still in the state recorded in the manifest.
+
+    Args:
+        entry (Optional[ManifestEntry]): The manifest entry of the path, if any.
+        stat_result (os.stat_result): The current state of the path.
+
+    Returns:
+        bool: True if the path was scanned before and did not change since.
+    """
+    return (
+        entry is not None
+        and entry.inode == stat_result.st_ino
+        and entry.size == stat_result.st_size
+        and entry.mtime_ns == stat_result.st_mtime_ns
+    )
+
+
+def make_entry(
+    path: str,
+    stat_result: os.stat_result,
+    series_id: int,
+    volume_id: Optional[int] = None,
+    ebook_file_id: Optional[int] = None
+) -> ManifestEntry:
+    """Create a manifest entry for a path.
+
+    Args:
+        path (str): The path.
+        stat_result (os.stat_result): The state of the path.
+        series_id (int): The series the path belongs to.
+        volume_id (Optional[int], optional): The volume of the file. Defaults to None.
+        ebook_file_id (Optional[int], optional): The e-book file of the file. Defaults to None.
+
+    Returns:
+        ManifestEntry: The entry.
+    """
+    return ManifestEntry(
+        path=path,
+        series_id=series_id,
+        volume_id=volume_id,
+        ebook_file_id=ebook_file_id,
+        inode=stat_result.st_ino,
+        size=stat_result.st_size,
+        mtime_ns=stat_result.st_mtime_ns
+    )
+
+
+def save_entries(entries: Iterable[ManifestEntry]) -> int:
+    """Insert or replace manifest entries.
+
+    Args:
+        entries (Iterable[ManifestEntry]): The entries to save.
+
+    Returns:
+        int: The number of entries saved.
+    """
+    return execute_many("""
+        INSERT INTO scan_manifest (
+            path, series_id, volume_id, ebook_file_id, inode, size, mtime_ns, scanned_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(path) DO UPDATE SET
+            series_id = excluded.series_id,
+            volume_id = excluded.volume_id,
+            ebook_file_id = excluded.ebook_file_id,
+            inode = excluded.inode,
+            size = excluded.size,
+            mtime_ns = excluded.mtime_ns,
+            scanned_at = excluded.scanned_at
+    """, (tuple(entry) for entry in entries))
+
+
+def remove_entries(paths: Iterable[str]) -> int:
+    """Remove manifest entries.
+
+    Args:
+        paths (Iterable[str]): The paths of the entries.
+
+    Returns:
+        int: The number of entries removed.
+    """
+    return execute_many(
+        "DELETE FROM scan_manifest WHERE path = ?",
+        ((path,) for path in paths)
+    )
+
+
+def clear_manifest(series_id: Optional[int] = None) -> None:
+    """Forget the scan state, so the next scan processes every file again.
+
+    Args:
+        series_id (Optional[int], optional): Only forget the state of this series.
+            Defaults to None.
+    """
+    if series_id is None:
+        execute_query("DELETE FROM scan_manifest", commit=True)
+    else:
+        execute_query("DELETE FROM scan_manifest WHERE series_id = ?", (series_id,), commit=True)
+
+
+def get_removed_entries(
+    manifest: Dict[str, ManifestEntry],
+    folder: str,
+    seen_paths: Iterable[str]
+) -> List[ManifestEntry]:
+    """Get the manifest entries in a folder that were not seen by the current scan.
+
+    Args:
+        manifest (Dict[str, ManifestEntry]): The manifest of the series.
+        folder (str): The scanned folder. A series can have files in more
+            than one folder, so entries outside of it are ignored.
+        seen_paths (Iterable[str]): The paths found by the current scan.
+
+    Returns:
+        List[ManifestEntry]: The entries of the paths that no longer exist.
+    """
+    seen = set(seen_paths)
+    prefix = os.path.join(folder, "")
+    return [
+        entry for path, entry in manifest.items()
+        if path not in seen and (path == folder or path.startswith(prefix))
+    ]
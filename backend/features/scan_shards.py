@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Sharded analysis of series folders for the e-book scan.
+
+The scan of a series folder has two parts. The analysis compares every
+entry of the folder with the scan manifest, extracts the volume numbers of
+the new and changed files and can fingerprint them. It only reads the file
+system, so it can run in worker processes. The changes it finds are then
+applied to the database by the scan, one series at a time in a single
+transaction, so there is still only one writer.
+
+With more than one scan worker, the series folders are split into shards:
+the series folders of a root folder form one shard, unless the root holds
+more series folders than fit in a shard, in which case it is split. The
+shards are analysed on a pool of worker processes, a bounded number at a
+time, and the results come back in the order of the folders.
+
+This module doesn't import the rest of the e-book scan, so worker
+processes can import it cheaply.
+"""
+
+import math
+import os
+import stat
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from backend.base.logging import LOGGER
+from backend.features.file_fingerprints import compute_fingerprint
+from backend.features.library_walker import DirNode, find_node, walk_directory
+from backend.features.scan_manifest import (
+    ManifestEntry, get_manifest, get_removed_entries, is_unchanged, make_entry
+)
+from backend.features.volume_numbers import extract_volume_numbers
+
+# Supported e-book file extensions and their file type
+SUPPORTED_EXTENSIONS = {
+    '.pdf': 'PDF',
+    '.epub': 'EPUB',
+    '.cbz': 'CBZ',
+    '.cbr': 'CBR',
+    '.mobi': 'MOBI',
+    '.azw': 'AZW',
+    '.azw3': 'AZW'
+}
+
+# Most series folders in one shard
+MAX_SHARD_SIZE = 32
+
+# Shards per worker, so the work is spread evenly over the workers
+SHARDS_PER_WORKER = 4
+
+# Fewer series folders are analysed in this process, as starting the pool costs more
+POOL_MIN_SERIES = 16
+
+# Series folder, content type and series ID
+SeriesDir = Tuple[Path, str, int]
+
+
+class ChangedFile(NamedTuple):
+    """A file that is new or changed since the last scan."""
+    path: Path
+    stat_result: os.stat_result
+    # The path with symlinks resolved
+    resolved: str
+    readable: bool
+    # Only for supported files
+    volume_number: Optional[str]
+    # Whether the file is in the manifest, so its content changed
+    scanned_before: bool
+    # Only when fingerprinting was asked for
+    fingerprint: Optional[str]
+
+
+class SeriesAnalysis(NamedTuple):
+    """The changes in a series folder since the last scan."""
+    series_id: int
+    # Why the folder could not be listed completely, if so
+    error: Optional[str]
+    # Whether every folder could be listed, so missing files were removed
+    listed: bool
+    # The number of files that did not change
+    unchanged: int
+    changed_files: List[ChangedFile]
+    # Manifest entries of the new and changed folders
+    folder_entries: List[ManifestEntry]
+    removed_entries: List[ManifestEntry]
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.changed_files or self.folder_entries or self.removed_entries)
+
+
+class SeriesShard(NamedTuple):
+    """The input of the analysis of a series folder in a worker process."""
+    series_dir: Path
+    series_id: int
+    # The tree of the library walk, or None to walk the folder in the worker
+    node: Optional[DirNode]
+    manifest: Dict[str, ManifestEntry]
+
+
+def analyze_series(
+    series_dir: Path,
+    series_id: int,
+    series_node: DirNode,
+    manifest: Dict[str, ManifestEntry],
+    fingerprint: bool = False
+) -> SeriesAnalysis:
+    """Find the new, changed and removed entries of a series folder.
+
+    Args:
+        series_dir (Path): The folder of the series.
+        series_id (int): The series ID.
+        series_node (DirNode): The tree of the folder.
+        manifest (Dict[str, ManifestEntry]): The manifest of the series, by path.
+        fingerprint (bool, optional): Also fingerprint the new and changed
+            supported files. Defaults to False.
+
+    Returns:
+        SeriesAnalysis: The changes in the folder.
+    """
+    seen_paths = []
+    new_files = []
+    folder_entries = []
+    unchanged = 0
+    for file_path, file_stat in series_node.iter_entries():
+        path_key = str(file_path)
+        seen_paths.append(path_key)
+        if is_unchanged(manifest.get(path_key), file_stat):
+            if stat.S_ISREG(file_stat.st_mode):
+                unchanged += 1
+            continue
+
+        if stat.S_ISDIR(file_stat.st_mode):
+            # Changed folders make the series count as changed,
+            # e.g. for new volume folders
+            folder_entries.append(make_entry(path_key, file_stat, series_id))
+        elif stat.S_ISREG(file_stat.st_mode):
+            new_files.append((file_path, file_stat))
+
+    # Without a complete listing, missing files can't be told apart from removed ones
+    listed = series_node.is_complete
+    removed_entries = get_removed_entries(manifest, str(series_dir), seen_paths) if listed else []
+
+    # Resolve the volumes of all files at once
+    volume_numbers = extract_volume_numbers(
+        file_path for file_path, _ in new_files
+        if file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+
+    changed_files = []
+    for file_path, file_stat in new_files:
+        readable = os.access(str(file_path), os.R_OK)
+        changed_files.append(ChangedFile(
+            path=file_path,
+            stat_result=file_stat,
+            resolved=str(file_path.resolve()),
+            readable=readable,
+            volume_number=volume_numbers.get(file_path),
+            scanned_before=str(file_path) in manifest,
+            fingerprint=(
+                compute_fingerprint(str(file_path))
+                if fingerprint and readable and file_path in volume_numbers
+                else None
+            )
+        ))
+
+    return SeriesAnalysis(
+        series_id=series_id,
+        error=series_node.error,
+        listed=listed,
+        unchanged=unchanged,
+        changed_files=changed_files,
+        folder_entries=folder_entries,
+        removed_entries=removed_entries
+    )
+
+
+def _analyze_shard(shards: List[SeriesShard], fingerprint: bool) -> List[SeriesAnalysis]:
+    """Analyse the series folders of a shard, in a worker process.
+
+    Args:
+        shards (List[SeriesShard]): The series folders.
+        fingerprint (bool): Also fingerprint the new and changed supported files.
+
+    Returns:
+        List[SeriesAnalysis]: The changes in every folder, in the same order.
+    """
+    return [
+        analyze_series(
+            shard.series_dir,
+            shard.series_id,
+            shard.node or walk_directory(shard.series_dir),
+            shard.manifest,
+            fingerprint
+        )
+        for shard in shards
+    ]
+
+
+def _shard_size(series_count: int, workers: int) -> int:
+    """Get the most series folders in a shard."""
+    return max(1, min(MAX_SHARD_SIZE, math.ceil(series_count / (workers * SHARDS_PER_WORKER))))
+
+
+def make_shards(
+    series_dirs: List[SeriesDir],
+    root_paths: List[Path],
+    workers: int
+) -> List[List[SeriesDir]]:
+    """Split series folders into shards of one root folder each, with
+    large root folders split into several shards.
+
+    A shard holds consecutive series folders, so the shards together are
+    in the original order.
+
+    Args:
+        series_dirs (List[SeriesDir]): The series folders to scan.
+        root_paths (List[Path]): The root folders.
+        workers (int): The number of worker processes.
+
+    Returns:
+        List[List[SeriesDir]]: The shards, with the series folders in their
+        original order.
+    """
+    size = _shard_size(len(series_dirs), workers)
+    shards: List[List[SeriesDir]] = []
+    shard_root: Optional[Path] = None
+    for series_dir in series_dirs:
+        root_path = next(
+            (root for root in root_paths if root in series_dir[0].parents),
+            series_dir[0].parent
+        )
+        if not shards or root_path != shard_root or len(shards[-1]) >= size:
+            shards.append([])
+            shard_root = root_path
+        shards[-1].append(series_dir)
+    return shards
+
+
+def iter_sharded_analyses(
+    series_dirs: List[SeriesDir],
+    library_nodes: Dict[Path, DirNode],
+    workers: int,
+    full_scan: bool = False
+) -> Iterator[Tuple[SeriesDir, Optional[SeriesAnalysis]]]:
+    """Analyse series folders on a pool of worker processes.
+
+    At most two shards per worker are queued at a time, so the manifests
+    are loaded as the results are applied instead of all at once.
+
+    Args:
+        series_dirs (List[SeriesDir]): The series folders to scan.
+        library_nodes (Dict[Path, DirNode]): The walked root folders, by path.
+        workers (int): The number of worker processes.
+        full_scan (bool, optional): Ignore the scan manifest. Defaults to False.
+
+    Yields:
+        Tuple[SeriesDir, Optional[SeriesAnalysis]]: Every series folder with
+        its changes, in the original order. The analysis is None if it
+        failed, in which case the folder has to be analysed in this process.
+    """
+    shards = iter(make_shards(series_dirs, list(library_nodes), workers))
+    pending: Deque = deque()
+
+    def shard_input(shard: List[SeriesDir]) -> List[SeriesShard]:
+        return [
+            SeriesShard(
+                series_dir,
+                series_id,
+                find_node(library_nodes, series_dir),
+                {} if full_scan else get_manifest(series_id)
+            )
+            for series_dir, _, series_id in shard
+        ]
+
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    except Exception as e:
+        LOGGER.warning(f"Could not start the scan workers, scanning in this process: {e}")
+        for series_dir in series_dirs:
+            yield series_dir, None
+        return
+
+    LOGGER.info(f"Analysing {len(series_dirs)} series folders on {workers} worker processes")
+    try:
+        broken = False
+
+        def submit_next() -> None:
+            nonlocal broken
+            shard = next(shards, None)
+            if shard is None:
+                return
+            future = None
+            if not broken:
+                try:
+                    # A full scan sees every file as new, most of which
+                    # already have a fingerprint
+                    future = executor.submit(_analyze_shard, shard_input(shard), not full_scan)
+                except Exception as e:
+                    LOGGER.warning(f"Could not queue series folders on the scan workers: {e}")
+                    broken = True
+            pending.append((shard, future))
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        while pending:
+            shard, future = pending.popleft()
+            analyses: List[Optional[SeriesAnalysis]] = [None] * len(shard)
+            if future is not None:
+                try:
+                    analyses = list(future.result())
+                except Exception as e:
+                    LOGGER.warning(f"Could not analyse series folders in a worker process, continuing in this process: {e}")
+            submit_next()
+            yield from zip(shard, analyses)
+    finally:
+        # Stop early when the scan is cancelled
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
+        executor.shutdown(wait=True)
@@ -5,9 +5,9 @@
 MangaDex API client for MangaInfo provider.
 """
 
-import requests
 from typing import Tuple
 
+from backend.internals import http_client
 from backend.base.logging import LOGGER
 from .constants import MANGADEX_URL
 
@@ -26,7 +26,7 @@ def get_mangadex_data(manga_title: str) -> Tuple[int, int]:
         # Search MangaDex API - get top 5 results to find best match
         search_url = f"{MANGADEX_URL}/manga?title={manga_title.replace(' ', '+')}&limit=5&includes[]=cover_art"
         
-        response = requests.get(search_url, timeout=10)
+        response = http_client.get(search_url, timeout=10)
         if response.status_code != 200:
             return (0, 0)
             
@@ -97,7 +97,7 @@ def get_mangadex_data(manga_title: str) -> Tuple[int, int]:
         
         # Otherwise, try aggregate endpoint (without language filter to get all volumes)
         agg_url = f"{MANGADEX_URL}/manga/{manga_id}/aggregate"
-        agg_response = requests.get(agg_url, timeout=10)
+        agg_response = http_client.get(agg_url, timeout=10)
         
         if agg_response.status_code != 200:
             # Fall back to attribute data if available
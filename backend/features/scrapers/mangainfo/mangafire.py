@@ -6,7 +6,6 @@ MangaFire scraper for MangaInfo provider.
 """
 
 import re
-import time
 from typing import Tuple
 import requests
 from bs4 import BeautifulSoup
@@ -64,9 +63,6 @@ def get_mangafire_data(session: requests.Session, manga_title: str) -> Tuple[int
         # Get the manga details page
         manga_url = MANGAFIRE_URL + manga_link['href'] if not manga_link['href'].startswith('http') else manga_link['href']
         
-        # Small delay
-        time.sleep(1)
-        
         # Get the manga details
         manga_response = session.get(manga_url, timeout=10)
         if manga_response.status_code != 200:
@@ -6,7 +6,6 @@ MangaPark scraper for MangaInfo provider.
 """
 
 import re
-import time
 from typing import Tuple
 import requests
 from bs4 import BeautifulSoup
@@ -55,9 +54,6 @@ def get_mangapark_data(session: requests.Session, manga_title: str) -> Tuple[int
         # Get the manga details page
         manga_url = MANGAPARK_URL + manga_link['href']
         
-        # Small delay
-        time.sleep(1)
-        
         # Get the manga details
         manga_response = session.get(manga_url, timeout=10)
         if manga_response.status_code != 200:
@@ -5,7 +5,6 @@
 MangaInfo provider implementation.
 """
 
-import requests
 import re
 import json
 from pathlib import Path
@@ -13,6 +12,7 @@ from typing import Dict, Tuple, Optional
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+from backend.internals.http_client import create_session
 from backend.base.logging import LOGGER
 from backend.internals.db import execute_query
 from .constants import POPULAR_MANGA_DATA
@@ -28,7 +28,7 @@ class MangaInfoProvider:
     def __init__(self):
         """Initialize the manga info provider."""
         # Use a session for better performance and cookie handling
-        self.session = requests.Session()
+        self.session = create_session()
         self.session.headers.update(get_random_headers())
         
         # Memory cache to avoid repeated database queries in the same session
@@ -8,7 +8,11 @@ from typing import Dict, List, Optional
 
 from backend.base.logging import LOGGER
 from backend.features.calendar import update_calendar
-from backend.internals.settings import Settings
+from backend.features.metadata_service.cache import sweep_metadata_cache
+from backend.internals.settings import Settings, get_settings_version
+
+# How often expired data is removed from the metadata cache
+CACHE_SWEEP_INTERVAL = timedelta(hours=1)
 
 
 class TaskHandler:
@@ -19,6 +23,7 @@ class TaskHandler:
         self.running = False
         self.thread: Optional[threading.Thread] = None
         self.last_calendar_update: Optional[datetime] = None
+        self.last_cache_sweep: Optional[datetime] = None
     
     def handle_intervals(self) -> None:
         """Start handling intervals."""
@@ -38,10 +43,16 @@ class TaskHandler:
     
     def _interval_handler(self) -> None:
         """Handle intervals."""
+        settings_version = get_settings_version()
         settings = Settings().get_settings()
         
         while self.running:
             try:
+                # Pick up changed settings, like the refresh interval
+                if get_settings_version() != settings_version:
+                    settings_version = get_settings_version()
+                    settings = Settings().get_settings()
+                
                 # Check if calendar needs updating
                 current_time = datetime.now()
                 if (self.last_calendar_update is None or 
@@ -52,6 +63,13 @@ class TaskHandler:
                     update_calendar()
                     self.last_calendar_update = current_time
                 
+                # Remove expired metadata from the cache
+                if (self.last_cache_sweep is None or
+                    current_time - self.last_cache_sweep > CACHE_SWEEP_INTERVAL):
+                    
+                    sweep_metadata_cache()
+                    self.last_cache_sweep = current_time
+                
                 # Sleep for a minute before checking again
                 for _ in range(60):
                     if not self.running:
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Volume number extraction for e-book files and volume folders.
+
+Every supported notation is a precompiled pattern with a rank. The
+notations are tried in order of rank and the leftmost match of the first
+notation that matches wins. Names without a digit are skipped without
+matching at all, which covers most folder names and book titles.
+
+Notations, best rank first:
+    1. Vol 1, Volume 1, Vol.1, Vol 1.5, Vol 01-03
+    2. v1, V1, v1.5, v01-03, v01-v03
+    3. v 1, v.1, v_1, v-1
+    4. tome 1, tome.1
+    5. ch 1, chapter 1, ch.1
+    6. #1, #1.5
+    7. 1 of 10, 1/10
+    8. A name that is just a number, like 1 or 1.5
+    9. Any number in the name
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+
+
+_NUMBER = r'(\d+(?:\.\d+)?)'
+# The end of a range like v01-03
+_RANGE_END = r'(?:\s*[-~]\s*[vV]?(\d+(?:\.\d+)?)\b)?'
+_SEPARATOR = r'[\s._-]*'
+
+# (kind, pattern) in order of rank. The first group of a pattern is the
+# number, the optional second group the end of a range or the total.
+_NOTATIONS: List[Tuple[str, Pattern[str]]] = [
+    ('volume', re.compile(r'[vV]ol(?:ume)?' + _SEPARATOR + _NUMBER + _RANGE_END)),
+    ('volume', re.compile(r'[vV]' + _NUMBER + _RANGE_END)),
+    ('volume', re.compile(r'\bv' + _SEPARATOR + _NUMBER + _RANGE_END)),
+    ('volume', re.compile(r'\btome' + _SEPARATOR + _NUMBER + _RANGE_END)),
+    ('chapter', re.compile(r'\bch(?:apter)?' + _SEPARATOR + _NUMBER)),
+    ('number', re.compile(r'\#' + _NUMBER)),
+    ('part', re.compile(r'\b' + _NUMBER + r'\s*(?:of|\/|\\)\s*(\d+)\b')),
+    ('number', re.compile(r'^' + _NUMBER + r'$')),
+    ('number', re.compile(r'\b' + _NUMBER + r'\b')),
+]
+
+_DIGIT = re.compile(r'\d')
+_LEADING_DIGITS = re.compile(r'^(\d+)')
+
+DEFAULT_VOLUME = '1'
+
+
+class VolumeMatch(NamedTuple):
+    """A volume number found in a name."""
+    number: str
+    # The notation the number was found with: volume, chapter, part or number
+    kind: str
+    # The last volume of a range like v01-03, or the total of "1 of 10"
+    end: Optional[str]
+    rank: int
+    position: int
+
+
+def match_volume(name: str) -> Optional[VolumeMatch]:
+    """Find the volume number in a name.
+
+    Args:
+        name (str): The name, like a filename without extension.
+
+    Returns:
+        Optional[VolumeMatch]: The best match, or None if the name has no number.
+    """
+    if _DIGIT.search(name) is None:
+        return None
+
+    for rank, (kind, pattern) in enumerate(_NOTATIONS, start=1):
+        match = pattern.search(name)
+        if match is not None:
+            return VolumeMatch(
+                number=match.group(1),
+                kind=kind,
+                end=match.group(2) if pattern.groups > 1 else None,
+                rank=rank,
+                position=match.start()
+            )
+    return None
+
+
+def _match_filename(file_path: Path) -> Optional[VolumeMatch]:
+    """Find the volume number of a path in its filename.
+
+    Args:
+        file_path (Path): The path.
+
+    Returns:
+        Optional[VolumeMatch]: The match, or None if the filename has no number.
+    """
+    filename = file_path.stem
+
+    # Shortcut for filenames like "Vol 1"
+    if filename.startswith("Vol ") and filename[4:].isdigit():
+        return VolumeMatch(filename[4:], 'volume', None, 1, 0)
+
+    match = match_volume(filename)
+    # Only an extension with a digit can make the full filename match
+    if match is None and _DIGIT.search(file_path.suffix):
+        match = match_volume(file_path.name)
+    return match
+
+
+def _to_volume_number(file_path: Path, match: Optional[VolumeMatch]) -> str:
+    """Get the volume number from a match, with the fallbacks for names without one.
+
+    Args:
+        file_path (Path): The path the match is for.
+        match (Optional[VolumeMatch]): The match.
+
+    Returns:
+        str: The volume number.
+    """
+    if match is not None:
+        return match.number
+
+    filename = file_path.stem
+    if filename.isdigit():
+        return filename
+
+    leading = _LEADING_DIGITS.match(filename)
+    if leading:
+        return leading.group(1)
+
+    return DEFAULT_VOLUME
+
+
+def extract_volume_number(file_path: Path) -> Optional[str]:
+    """Extract the volume number from a file path.
+
+    The filename without extension is tried first, then the full filename
+    and then the name of the parent folder. Without any number, the volume
+    is 1.
+
+    Args:
+        file_path (Path): The file path.
+
+    Returns:
+        Optional[str]: The volume number, or None if it couldn't be extracted.
+    """
+    match = _match_filename(file_path) or match_volume(file_path.parent.name)
+    return _to_volume_number(file_path, match)
+
+
+def extract_volume_numbers(file_paths: Iterable[Path]) -> Dict[Path, Optional[str]]:
+    """Extract the volume numbers of many files, like a folder listing.
+
+    Gives the same results as `extract_volume_number()`, but the name of
+    every folder is only matched once.
+
+    Args:
+        file_paths (Iterable[Path]): The file paths.
+
+    Returns:
+        Dict[Path, Optional[str]]: The volume number of every path.
+    """
+    parent_matches: Dict[Path, Optional[VolumeMatch]] = {}
+    result: Dict[Path, Optional[str]] = {}
+    for file_path in file_paths:
+        match = _match_filename(file_path)
+        if match is None:
+            parent = file_path.parent
+            if parent not in parent_matches:
+                parent_matches[parent] = match_volume(parent.name)
+            match = parent_matches[parent]
+        result[file_path] = _to_volume_number(file_path, match)
+    return result
@@ -3,9 +3,11 @@
 
 import os
 import sqlite3
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from backend.base.custom_exceptions import DatabaseError
 from backend.base.definitions import Constants
@@ -16,7 +18,17 @@ from backend.base.logging import LOGGER
 
 # Global variables
 DB_PATH: Optional[Path] = None
-DB_CONN: Optional[sqlite3.Connection] = None
+DB_WAL_MODE: bool = False
+
+# Every thread gets its own pair of connections: a writer connection (also
+# returned by get_db_connection()) and a read-only connection used for SELECT
+# queries. Writes from all threads are serialized by _WRITE_LOCK so that
+# in-process writers queue up instead of fighting over the SQLite lock.
+_THREAD_LOCAL = threading.local()
+_WRITE_LOCK = threading.RLock()
+_CONNECTIONS_LOCK = threading.Lock()
+_CONNECTIONS: Dict[int, List[sqlite3.Connection]] = {}
+_JOURNAL_MODE_APPLIED = False
 
 
 def set_db_location(db_folder: Optional[str] = None) -> None:
@@ -29,7 +41,7 @@ def set_db_location(db_folder: Optional[str] = None) -> None:
     Raises:
         ValueError: If the database location is not a folder.
     """
-    global DB_PATH
+    global DB_PATH, _JOURNAL_MODE_APPLIED
     
     if db_folder:
         folder_path = Path(db_folder)
@@ -38,12 +50,101 @@ def set_db_location(db_folder: Optional[str] = None) -> None:
     else:
         folder_path = get_data_dir()
     
-    DB_PATH = folder_path / Constants.DEFAULT_DB_NAME
+    new_path = folder_path / Constants.DEFAULT_DB_NAME
+    if DB_PATH is not None and new_path != DB_PATH:
+        # Connections to the old database must not be reused
+        close_db_connection()
+        _JOURNAL_MODE_APPLIED = False
+    
+    DB_PATH = new_path
     LOGGER.info(f"Database path set to: {DB_PATH}")
 
 
+def set_wal_mode(enabled: bool) -> None:
+    """Enable or disable WAL journal mode for new connections.
+
+    WAL lets readers and the writer work concurrently, but it does not work
+    on network filesystems and some Docker volumes, so DELETE stays the
+    default. Must be called before the first connection is opened.
+
+    Args:
+        enabled (bool): Whether to use WAL journal mode.
+    """
+    global DB_WAL_MODE, _JOURNAL_MODE_APPLIED
+    
+    if enabled != DB_WAL_MODE:
+        DB_WAL_MODE = enabled
+        _JOURNAL_MODE_APPLIED = False
+    LOGGER.info(f"Database WAL mode {'enabled' if enabled else 'disabled'}")
+
+
+def _open_connection(timeout: int, read_only: bool = False) -> sqlite3.Connection:
+    """Open and configure a new connection to the database.
+
+    Args:
+        timeout (int): Connection timeout in seconds.
+        read_only (bool, optional): Whether the connection may only read.
+            Defaults to False.
+
+    Returns:
+        sqlite3.Connection: The new connection.
+    """
+    global _JOURNAL_MODE_APPLIED
+    
+    if DB_PATH is None:
+        set_db_location()
+    
+    # Set a longer timeout to help with locked database issues
+    conn = sqlite3.connect(DB_PATH, timeout=timeout, check_same_thread=False,
+                           isolation_level=None)  # Autocommit mode
+    
+    if not _JOURNAL_MODE_APPLIED and not read_only:
+        # DELETE is the default for Docker compatibility, since WAL mode
+        # doesn't work well with network filesystems and Docker volumes.
+        # The journal mode is persistent, so it only has to be set once.
+        journal_mode = 'WAL' if DB_WAL_MODE else 'DELETE'
+        result = conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+        LOGGER.info(f"Database journal mode set to: {result.fetchone()[0]}")
+        _JOURNAL_MODE_APPLIED = True
+    
+    # Set busy timeout to wait instead of immediately failing
+    conn.execute(f'PRAGMA busy_timeout = {timeout * 1000}')
+    
+    # Set synchronous mode to NORMAL for better performance while maintaining safety
+    conn.execute('PRAGMA synchronous = NORMAL')
+    
+    # Enable foreign keys
+    conn.execute('PRAGMA foreign_keys = ON')
+    
+    if read_only:
+        conn.execute('PRAGMA query_only = ON')
+    
+    conn.row_factory = sqlite3.Row
+    
+    with _CONNECTIONS_LOCK:
+        _CONNECTIONS.setdefault(threading.get_ident(), []).append(conn)
+    
+    return conn
+
+
+def _prune_dead_thread_connections() -> None:
+    """Close connections owned by threads that no longer exist."""
+    alive = {thread.ident for thread in threading.enumerate()}
+    
+    with _CONNECTIONS_LOCK:
+        dead = [ident for ident in _CONNECTIONS if ident not in alive]
+        for ident in dead:
+            for conn in _CONNECTIONS.pop(ident):
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
 def get_db_connection(timeout: int = 30) -> sqlite3.Connection:
-    """Get a connection to the database with improved timeout handling.
+    """Get the write connection of the current thread.
+
+    Each thread gets its own connection, which is opened on first use.
 
     Args:
         timeout (int, optional): Connection timeout in seconds. Defaults to 30.
@@ -54,54 +155,137 @@ def get_db_connection(timeout: int = 30) -> sqlite3.Connection:
     Raises:
         DatabaseError: If the database connection could not be established.
     """
-    global DB_CONN
+    conn = getattr(_THREAD_LOCAL, "write_conn", None)
+    if conn is not None:
+        return conn
     
-    if DB_CONN is not None:
-        return DB_CONN
+    try:
+        _prune_dead_thread_connections()
+        conn = _open_connection(timeout)
+        _THREAD_LOCAL.write_conn = conn
+        LOGGER.debug(f"Database connection established for thread {threading.current_thread().name}")
+        return conn
+    except Exception as e:
+        LOGGER.error(f"Could not connect to database: {e}")
+        raise DatabaseError(f"Could not connect to database: {e}")
+
+
+def get_read_connection(timeout: int = 30) -> sqlite3.Connection:
+    """Get the read-only connection of the current thread.
+
+    Args:
+        timeout (int, optional): Connection timeout in seconds. Defaults to 30.
+
+    Returns:
+        sqlite3.Connection: A read-only connection to the database.
+
+    Raises:
+        DatabaseError: If the database connection could not be established.
+    """
+    conn = getattr(_THREAD_LOCAL, "read_conn", None)
+    if conn is not None:
+        return conn
     
-    if DB_PATH is None:
-        set_db_location()
+    # Make sure the journal mode has been applied by a writer first
+    get_db_connection(timeout)
     
     try:
-        # Set a longer timeout to help with locked database issues
-        DB_CONN = sqlite3.connect(DB_PATH, timeout=timeout, check_same_thread=False, 
-                                   isolation_level=None)  # Autocommit mode
-        
-        # Use DELETE journal mode instead of WAL for Docker compatibility
-        # WAL mode doesn't work well with network filesystems and Docker volumes
-        result = DB_CONN.execute('PRAGMA journal_mode = DELETE')
-        journal_mode = result.fetchone()[0]
-        LOGGER.info(f"Database journal mode set to: {journal_mode}")
-        
-        # Set busy timeout to wait instead of immediately failing
-        DB_CONN.execute(f'PRAGMA busy_timeout = {timeout * 1000}')
-        
-        # Set synchronous mode to NORMAL for better performance while maintaining safety
-        DB_CONN.execute('PRAGMA synchronous = NORMAL')
-        
-        # Enable foreign keys
-        DB_CONN.execute('PRAGMA foreign_keys = ON')
-        
-        DB_CONN.row_factory = sqlite3.Row
-        LOGGER.info("Database connection established successfully")
-        return DB_CONN
+        conn = _open_connection(timeout, read_only=True)
+        _THREAD_LOCAL.read_conn = conn
+        return conn
     except Exception as e:
         LOGGER.error(f"Could not connect to database: {e}")
         raise DatabaseError(f"Could not connect to database: {e}")
 
 
 def close_db_connection() -> None:
-    """Close the database connection."""
-    global DB_CONN
+    """Close all database connections of all threads."""
+    global _THREAD_LOCAL
+    
+    with _CONNECTIONS_LOCK:
+        connections = [conn for conns in _CONNECTIONS.values() for conn in conns]
+        _CONNECTIONS.clear()
+    
+    for conn in connections:
+        try:
+            conn.close()
+        except Exception:
+            pass
     
-    if DB_CONN is not None:
-        DB_CONN.close()
-        DB_CONN = None
+    # Threads open new connections on their next query
+    _THREAD_LOCAL = threading.local()
+
+
+def _is_read_query(query: str) -> bool:
+    """Check whether a query can run on a read-only connection.
+
+    Args:
+        query (str): The SQL query.
+
+    Returns:
+        bool: True if the query only reads data.
+    """
+    normalized = query.strip().upper()
+    if not normalized.startswith("SELECT"):
+        return False
+    
+    # These depend on the state of the connection that did the write
+    return "LAST_INSERT_ROWID()" not in normalized and "CHANGES()" not in normalized
+
+
+def _in_transaction() -> bool:
+    """Check whether the current thread is inside a `transaction()` block.
+
+    Returns:
+        bool: True if a transaction is open.
+    """
+    return getattr(_THREAD_LOCAL, "transaction_depth", 0) > 0
+
+
+def _run_with_retry(operation: Callable[[], Any], max_retries: int, retry_delay: float) -> Any:
+    """Run a database operation, retrying it while the database is locked.
+
+    Args:
+        operation (Callable[[], Any]): The operation to run.
+        max_retries (int): Maximum number of retries if database is locked.
+        retry_delay (float): Delay before the first retry in seconds.
+
+    Returns:
+        Any: The return value of the operation.
+
+    Raises:
+        DatabaseError: If the operation could not be run after all retries.
+    """
+    retries = 0
+    
+    while retries <= max_retries:
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if "database is locked" in str(e) and retries < max_retries:
+                retries += 1
+                LOGGER.warning(f"Database locked, retrying ({retries}/{max_retries}) in {retry_delay}s: {e}")
+                time.sleep(retry_delay)
+                # Increase delay with each retry
+                retry_delay *= 1.5
+            else:
+                LOGGER.error(f"Database query error after {retries} retries: {e}")
+                raise DatabaseError(f"Database query error: {e}")
+        except DatabaseError:
+            raise
+        except Exception as e:
+            LOGGER.error(f"Database query error: {e}")
+            raise DatabaseError(f"Database query error: {e}")
 
 
 def execute_query(query: str, params: Tuple = (), commit: bool = False, max_retries: int = 5, retry_delay: float = 0.5) -> List[Dict[str, Any]]:
     """Execute a SQL query with retry logic for handling database locks.
 
+    SELECT queries run on the read connection of the current thread, all other
+    queries run on the write connection while holding the process-wide write lock.
+    Inside a `transaction()` block, all queries run on the write connection so
+    that they see the uncommitted changes of the transaction.
+
     Args:
         query (str): The SQL query to execute.
         params (Tuple, optional): The parameters for the query. Defaults to ().
@@ -115,33 +299,199 @@ def execute_query(query: str, params: Tuple = (), commit: bool = False, max_retr
     Raises:
         DatabaseError: If the query could not be executed after all retries.
     """
+    if _is_read_query(query) and not _in_transaction():
+        conn = get_read_connection()
+        
+        def run_read() -> List[Dict[str, Any]]:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+        
+        return _run_with_retry(run_read, max_retries, retry_delay)
+    
     conn = get_db_connection()
-    retries = 0
     
-    while retries <= max_retries:
-        try:
+    def run_write() -> List[Dict[str, Any]]:
+        with _WRITE_LOCK:
             cursor = conn.cursor()
             cursor.execute(query, params)
             
             # Note: commit parameter is ignored since we're using autocommit mode (isolation_level=None)
-            # This is intentional for Docker compatibility
+            # outside of transaction() blocks. This is intentional for Docker compatibility
             
             if query.strip().upper().startswith("SELECT"):
                 return [dict(row) for row in cursor.fetchall()]
             return []
-        except sqlite3.OperationalError as e:
-            if "database is locked" in str(e) and retries < max_retries:
-                retries += 1
-                LOGGER.warning(f"Database locked, retrying ({retries}/{max_retries}) in {retry_delay}s: {e}")
-                time.sleep(retry_delay)
-                # Increase delay with each retry
-                retry_delay *= 1.5
-            else:
-                LOGGER.error(f"Database query error after {retries} retries: {e}")
+    
+    return _run_with_retry(run_write, max_retries, retry_delay)
+
+
+def iter_query(
+    query: str,
+    params: Tuple = (),
+    as_dict: bool = True,
+    batch_size: int = 500,
+    max_retries: int = 5,
+    retry_delay: float = 0.5
+) -> Iterator[Union[Dict[str, Any], sqlite3.Row]]:
+    """Execute a SELECT query and yield the rows lazily.
+
+    Unlike `execute_query`, the result set is never held in memory as a
+    whole: rows are fetched from the cursor in batches of `batch_size`.
+    The query runs on the same connection `execute_query` would use for it.
+
+    Keep the iteration short when the database is not in WAL mode, as the
+    open cursor holds a read lock that blocks writers from committing.
+    Break out of the loop or call `close()` on the iterator to release the
+    cursor early.
+
+    Args:
+        query (str): The SELECT query to execute.
+        params (Tuple, optional): The parameters for the query. Defaults to ().
+        as_dict (bool, optional): Yield dicts. When False, the `sqlite3.Row`
+            objects are yielded as-is, which supports `row['key']`, `row[0]`
+            and `row.keys()` without copying. Defaults to True.
+        batch_size (int, optional): Rows to fetch per batch. Defaults to 500.
+        max_retries (int, optional): Maximum number of retries if database is locked. Defaults to 5.
+        retry_delay (float, optional): Delay between retries in seconds. Defaults to 0.5.
+
+    Yields:
+        Union[Dict[str, Any], sqlite3.Row]: The rows of the result.
+
+    Raises:
+        DatabaseError: If the query could not be executed after all retries.
+    """
+    if not query.strip().upper().startswith("SELECT"):
+        raise DatabaseError("iter_query only supports SELECT queries")
+
+    if _is_read_query(query) and not _in_transaction():
+        conn = get_read_connection()
+    else:
+        conn = get_db_connection()
+
+    cursor = _run_with_retry(
+        lambda: conn.execute(query, params),
+        max_retries, retry_delay
+    )
+
+    try:
+        while True:
+            try:
+                rows = cursor.fetchmany(batch_size)
+            except sqlite3.Error as e:
+                LOGGER.error(f"Database query error: {e}")
                 raise DatabaseError(f"Database query error: {e}")
-        except Exception as e:
-            LOGGER.error(f"Database query error: {e}")
-            raise DatabaseError(f"Database query error: {e}")
+
+            if not rows:
+                break
+
+            if as_dict:
+                for row in rows:
+                    yield dict(row)
+            else:
+                yield from rows
+    finally:
+        cursor.close()
+
+
+def execute_many(query: str, params_list: Iterable[Tuple], max_retries: int = 5, retry_delay: float = 0.5) -> int:
+    """Execute a SQL statement for every set of parameters in one transaction.
+
+    Use this for bulk inserts, updates and upserts. If the database is locked,
+    the whole batch is retried. Inside a `transaction()` block the batch becomes
+    part of the open transaction instead.
+
+    Args:
+        query (str): The SQL statement to execute.
+        params_list (Iterable[Tuple]): The parameters for each execution.
+        max_retries (int, optional): Maximum number of retries if database is locked. Defaults to 5.
+        retry_delay (float, optional): Delay between retries in seconds. Defaults to 0.5.
+
+    Returns:
+        int: The number of rows modified.
+
+    Raises:
+        DatabaseError: If the batch could not be executed after all retries.
+    """
+    params_list = list(params_list)
+    if not params_list:
+        return 0
+    
+    if _in_transaction():
+        conn = get_db_connection()
+        return _run_with_retry(
+            lambda: conn.executemany(query, params_list).rowcount,
+            max_retries, retry_delay
+        )
+    
+    def run_batch() -> int:
+        with transaction() as conn:
+            return conn.executemany(query, params_list).rowcount
+    
+    return _run_with_retry(run_batch, max_retries, retry_delay)
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Group all queries of the current thread in the block into one transaction.
+
+    The transaction is committed when the block exits normally and rolled back
+    when an exception is raised. The process-wide write lock is held for the
+    whole block, so keep slow work like network requests outside of it.
+    Nested blocks use savepoints, so an exception in an inner block only
+    rolls back the inner block.
+
+    Example:
+        with transaction():
+            execute_query("INSERT INTO ...", (...))
+            execute_many("INSERT INTO ...", rows)
+
+    Yields:
+        sqlite3.Connection: The write connection of the current thread.
+
+    Raises:
+        DatabaseError: If the transaction could not be started or committed.
+    """
+    conn = get_db_connection()
+    depth = getattr(_THREAD_LOCAL, "transaction_depth", 0)
+    
+    if depth > 0:
+        savepoint = f"readloom_sp_{depth}"
+        conn.execute(f"SAVEPOINT {savepoint}")
+        _THREAD_LOCAL.transaction_depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            conn.execute(f"RELEASE {savepoint}")
+        finally:
+            _THREAD_LOCAL.transaction_depth = depth
+        return
+    
+    with _WRITE_LOCK:
+        # IMMEDIATE takes the write lock on the database up front, so the
+        # commit can't fail because another connection started writing
+        _run_with_retry(lambda: conn.execute("BEGIN IMMEDIATE"), 5, 0.5)
+        _THREAD_LOCAL.transaction_depth = 1
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        else:
+            try:
+                if conn.in_transaction:
+                    _run_with_retry(lambda: conn.execute("COMMIT"), 5, 0.5)
+            except DatabaseError:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        finally:
+            _THREAD_LOCAL.transaction_depth = 0
 
 
 def setup_db() -> None:
@@ -323,13 +673,13 @@ def setup_db() -> None:
     # Create metadata_cache table
     execute_query("""
     CREATE TABLE IF NOT EXISTS metadata_cache (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        source TEXT NOT NULL,
-        source_id TEXT NOT NULL,
+        type TEXT NOT NULL,
+        id TEXT NOT NULL,
+        provider TEXT NOT NULL,
         data TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(source, source_id)
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (type, id)
     )
     """, commit=True)
     
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Disk cache of HTTP responses, shared by all outbound sessions.
+
+Successful GET responses are stored with their headers in the data folder,
+following their Cache-Control and Expires headers. A stored response is
+used without a request while it is fresh. Once it is stale, it is
+revalidated with If-None-Match and If-Modified-Since, and a 304 response
+makes it fresh again without downloading the body. Responses with
+Cache-Control no-store, a Vary of *, or a body larger than
+`MAX_ENTRY_SIZE` are not stored. Streamed requests, e.g. image downloads,
+are not cached at all.
+
+The cache holds at most `MAX_CACHE_SIZE` bytes. When it is full, the least
+recently used responses are removed. The time of use is the modification
+time of the file, so the order survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from requests import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from backend.base.helpers import get_data_dir
+from backend.base.logging import LOGGER
+
+# Where the responses are saved, relative to the data directory
+CACHE_FOLDER = Path("cache") / "http"
+
+# Most bytes of all stored responses together
+MAX_CACHE_SIZE = 200 * 1024 * 1024
+
+# Largest response body that is stored
+MAX_ENTRY_SIZE = 5 * 1024 * 1024
+
+# Longest freshness guessed from Last-Modified, for responses without
+# Cache-Control max-age or Expires
+MAX_HEURISTIC_SECONDS = 24 * 60 * 60
+
+# Status codes whose responses are stored
+CACHEABLE_STATUS_CODES = (200, 203)
+
+# Headers that describe the encoded body, which is not what is stored
+_BODY_HEADERS = ('Content-Encoding', 'Content-Length', 'Transfer-Encoding')
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Get the directives of a Cache-Control header, with lowercase names."""
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    """Get the time stamp of an HTTP date header."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(0, int(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def freshness_lifetime(headers: CaseInsensitiveDict) -> float:
+    """Get the seconds a response is fresh, following RFC 9111.
+
+    Args:
+        headers (CaseInsensitiveDict): The headers of the response.
+
+    Returns:
+        float: The freshness lifetime, minus the age of the response.
+        Zero or less if it has to be revalidated before it is used.
+    """
+    cache_control = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-cache' in cache_control:
+        return 0.0
+
+    date = _parse_date(headers.get('Date')) or time.time()
+    lifetime: Optional[float] = _seconds(cache_control.get('s-maxage'))
+    if lifetime is None:
+        lifetime = _seconds(cache_control.get('max-age'))
+    if lifetime is None and 'Expires' in headers:
+        expires = _parse_date(headers.get('Expires'))
+        lifetime = expires - date if expires is not None else 0.0
+    if lifetime is None:
+        last_modified = _parse_date(headers.get('Last-Modified'))
+        lifetime = 0.0
+        if last_modified is not None and last_modified < date:
+            lifetime = min((date - last_modified) / 10, MAX_HEURISTIC_SECONDS)
+
+    return lifetime - (_seconds(headers.get('Age')) or 0)
+
+
+class CachedEntry:
+    """A stored response."""
+
+    def __init__(self, meta: Dict[str, Any], body: bytes) -> None:
+        self.meta = meta
+        self.body = body
+
+    @property
+    def headers(self) -> CaseInsensitiveDict:
+        return CaseInsensitiveDict(self.meta['headers'])
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.meta['fresh_until']
+
+    def matches(self, request: PreparedRequest) -> bool:
+        """Check whether the request has the headers the response varies on."""
+        return all(
+            request.headers.get(name) == value
+            for name, value in self.meta['vary'].items()
+        )
+
+    def to_response(self, request: PreparedRequest, adapter) -> Response:
+        """Build a response of the stored one, as if it was received.
+
+        Args:
+            request (PreparedRequest): The request that is answered.
+            adapter: The transport adapter that answers it.
+
+        Returns:
+            Response: The response.
+        """
+        response = Response()
+        response.status_code = self.meta['status']
+        response.reason = self.meta['reason']
+        response.headers = self.headers
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.elapsed = timedelta(0)
+        response._content = self.body
+        response._content_consumed = True
+        response.from_cache = True  # type: ignore[attr-defined]
+        return response
+
+
+class HTTPCache:
+    """Size bounded LRU cache of HTTP responses on disk."""
+
+    def __init__(self, max_size: int = MAX_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._folder: Optional[Path] = None
+        # File name -> size, from least to most recently used
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+
+    def _get_folder(self) -> Path:
+        """Get the cache folder, indexing the stored responses on first use."""
+        with self._lock:
+            if self._folder is None:
+                folder = get_data_dir() / CACHE_FOLDER
+                folder.mkdir(parents=True, exist_ok=True)
+                files = []
+                for path in folder.glob('*.cache'):
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, path.name, stat.st_size))
+                for _, name, size in sorted(files):
+                    self._index[name] = size
+                    self._size += size
+                self._folder = folder
+            return self._folder
+
+    @staticmethod
+    def _file_name(url: str) -> str:
+        return hashlib.blake2b(url.encode(), digest_size=16).hexdigest() + '.cache'
+
+    def get(self, request: PreparedRequest) -> Optional[CachedEntry]:
+        """Get the stored response to a request.
+
+        Args:
+            request (PreparedRequest): The request.
+
+        Returns:
+            Optional[CachedEntry]: The response, fresh or stale, or None if
+            none is stored for the request.
+        """
+        folder = self._get_folder()
+        name = self._file_name(request.url or '')
+        path = folder / name
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            LOGGER.debug(f"Could not read cached response of {request.url}: {e}")
+            self._remove(name)
+            return None
+
+        with self._lock:
+            if name in self._index:
+                self._index.move_to_end(name)
+
+        entry = CachedEntry(meta, body)
+        if meta.get('url') != request.url or not entry.matches(request):
+            return None
+        return entry
+
+    def store(self, request: PreparedRequest, response: Response) -> None:
+        """Store a response, if it may be stored.
+
+        Args:
+            request (PreparedRequest): The request.
+            response (Response): The response, with its body read.
+        """
+        if request.method != 'GET' or response.status_code not in CACHEABLE_STATUS_CODES:
+            return
+
+        request_cache_control = parse_cache_control(request.headers.get('Cache-Control'))
+        cache_control = parse_cache_control(response.headers.get('Cache-Control'))
+        vary = [name.strip() for name in response.headers.get('Vary', '').split(',') if name.strip()]
+        if 'no-store' in request_cache_control or 'no-store' in cache_control or '*' in vary:
+            return
+
+        body = response.content
+        if len(body) > MAX_ENTRY_SIZE:
+            return
+
+        lifetime = freshness_lifetime(response.headers)
+        validators = 'ETag' in response.headers or 'Last-Modified' in response.headers
+        if lifetime <= 0 and not validators:
+            # It could never be used
+            self.remove(request.url or '')
+            return
+
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name not in _BODY_HEADERS
+        }
+        meta = {
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': headers,
+            'vary': {name: request.headers.get(name) for name in vary},
+            'fresh_until': time.time() + lifetime
+        }
+        self._write(self._file_name(request.url or ''), CachedEntry(meta, body))
+
+    def refresh(self, entry: CachedEntry, response: Response) -> CachedEntry:
+        """Update a stored response with the headers of a 304 response.
+
+        Args:
+            entry (CachedEntry): The stored response.
+            response (Response): The 304 response.
+
+        Returns:
+            CachedEntry: The updated response.
+        """
+        headers = entry.headers
+        for name, value in response.headers.items():
+            if name not in _BODY_HEADERS:
+                headers[name] = value
+
+        meta = dict(entry.meta)
+        meta['headers'] = dict(headers)
+        meta['fresh_until'] = time.time() + freshness_lifetime(headers)
+        refreshed = CachedEntry(meta, entry.body)
+        self._write(self._file_name(meta['url']), refreshed)
+        return refreshed
+
+    def _write(self, name: str, entry: CachedEntry) -> None:
+        """Save a response, and remove the least recently used ones if full."""
+        folder = self._get_folder()
+        data = json.dumps(entry.meta).encode() + b'\n' + entry.body
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, folder / name)
+        except OSError as e:
+            LOGGER.warning(f"Could not cache response of {entry.meta['url']}: {e}")
+            return
+
+        with self._lock:
+            self._size += len(data) - self._index.pop(name, 0)
+            self._index[name] = len(data)
+            evicted = []
+            while self._size > self.max_size and len(self._index) > 1:
+                old_name, old_size = self._index.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old_name)
+
+        for old_name in evicted:
+            try:
+                (folder / old_name).unlink()
+            except OSError:
+                pass
+
+    def _remove(self, name: str) -> None:
+        with self._lock:
+            self._size -= self._index.pop(name, 0)
+        try:
+            (self._get_folder() / name).unlink()
+        except OSError:
+            pass
+
+    def remove(self, url: str) -> None:
+        """Remove the stored response of a URL.
+
+        Args:
+            url (str): The URL.
+        """
+        self._remove(self._file_name(url))
+
+    def clear(self) -> None:
+        """Remove all stored responses."""
+        folder = self._get_folder()
+        with self._lock:
+            names = list(self._index)
+            self._index.clear()
+            self._size = 0
+        for name in names:
+            try:
+                (folder / name).unlink()
+            except OSError:
+                pass
+
+    @property
+    def size(self) -> int:
+        """The bytes of all stored responses."""
+        self._get_folder()
+        return self._size
+
+
+HTTP_CACHE = HTTPCache()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rate limiting and circuit breaking of outbound HTTP requests.
+
+Every outbound request goes through a guard of its host, shared by the
+whole process. The guard is a token bucket: a host allows `burst`
+requests at once and `rate` requests per second after that, and requests
+wait for their turn. When a host answers 429 or 503 with a Retry-After
+header, no requests are made to it until then.
+
+The guard is also a circuit breaker. After `FAILURE_THRESHOLD` failures in
+a row (connection errors, timeouts and 5xx responses), requests to the
+host fail at once for `OPEN_SECONDS`. After that a single request is let
+through to test the host, which closes the circuit again if it succeeds.
+
+A request doesn't wait for its turn longer than `MAX_WAIT`, its connect
+timeout, or the deadline set with `request_deadline()`. When it would have
+to, it fails at once with `RateLimitExceeded`.
+
+Requests go through the guard when they are made with a session from
+`create_session()`, or with `get()` and `post()` of this module. These
+also use the disk cache of `backend.internals.http_cache`, so a response
+that is still fresh is not requested again, and a stale one only costs
+a 304 response when it did not change.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Iterator, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.base.logging import LOGGER
+from backend.internals.http_cache import HTTP_CACHE, HTTPCache, parse_cache_control
+
+
+class HostLimit(NamedTuple):
+    # Requests per second
+    rate: float
+    # Requests that can be made at once
+    burst: int
+
+
+# Rate limits of the hosts we use, following their documented limits
+HOST_LIMITS: Dict[str, HostLimit] = {
+    'api.jikan.moe': HostLimit(1.0, 3),
+    'graphql.anilist.co': HostLimit(0.5, 5),
+    'api.mangadex.org': HostLimit(4.0, 5),
+    'uploads.mangadex.org': HostLimit(4.0, 5),
+    'openlibrary.org': HostLimit(1.0, 5),
+    'covers.openlibrary.org': HostLimit(2.0, 5),
+    'www.googleapis.com': HostLimit(2.0, 5),
+    'api2.isbndb.com': HostLimit(1.0, 1),
+    'www.worldcat.org': HostLimit(1.0, 3),
+    'api.myanimelist.net': HostLimit(1.0, 3),
+    'mangafire.to': HostLimit(1.0, 1),
+    'mangapark.net': HostLimit(1.0, 1),
+}
+
+# Rate limit of all other hosts
+DEFAULT_LIMIT = HostLimit(5.0, 10)
+
+# Failures in a row that open the circuit of a host
+FAILURE_THRESHOLD = 5
+
+# Seconds the circuit of a host stays open
+OPEN_SECONDS = 60.0
+
+# Most seconds a request waits for its turn, longer waits fail at once
+MAX_WAIT = 30.0
+
+# Status codes that count as a failure of the host
+FAILURE_STATUS_CODES = (500, 502, 503, 504)
+
+
+class RateLimitExceeded(requests.exceptions.ConnectionError):
+    """A request would have to wait too long for its turn."""
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """A request was not made, as its host is failing."""
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Get the seconds to wait from the Retry-After header of a response."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostGuard:
+    """Token bucket and circuit breaker of a host."""
+
+    def __init__(self, host: str, limit: HostLimit) -> None:
+        self.host = host
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._tokens = float(limit.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._failures = 0
+        self._open_until = 0.0
+        self._testing = False
+
+    def acquire(self, max_wait: float = MAX_WAIT) -> None:
+        """Wait for the turn of a request.
+
+        Args:
+            max_wait (float, optional): Most seconds to wait. Defaults to MAX_WAIT.
+
+        Raises:
+            CircuitOpen: The host is failing.
+            RateLimitExceeded: The request would have to wait too long.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._failures >= FAILURE_THRESHOLD:
+                if now < self._open_until or self._testing:
+                    raise CircuitOpen(f"Requests to {self.host} are paused, as it is failing")
+                # Let a single request through to test the host
+                self._testing = True
+
+            self._tokens = min(float(self.limit.burst), self._tokens + (now - self._updated) * self.limit.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = max(-self._tokens / self.limit.rate, self._paused_until - now, 0.0)
+            if wait > max_wait:
+                self._tokens += 1
+                self._testing = False
+                raise RateLimitExceeded(f"Requests to {self.host} are rate limited for {wait:.0f} more seconds")
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def record_response(self, response: requests.Response) -> None:
+        """Update the guard with the response of a request.
+
+        Args:
+            response (requests.Response): The response.
+        """
+        retry_after = _retry_after(response) if response.status_code in (429, 503) else None
+        if response.status_code == 429 and retry_after is None:
+            retry_after = 1.0 / self.limit.rate
+
+        with self._lock:
+            if retry_after is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                self._tokens = min(self._tokens, 0.0)
+                LOGGER.warning(f"{self.host} asked to wait {retry_after:.0f} seconds")
+
+        if response.status_code in FAILURE_STATUS_CODES:
+            self.record_failure()
+        else:
+            self._record_success()
+
+    def record_failure(self) -> None:
+        """Count a failed request, and open the circuit after too many."""
+        with self._lock:
+            self._testing = False
+            self._failures += 1
+            if self._failures >= FAILURE_THRESHOLD:
+                self._open_until = time.monotonic() + OPEN_SECONDS
+                LOGGER.warning(
+                    f"{self.host} failed {self._failures} times in a row, pausing requests for {OPEN_SECONDS:.0f} seconds"
+                )
+
+    def _record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        with self._lock:
+            if self._failures >= FAILURE_THRESHOLD:
+                LOGGER.info(f"{self.host} is answering again")
+            self._failures = 0
+            self._testing = False
+
+
+_GUARDS: Dict[str, HostGuard] = {}
+_GUARDS_LOCK = threading.Lock()
+
+
+def get_guard(host: str) -> HostGuard:
+    """Get the guard of a host.
+
+    Args:
+        host (str): The host name.
+
+    Returns:
+        HostGuard: The guard, shared by the whole process.
+    """
+    with _GUARDS_LOCK:
+        guard = _GUARDS.get(host)
+        if guard is None:
+            guard = _GUARDS[host] = HostGuard(host, HOST_LIMITS.get(host, DEFAULT_LIMIT))
+        return guard
+
+
+def set_host_limit(host: str, rate: float, burst: int) -> None:
+    """Change the rate limit of a host.
+
+    Args:
+        host (str): The host name.
+        rate (float): Requests per second.
+        burst (int): Requests that can be made at once.
+    """
+    limit = HostLimit(rate, burst)
+    with _GUARDS_LOCK:
+        HOST_LIMITS[host] = limit
+        _GUARDS[host] = HostGuard(host, limit)
+
+
+_THREAD_LOCAL = threading.local()
+
+
+@contextmanager
+def request_deadline(deadline: float) -> Iterator[None]:
+    """Don't let requests of the current thread wait for their turn past a deadline.
+
+    Requests that would have to wait longer fail at once with
+    `RateLimitExceeded`, instead of holding the thread after the result
+    is no longer wanted.
+
+    Args:
+        deadline (float): The deadline, in `time.monotonic()` seconds.
+    """
+    previous = getattr(_THREAD_LOCAL, 'deadline', None)
+    _THREAD_LOCAL.deadline = deadline if previous is None else min(previous, deadline)
+    try:
+        yield
+    finally:
+        _THREAD_LOCAL.deadline = previous
+
+
+def _max_wait(timeout) -> float:
+    """Get the most seconds a request may wait for its turn.
+
+    Args:
+        timeout: The timeout of the request, as given to requests.
+
+    Returns:
+        float: The seconds, at most `MAX_WAIT`.
+    """
+    max_wait = MAX_WAIT
+    if isinstance(timeout, tuple):
+        timeout = timeout[0]
+    if isinstance(timeout, (int, float)):
+        max_wait = min(max_wait, float(timeout))
+    deadline = getattr(_THREAD_LOCAL, 'deadline', None)
+    if deadline is not None:
+        max_wait = min(max_wait, deadline - time.monotonic())
+    return max(0.0, max_wait)
+
+
+class GuardedAdapter(HTTPAdapter):
+    """Transport adapter that sends requests through the guard of their host,
+    and answers them from the HTTP cache when it can."""
+
+    def __init__(self, cache: Optional[HTTPCache] = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def _send_guarded(self, request, **kwargs):
+        guard = get_guard(urlsplit(request.url).hostname or '')
+        guard.acquire(_max_wait(kwargs.get('timeout')))
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            guard.record_failure()
+            raise
+        guard.record_response(response)
+        return response
+
+    def send(self, request, stream=False, **kwargs):
+        if (
+            self.cache is None
+            or stream
+            or request.method != 'GET'
+            or 'If-None-Match' in request.headers
+            or 'If-Modified-Since' in request.headers
+        ):
+            response = self._send_guarded(request, stream=stream, **kwargs)
+            if (
+                self.cache is not None
+                and request.method not in ('GET', 'HEAD')
+                and response.status_code < 400
+            ):
+                # The stored response of the URL may have been changed
+                self.cache.remove(request.url)
+            return response
+
+        cache_control = parse_cache_control(request.headers.get('Cache-Control'))
+        entry = None
+        if 'no-store' not in cache_control:
+            entry = self.cache.get(request)
+
+        if entry is not None:
+            if entry.is_fresh and 'no-cache' not in cache_control and cache_control.get('max-age') != '0':
+                return entry.to_response(request, self)
+
+            # Revalidate the stored response
+            request = request.copy()
+            headers = entry.headers
+            if 'ETag' in headers:
+                request.headers['If-None-Match'] = headers['ETag']
+            if 'Last-Modified' in headers:
+                request.headers['If-Modified-Since'] = headers['Last-Modified']
+
+        response = self._send_guarded(request, stream=stream, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            response.close()
+            return self.cache.refresh(entry, response).to_response(request, self)
+
+        self.cache.store(request, response)
+        return response
+
+
+def create_session(cache: bool = True) -> requests.Session:
+    """Create a requests session whose requests are rate limited and circuit broken.
+
+    Args:
+        cache (bool, optional): Whether to answer GET requests from the
+            HTTP cache when possible. Defaults to True.
+
+    Returns:
+        requests.Session: The session.
+    """
+    session = requests.Session()
+    adapter = GuardedAdapter(HTTP_CACHE if cache else None)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _thread_session() -> requests.Session:
+    """Get the session of the current thread for `get()` and `post()`."""
+    session = getattr(_THREAD_LOCAL, 'session', None)
+    if session is None:
+        session = _THREAD_LOCAL.session = create_session()
+    return session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Like `requests.get()`, but rate limited and circuit broken."""
+    return _thread_session().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """Like `requests.post()`, but rate limited and circuit broken."""
+    return _thread_session().post(url, **kwargs)
@@ -2,24 +2,117 @@
 # -*- coding: utf-8 -*-
 
 import json
+import threading
+from copy import deepcopy
 from typing import Any, Dict, List, Optional, Union
 
 from backend.base.custom_exceptions import InvalidSettingValue
 from backend.base.definitions import Constants, Settings as SettingsType
 from backend.base.logging import LOGGER
+from backend.internals import db
 from backend.internals.db import execute_query
 
 
+# Process-wide cache of the settings table. It is filled on first use and
+# cleared by `Settings.update()`. The cache belongs to the database at
+# `_CACHE_DB_PATH`, so it is reloaded when the database location changes.
+_CACHE_LOCK = threading.RLock()
+_CACHE_DB_PATH: Optional[str] = None
+_INITIALIZED_DB_PATH: Optional[str] = None
+_CACHED_VALUES: Optional[Dict[str, Any]] = None
+_CACHED_SETTINGS: Optional[SettingsType] = None
+_SETTINGS_VERSION = 0
+
+
+def get_settings_version() -> int:
+    """Get the version of the settings.
+
+    The version is increased every time the settings are updated, so
+    long running tasks can check whether they have to re-read their
+    settings without querying the database.
+
+    Returns:
+        int: The current version of the settings.
+    """
+    return _SETTINGS_VERSION
+
+
+def invalidate_settings_cache() -> None:
+    """Clear the settings cache and increase the settings version.
+
+    Call this after writing to the settings table without `Settings.update()`.
+    """
+    global _CACHED_VALUES, _CACHED_SETTINGS, _SETTINGS_VERSION
+
+    with _CACHE_LOCK:
+        _CACHED_VALUES = None
+        _CACHED_SETTINGS = None
+        _SETTINGS_VERSION += 1
+
+
+def _load_settings() -> Dict[str, Any]:
+    """Get the decoded values of all settings, from the cache if possible.
+
+    Returns:
+        Dict[str, Any]: The settings, by key.
+    """
+    global _CACHE_DB_PATH, _CACHED_VALUES, _CACHED_SETTINGS
+
+    with _CACHE_LOCK:
+        if _CACHED_VALUES is not None and _CACHE_DB_PATH == db.DB_PATH:
+            return _CACHED_VALUES
+
+        settings_rows = execute_query("SELECT key, value FROM settings")
+        settings_dict = {}
+
+        for row in settings_rows:
+            key = row["key"]
+            value = row["value"]
+
+            # Skip NULL values
+            if value is None:
+                LOGGER.warning(f"Found NULL value for setting {key}, using default instead")
+                continue
+
+            try:
+                settings_dict[key] = json.loads(value)
+            except (json.JSONDecodeError, TypeError) as e:
+                LOGGER.error(f"Error parsing JSON for setting {key}: {e}")
+                # Skip this setting
+
+        _CACHE_DB_PATH = db.DB_PATH
+        _CACHED_VALUES = settings_dict
+        _CACHED_SETTINGS = None
+        return settings_dict
+
+
 class Settings:
-    """Class for managing application settings."""
+    """Class for managing application settings.
+
+    The settings are read from the database once and then served from a
+    process-wide cache until they are changed with `update()`.
+    """
     
     def __init__(self):
         """Initialize the settings."""
+        global _INITIALIZED_DB_PATH
+
         self.restart_on_hosting_changes = True
-        self._initialize_default_settings()
+
+        # Only set up the table once per database
+        if _INITIALIZED_DB_PATH != db.DB_PATH:
+            with _CACHE_LOCK:
+                if _INITIALIZED_DB_PATH != db.DB_PATH:
+                    if self._initialize_default_settings():
+                        _INITIALIZED_DB_PATH = db.DB_PATH
+                    invalidate_settings_cache()
     
-    def _initialize_default_settings(self) -> None:
-        """Initialize default settings if they don't exist."""
+    def _initialize_default_settings(self) -> bool:
+        """Initialize default settings if they don't exist.
+
+        Returns:
+            bool: True if the settings table is ready.
+        """
         default_settings = {
             "host": Constants.DEFAULT_HOST,
             "port": Constants.DEFAULT_PORT,
@@ -32,7 +125,8 @@ class Settings:
             "calendar_refresh_hours": Constants.DEFAULT_CALENDAR_REFRESH_HOURS,
             "task_interval_minutes": Constants.DEFAULT_TASK_INTERVAL_MINUTES,
             "ebook_storage": Constants.DEFAULT_EBOOK_STORAGE,
-            "root_folders": Constants.DEFAULT_ROOT_FOLDERS
+            "root_folders": Constants.DEFAULT_ROOT_FOLDERS,
+            "scan_workers": Constants.DEFAULT_SCAN_WORKERS
         }
         
         # Ensure settings table exists
@@ -48,7 +142,7 @@ class Settings:
             LOGGER.info("Settings table created or verified")
         except Exception as e:
             LOGGER.error(f"Error creating settings table: {e}")
-            return
+            return False
         
         # Check which settings already exist
         try:
@@ -73,45 +167,42 @@ class Settings:
                             LOGGER.error(f"Error initializing setting {key}: {e}")
         except Exception as e:
             LOGGER.error(f"Error initializing settings: {e}")
+            return False
+    
+        return True
     
     def get_settings(self) -> SettingsType:
         """Get all settings.
 
+        The root folders are copied, so callers can change them without
+        changing the cache.
+
         Returns:
             SettingsType: All settings.
         """
-        settings_rows = execute_query("SELECT key, value FROM settings")
-        settings_dict = {}
-        
-        for row in settings_rows:
-            key = row["key"]
-            value = row["value"]
-            
-            # Skip NULL values
-            if value is None:
-                LOGGER.warning(f"Found NULL value for setting {key}, using default instead")
-                continue
-                
-            try:
-                settings_dict[key] = json.loads(value)
-            except (json.JSONDecodeError, TypeError) as e:
-                LOGGER.error(f"Error parsing JSON for setting {key}: {e}")
-                # Skip this setting
-        
-        return SettingsType(
-            host=settings_dict.get("host", Constants.DEFAULT_HOST),
-            port=settings_dict.get("port", Constants.DEFAULT_PORT),
-            url_base=settings_dict.get("url_base", Constants.DEFAULT_URL_BASE),
-            log_level=settings_dict.get("log_level", Constants.DEFAULT_LOG_LEVEL),
-            log_rotation=settings_dict.get("log_rotation", Constants.DEFAULT_LOG_ROTATION),
-            log_size=settings_dict.get("log_size", Constants.DEFAULT_LOG_SIZE),
-            metadata_cache_days=settings_dict.get("metadata_cache_days", Constants.DEFAULT_METADATA_CACHE_DAYS),
-            calendar_range_days=settings_dict.get("calendar_range_days", Constants.DEFAULT_CALENDAR_RANGE_DAYS),
-            calendar_refresh_hours=settings_dict.get("calendar_refresh_hours", Constants.DEFAULT_CALENDAR_REFRESH_HOURS),
-            task_interval_minutes=settings_dict.get("task_interval_minutes", Constants.DEFAULT_TASK_INTERVAL_MINUTES),
-            ebook_storage=settings_dict.get("ebook_storage", Constants.DEFAULT_EBOOK_STORAGE),
-            root_folders=settings_dict.get("root_folders", Constants.DEFAULT_ROOT_FOLDERS)
-        )
+        global _CACHED_SETTINGS
+
+        with _CACHE_LOCK:
+            settings_dict = _load_settings()
+            if _CACHED_SETTINGS is not None:
+                return _CACHED_SETTINGS._replace(root_folders=deepcopy(_CACHED_SETTINGS.root_folders))
+
+            _CACHED_SETTINGS = SettingsType(
+                host=settings_dict.get("host", Constants.DEFAULT_HOST),
+                port=settings_dict.get("port", Constants.DEFAULT_PORT),
+                url_base=settings_dict.get("url_base", Constants.DEFAULT_URL_BASE),
+                log_level=settings_dict.get("log_level", Constants.DEFAULT_LOG_LEVEL),
+                log_rotation=settings_dict.get("log_rotation", Constants.DEFAULT_LOG_ROTATION),
+                log_size=settings_dict.get("log_size", Constants.DEFAULT_LOG_SIZE),
+                metadata_cache_days=settings_dict.get("metadata_cache_days", Constants.DEFAULT_METADATA_CACHE_DAYS),
+                calendar_range_days=settings_dict.get("calendar_range_days", Constants.DEFAULT_CALENDAR_RANGE_DAYS),
+                calendar_refresh_hours=settings_dict.get("calendar_refresh_hours", Constants.DEFAULT_CALENDAR_REFRESH_HOURS),
+                task_interval_minutes=settings_dict.get("task_interval_minutes", Constants.DEFAULT_TASK_INTERVAL_MINUTES),
+                ebook_storage=settings_dict.get("ebook_storage", Constants.DEFAULT_EBOOK_STORAGE),
+                root_folders=settings_dict.get("root_folders", Constants.DEFAULT_ROOT_FOLDERS),
+                scan_workers=settings_dict.get("scan_workers", Constants.DEFAULT_SCAN_WORKERS)
+            )
+            return _CACHED_SETTINGS._replace(root_folders=deepcopy(_CACHED_SETTINGS.root_folders))
     
     def get_setting(self, key: str) -> Any:
         """Get a setting.
@@ -125,11 +216,12 @@ class Settings:
         Raises:
             KeyError: If the setting does not exist.
         """
-        result = execute_query("SELECT value FROM settings WHERE key = ?", (key,))
-        if not result:
+        settings_dict = _load_settings()
+        if key not in settings_dict:
             raise KeyError(f"Setting {key} does not exist")
-        
-        return json.loads(result[0]["value"])
+
+        # Copy so changes by the caller don't end up in the cache
+        return deepcopy(settings_dict[key])
     
     def update(self, settings: Dict[str, Any]) -> None:
         """Update settings.
@@ -141,82 +233,90 @@ class Settings:
             InvalidSettingValue: If a setting value is invalid.
         """
         need_restart = False
-        
-        for key, value in settings.items():
-            # Validate settings
-            if key == "host":
-                if not isinstance(value, str):
-                    raise InvalidSettingValue("Host must be a string")
-                need_restart = True
             
-            elif key == "port":
-                if not isinstance(value, int) or value < 1 or value > 65535:
-                    raise InvalidSettingValue("Port must be an integer between 1 and 65535")
-                need_restart = True
+        try:
+            for key, value in settings.items():
+                # Validate settings
+                if key == "host":
+                    if not isinstance(value, str):
+                        raise InvalidSettingValue("Host must be a string")
+                    need_restart = True
+
+                elif key == "port":
+                    if not isinstance(value, int) or value < 1 or value > 65535:
+                        raise InvalidSettingValue("Port must be an integer between 1 and 65535")
+                    need_restart = True
             
-            elif key == "url_base":
-                if not isinstance(value, str):
-                    raise InvalidSettingValue("URL base must be a string")
-                # Ensure URL base starts with a slash if not empty
-                if value and not value.startswith("/"):
-                    value = f"/{value}"
-                # Ensure URL base does not end with a slash
-                if value.endswith("/"):
-                    value = value[:-1]
-                need_restart = True
+                elif key == "url_base":
+                    if not isinstance(value, str):
+                        raise InvalidSettingValue("URL base must be a string")
+                    # Ensure URL base starts with a slash if not empty
+                    if value and not value.startswith("/"):
+                        value = f"/{value}"
+                    # Ensure URL base does not end with a slash
+                    if value.endswith("/"):
+                        value = value[:-1]
+                    need_restart = True
             
-            elif key == "log_level":
-                valid_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
-                if not isinstance(value, str) or value.upper() not in valid_levels:
-                    raise InvalidSettingValue(f"Log level must be one of {', '.join(valid_levels)}")
+                elif key == "log_level":
+                    valid_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+                    if not isinstance(value, str) or value.upper() not in valid_levels:
+                        raise InvalidSettingValue(f"Log level must be one of {', '.join(valid_levels)}")
             
-            elif key == "log_rotation":
-                if not isinstance(value, int) or value < 1:
-                    raise InvalidSettingValue("Log rotation must be a positive integer")
+                elif key == "log_rotation":
+                    if not isinstance(value, int) or value < 1:
+                        raise InvalidSettingValue("Log rotation must be a positive integer")
             
-            elif key == "log_size":
-                if not isinstance(value, int) or value < 1:
-                    raise InvalidSettingValue("Log size must be a positive integer")
+                elif key == "log_size":
+                    if not isinstance(value, int) or value < 1:
+                        raise InvalidSettingValue("Log size must be a positive integer")
             
-            elif key == "metadata_cache_days":
-                if not isinstance(value, int) or value < 1:
-                    raise InvalidSettingValue("Metadata cache days must be a positive integer")
+                elif key == "metadata_cache_days":
+                    if not isinstance(value, int) or value < 1:
+                        raise InvalidSettingValue("Metadata cache days must be a positive integer")
             
-            elif key == "calendar_range_days":
-                if not isinstance(value, int) or value < 1:
-                    raise InvalidSettingValue("Calendar range days must be a positive integer")
+                elif key == "calendar_range_days":
+                    if not isinstance(value, int) or value < 1:
+                        raise InvalidSettingValue("Calendar range days must be a positive integer")
             
-            elif key == "calendar_refresh_hours":
-                if not isinstance(value, int) or value < 1:
-                    raise InvalidSettingValue("Calendar refresh hours must be a positive integer")
+                elif key == "calendar_refresh_hours":
+                    if not isinstance(value, int) or value < 1:
+                        raise InvalidSettingValue("Calendar refresh hours must be a positive integer")
             
-            elif key == "task_interval_minutes":
-                if not isinstance(value, int) or value < 1:
-                    raise InvalidSettingValue("Task interval minutes must be a positive integer")
-                    
-            elif key == "ebook_storage":
-                if not isinstance(value, str):
-                    raise InvalidSettingValue("E-book storage path must be a string")
+                elif key == "task_interval_minutes":
+                    if not isinstance(value, int) or value < 1:
+                        raise InvalidSettingValue("Task interval minutes must be a positive integer")
+
+                elif key == "ebook_storage":
+                    if not isinstance(value, str):
+                        raise InvalidSettingValue("E-book storage path must be a string")
+
+                elif key == "scan_workers":
+                    if not isinstance(value, int) or value < 0:
+                        raise InvalidSettingValue("Scan workers must be a non-negative integer")
+
+                elif key == "root_folders":
+                    if not isinstance(value, list):
+                        raise InvalidSettingValue("Root folders must be a list")
                     
-            elif key == "root_folders":
-                if not isinstance(value, list):
-                    raise InvalidSettingValue("Root folders must be a list")
+                    # Validate each root folder has path and name
+                    for folder in value:
+                        if not isinstance(folder, dict) or "path" not in folder or "name" not in folder:
+                            raise InvalidSettingValue("Each root folder must have a path and name")
+                        if not isinstance(folder["path"], str) or not isinstance(folder["name"], str):
+                            raise InvalidSettingValue("Root folder path and name must be strings")
                 
-                # Validate each root folder has path and name
-                for folder in value:
-                    if not isinstance(folder, dict) or "path" not in folder or "name" not in folder:
-                        raise InvalidSettingValue("Each root folder must have a path and name")
-                    if not isinstance(folder["path"], str) or not isinstance(folder["name"], str):
-                        raise InvalidSettingValue("Root folder path and name must be strings")
-            
-            # Update setting
-            execute_query(
-                "UPDATE settings SET value = ?, updated_at = CURRENT_TIMESTAMP WHERE key = ?",
-                (json.dumps(value), key),
-                commit=True
-            )
+                # Update setting
+                execute_query(
+                    "UPDATE settings SET value = ?, updated_at = CURRENT_TIMESTAMP WHERE key = ?",
+                    (json.dumps(value), key),
+                    commit=True
+                )
             
-            LOGGER.info(f"Updated setting {key} to {value}")
+                LOGGER.info(f"Updated setting {key} to {value}")
+        finally:
+            # Also when only some of the settings could be updated
+            invalidate_settings_cache()
         
         if need_restart and self.restart_on_hosting_changes:
             from backend.internals.server import SERVER
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0023: Add indexes for the hot join and lookup columns.
+
+Apart from manga_volume_cache, the schema had no secondary indexes, so every
+lookup of the volumes, chapters, calendar events, collection items and e-book
+files of a series was a full table scan.
+
+The calendar_events and author_books tables only hold derived data, so
+duplicate rows are removed before their UNIQUE indexes are created. The
+calendar indexes are partial because a calendar event belongs to either a
+volume or a chapter, and SQLite treats NULL values as distinct.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query, transaction
+
+
+# (index name, CREATE statement)
+INDEXES = [
+    # series: lookups by provider id during scans and imports
+    ("idx_series_metadata",
+     "CREATE INDEX IF NOT EXISTS idx_series_metadata ON series(metadata_source, metadata_id)"),
+
+    # volumes: every series page and get_or_create_volume
+    ("idx_volumes_series_number",
+     "CREATE INDEX IF NOT EXISTS idx_volumes_series_number ON volumes(series_id, volume_number)"),
+
+    # chapters: series pages, calendar refresh and the calendar date range
+    ("idx_chapters_series",
+     "CREATE INDEX IF NOT EXISTS idx_chapters_series ON chapters(series_id, chapter_number)"),
+    ("idx_chapters_release_date",
+     "CREATE INDEX IF NOT EXISTS idx_chapters_release_date ON chapters(release_date)"),
+
+    # calendar_events: one event per volume/chapter and date
+    ("idx_calendar_events_volume",
+     "CREATE UNIQUE INDEX IF NOT EXISTS idx_calendar_events_volume "
+     "ON calendar_events(series_id, volume_id, event_date) WHERE volume_id IS NOT NULL"),
+    ("idx_calendar_events_chapter",
+     "CREATE UNIQUE INDEX IF NOT EXISTS idx_calendar_events_chapter "
+     "ON calendar_events(series_id, chapter_id, event_date) WHERE chapter_id IS NOT NULL"),
+    ("idx_calendar_events_date",
+     "CREATE INDEX IF NOT EXISTS idx_calendar_events_date ON calendar_events(event_date)"),
+
+    # collection_items: ownership checks for series, volumes and chapters
+    ("idx_collection_items_series",
+     "CREATE INDEX IF NOT EXISTS idx_collection_items_series "
+     "ON collection_items(series_id, volume_id, item_type)"),
+    ("idx_collection_items_ebook_file",
+     "CREATE INDEX IF NOT EXISTS idx_collection_items_ebook_file ON collection_items(ebook_file_id)"),
+
+    # ebook_files: duplicate checks during scans and series pages
+    ("idx_ebook_files_volume",
+     "CREATE INDEX IF NOT EXISTS idx_ebook_files_volume ON ebook_files(volume_id)"),
+    ("idx_ebook_files_series",
+     "CREATE INDEX IF NOT EXISTS idx_ebook_files_series ON ebook_files(series_id)"),
+
+    # author_books: one link per author and series
+    ("idx_author_books_author_series",
+     "CREATE UNIQUE INDEX IF NOT EXISTS idx_author_books_author_series ON author_books(author_id, series_id)"),
+    ("idx_author_books_series",
+     "CREATE INDEX IF NOT EXISTS idx_author_books_series ON author_books(series_id)"),
+
+    # series_collections: the UNIQUE(series_id, collection_id) index can't
+    # be used for lookups by collection
+    ("idx_series_collections_collection",
+     "CREATE INDEX IF NOT EXISTS idx_series_collections_collection ON series_collections(collection_id)"),
+]
+
+
+def _remove_duplicates() -> None:
+    """Remove duplicate rows that would violate the new UNIQUE indexes."""
+    with transaction():
+        execute_query("""
+            DELETE FROM calendar_events
+            WHERE volume_id IS NOT NULL AND id NOT IN (
+                SELECT MIN(id) FROM calendar_events
+                WHERE volume_id IS NOT NULL
+                GROUP BY series_id, volume_id, event_date
+            )
+        """)
+        execute_query("""
+            DELETE FROM calendar_events
+            WHERE chapter_id IS NOT NULL AND id NOT IN (
+                SELECT MIN(id) FROM calendar_events
+                WHERE chapter_id IS NOT NULL
+                GROUP BY series_id, chapter_id, event_date
+            )
+        """)
+        execute_query("""
+            DELETE FROM author_books
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM author_books
+                GROUP BY author_id, series_id
+            )
+        """)
+
+
+def migrate():
+    """Create the indexes for the hot join and lookup columns."""
+    LOGGER.info("Adding indexes for hot join and lookup columns")
+
+    try:
+        _remove_duplicates()
+    except Exception as e:
+        LOGGER.warning(f"Could not remove duplicate rows before adding UNIQUE indexes: {e}")
+
+    created = 0
+    for name, statement in INDEXES:
+        try:
+            execute_query(statement, commit=True)
+            created += 1
+        except Exception as e:
+            # A missing table or leftover duplicates shouldn't block the other indexes
+            LOGGER.warning(f"Could not create index {name}: {e}")
+
+    # Give the query planner statistics for the new indexes
+    try:
+        execute_query("ANALYZE", commit=True)
+    except Exception as e:
+        LOGGER.warning(f"Could not analyze database: {e}")
+
+    LOGGER.info(f"Created {created}/{len(INDEXES)} indexes")
+    return True
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping hot path indexes")
+    for name, _ in INDEXES:
+        execute_query(f"DROP INDEX IF EXISTS {name}", commit=True)
+    LOGGER.info("Hot path indexes dropped")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0024: Add the scan manifest table.
+
+The manifest remembers the inode, size and modification time of every entry
+found in a series folder during the last e-book scan, so the next scan only
+has to process new, changed and removed files. Rows are removed together
+with their series, volume or e-book file, which makes the next scan pick
+the file up again.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+
+def migrate():
+    """Create the scan_manifest table."""
+    LOGGER.info("Adding scan manifest table")
+
+    try:
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS scan_manifest (
+                path TEXT PRIMARY KEY,
+                series_id INTEGER NOT NULL,
+                volume_id INTEGER,
+                ebook_file_id INTEGER,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (series_id) REFERENCES series (id) ON DELETE CASCADE,
+                FOREIGN KEY (volume_id) REFERENCES volumes (id) ON DELETE CASCADE,
+                FOREIGN KEY (ebook_file_id) REFERENCES ebook_files (id) ON DELETE CASCADE
+            )
+        """, commit=True)
+        execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_scan_manifest_series ON scan_manifest(series_id)",
+            commit=True
+        )
+        execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_scan_manifest_volume ON scan_manifest(volume_id)",
+            commit=True
+        )
+        execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_scan_manifest_ebook_file ON scan_manifest(ebook_file_id)",
+            commit=True
+        )
+
+        LOGGER.info("Scan manifest table added successfully")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Error adding scan manifest table: {e}")
+        return False
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping scan manifest table")
+    execute_query("DROP TABLE IF EXISTS scan_manifest", commit=True)
+    LOGGER.info("Scan manifest table dropped")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0025: Add the scan job tables.
+
+A scan job is an e-book scan that runs in the background. The job records
+its progress after every series folder, together with the folders it
+already scanned, so an interrupted job can continue where it stopped.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+
+def migrate():
+    """Create the scan_jobs and scan_job_folders tables."""
+    LOGGER.info("Adding scan job tables")
+
+    try:
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS scan_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL,
+                series_id INTEGER,
+                content_type TEXT,
+                custom_path TEXT,
+                full_scan INTEGER NOT NULL DEFAULT 0,
+                folders_total INTEGER NOT NULL DEFAULT 0,
+                folders_done INTEGER NOT NULL DEFAULT 0,
+                stats TEXT,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """, commit=True)
+        execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_scan_jobs_status ON scan_jobs(status)",
+            commit=True
+        )
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS scan_job_folders (
+                job_id INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                PRIMARY KEY (job_id, path),
+                FOREIGN KEY (job_id) REFERENCES scan_jobs (id) ON DELETE CASCADE
+            )
+        """, commit=True)
+
+        LOGGER.info("Scan job tables added successfully")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Error adding scan job tables: {e}")
+        return False
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping scan job tables")
+    execute_query("DROP TABLE IF EXISTS scan_job_folders", commit=True)
+    execute_query("DROP TABLE IF EXISTS scan_jobs", commit=True)
+    LOGGER.info("Scan job tables dropped")
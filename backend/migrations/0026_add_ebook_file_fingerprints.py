@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0026: Add content fingerprints to the ebook_files table.
+
+The fingerprint is a hash of the size and a few blocks of a file, and the
+full hash a hash of the whole file. The full hash is only computed for
+files that share their fingerprint with another file. Together they are
+used to find copies of the same file in different folders.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+
+def migrate():
+    """Add the fingerprint and full_hash columns to the ebook_files table."""
+    LOGGER.info("Adding fingerprint columns to ebook_files table")
+
+    try:
+        # PRAGMA statements return no rows through execute_query
+        columns = execute_query("SELECT name FROM pragma_table_info('ebook_files')")
+        column_names = [col['name'] for col in columns]
+
+        if 'fingerprint' not in column_names:
+            execute_query("ALTER TABLE ebook_files ADD COLUMN fingerprint TEXT", commit=True)
+        if 'full_hash' not in column_names:
+            execute_query("ALTER TABLE ebook_files ADD COLUMN full_hash TEXT", commit=True)
+
+        execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_ebook_files_fingerprint ON ebook_files(fingerprint)",
+            commit=True
+        )
+
+        LOGGER.info("Fingerprint columns added successfully")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Error adding fingerprint columns: {e}")
+        return False
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping fingerprint index of ebook_files table")
+    execute_query("DROP INDEX IF EXISTS idx_ebook_files_fingerprint", commit=True)
+    LOGGER.info("Fingerprint index dropped, the columns are left in place")
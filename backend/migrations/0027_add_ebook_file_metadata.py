@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0027: Add the e-book file metadata table.
+
+The table holds what was read from inside CBZ, CBR and EPUB files: the
+page count, the embedded ComicInfo.xml or OPF metadata and the path of the
+extracted cover. The size and modification time of the file at that
+moment are stored with it, so a changed file is read again.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+
+def migrate():
+    """Create the ebook_file_metadata table."""
+    LOGGER.info("Adding e-book file metadata table")
+
+    try:
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS ebook_file_metadata (
+                ebook_file_id INTEGER PRIMARY KEY,
+                file_size INTEGER,
+                file_mtime_ns INTEGER,
+                page_count INTEGER,
+                metadata_format TEXT,
+                metadata TEXT,
+                cover_path TEXT,
+                error TEXT,
+                introspected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (ebook_file_id) REFERENCES ebook_files (id) ON DELETE CASCADE
+            )
+        """, commit=True)
+
+        LOGGER.info("E-book file metadata table added successfully")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Error adding e-book file metadata table: {e}")
+        return False
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping e-book file metadata table")
+    execute_query("DROP TABLE IF EXISTS ebook_file_metadata", commit=True)
+    LOGGER.info("E-book file metadata table dropped")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0028: Track which volumes, chapters and series changed for the calendar.
+
+Triggers record the volumes and chapters whose release date, number or
+title changed, and the series whose title or metadata source changed, in
+the calendar_changes table. The calendar refresh only looks at these rows,
+and at the releases that moved into the upcoming range, instead of every
+volume and chapter. All series are recorded as changed once, so the first
+refresh after the migration re-checks the whole calendar.
+
+The index on the release date of volumes is used for the upcoming range.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+
+# (trigger name, CREATE statement)
+TRIGGERS = [
+    ("trg_calendar_volume_insert", """
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_volume_insert
+        AFTER INSERT ON volumes
+        FOR EACH ROW
+        WHEN NEW.release_date IS NOT NULL
+        BEGIN
+            INSERT OR IGNORE INTO calendar_changes (item_type, item_id) VALUES ('volume', NEW.id);
+        END
+    """),
+    ("trg_calendar_volume_update", """
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_volume_update
+        AFTER UPDATE OF series_id, volume_number, title, release_date ON volumes
+        FOR EACH ROW
+        WHEN NEW.release_date IS NOT OLD.release_date
+            OR NEW.volume_number IS NOT OLD.volume_number
+            OR NEW.title IS NOT OLD.title
+            OR NEW.series_id IS NOT OLD.series_id
+        BEGIN
+            INSERT OR IGNORE INTO calendar_changes (item_type, item_id) VALUES ('volume', NEW.id);
+        END
+    """),
+    ("trg_calendar_chapter_insert", """
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_chapter_insert
+        AFTER INSERT ON chapters
+        FOR EACH ROW
+        WHEN NEW.release_date IS NOT NULL
+        BEGIN
+            INSERT OR IGNORE INTO calendar_changes (item_type, item_id) VALUES ('chapter', NEW.id);
+        END
+    """),
+    ("trg_calendar_chapter_update", """
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_chapter_update
+        AFTER UPDATE OF series_id, chapter_number, title, release_date ON chapters
+        FOR EACH ROW
+        WHEN NEW.release_date IS NOT OLD.release_date
+            OR NEW.chapter_number IS NOT OLD.chapter_number
+            OR NEW.title IS NOT OLD.title
+            OR NEW.series_id IS NOT OLD.series_id
+        BEGIN
+            INSERT OR IGNORE INTO calendar_changes (item_type, item_id) VALUES ('chapter', NEW.id);
+        END
+    """),
+    ("trg_calendar_series_update", """
+        CREATE TRIGGER IF NOT EXISTS trg_calendar_series_update
+        AFTER UPDATE OF title, metadata_source ON series
+        FOR EACH ROW
+        WHEN NEW.title IS NOT OLD.title OR NEW.metadata_source IS NOT OLD.metadata_source
+        BEGIN
+            INSERT OR IGNORE INTO calendar_changes (item_type, item_id) VALUES ('series', NEW.id);
+        END
+    """),
+]
+
+
+def migrate():
+    """Create the calendar_changes table and the triggers that fill it."""
+    LOGGER.info("Adding calendar change tracking")
+
+    try:
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS calendar_changes (
+                item_type TEXT NOT NULL,
+                item_id INTEGER NOT NULL,
+                PRIMARY KEY (item_type, item_id)
+            ) WITHOUT ROWID
+        """, commit=True)
+
+        for _, statement in TRIGGERS:
+            execute_query(statement, commit=True)
+
+        execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_volumes_release_date ON volumes(release_date)",
+            commit=True
+        )
+
+        # Re-check the whole calendar on the next refresh
+        execute_query(
+            "INSERT OR IGNORE INTO calendar_changes (item_type, item_id) SELECT 'series', id FROM series",
+            commit=True
+        )
+
+        LOGGER.info("Calendar change tracking added successfully")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Error adding calendar change tracking: {e}")
+        return False
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping calendar change tracking")
+    for name, _ in TRIGGERS:
+        execute_query(f"DROP TRIGGER IF EXISTS {name}", commit=True)
+    execute_query("DROP INDEX IF EXISTS idx_volumes_release_date", commit=True)
+    execute_query("DROP TABLE IF EXISTS calendar_changes", commit=True)
+    LOGGER.info("Calendar change tracking dropped")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0029: Store projected chapter releases as release schedules.
+
+A release schedule describes a run of chapter releases by the first chapter
+number, the first release, the interval between releases, the weekday the
+releases move to and the number of releases, with exceptions for single
+chapters. The calendar and the release notifications expand the schedules
+for the requested dates, so projected chapters no longer need a row each.
+
+Chapters that were already stored as rows stay as they are. They are
+replaced by a schedule when the series is imported or refreshed again.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+
+def migrate():
+    """Create the release_schedules table."""
+    LOGGER.info("Adding release schedules")
+
+    try:
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS release_schedules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                series_id INTEGER NOT NULL,
+                first_number INTEGER NOT NULL,
+                start_at TEXT NOT NULL,
+                interval_seconds REAL NOT NULL,
+                release_count INTEGER NOT NULL,
+                weekday INTEGER,
+                confirmed INTEGER NOT NULL DEFAULT 0,
+                exceptions TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (series_id) REFERENCES series (id) ON DELETE CASCADE,
+                UNIQUE (series_id, first_number)
+            )
+        """, commit=True)
+
+        LOGGER.info("Release schedules added successfully")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Error adding release schedules: {e}")
+        return False
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping release schedules")
+    execute_query("DROP TABLE IF EXISTS release_schedules", commit=True)
+    LOGGER.info("Release schedules dropped")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0030: Keep a version number of the calendar data.
+
+The calendar_version table has a single row with a version number and the
+time of the last change. Triggers increase the version whenever a change
+is made to the data the calendar is built from: the release dates, numbers
+and titles of volumes and chapters, the release schedules, the calendar
+events, the series and the collections the series are in. Calendar
+responses are cached and validated by this version, so a client that
+already has the current calendar gets a 304 response.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+_BUMP = "UPDATE calendar_version SET version = version + 1, changed_at = CURRENT_TIMESTAMP WHERE id = 1;"
+
+# (table, columns whose update changes the calendar, or None for all)
+TRACKED_TABLES = [
+    ("volumes", "series_id, volume_number, title, release_date"),
+    ("chapters", "series_id, chapter_number, title, release_date"),
+    ("series", "title, content_type, cover_url, author, metadata_source"),
+    ("release_schedules", None),
+    ("calendar_events", None),
+    ("series_collections", None),
+]
+
+
+def _triggers():
+    """Get the name and CREATE statement of every trigger."""
+    for table, columns in TRACKED_TABLES:
+        for action in ("INSERT", "UPDATE", "DELETE"):
+            name = f"trg_calendar_version_{table}_{action.lower()}"
+            event = f"UPDATE OF {columns}" if action == "UPDATE" and columns else action
+            yield name, f"""
+                CREATE TRIGGER IF NOT EXISTS {name}
+                AFTER {event} ON {table}
+                BEGIN
+                    {_BUMP}
+                END
+            """
+
+
+def migrate():
+    """Create the calendar_version table and the triggers that update it."""
+    LOGGER.info("Adding calendar version")
+
+    try:
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS calendar_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL DEFAULT 0,
+                changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """, commit=True)
+        execute_query(
+            "INSERT OR IGNORE INTO calendar_version (id, version) VALUES (1, 0)",
+            commit=True
+        )
+
+        for _, statement in _triggers():
+            execute_query(statement, commit=True)
+
+        LOGGER.info("Calendar version added successfully")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Error adding calendar version: {e}")
+        return False
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping calendar version")
+    for name, _ in _triggers():
+        execute_query(f"DROP TRIGGER IF EXISTS {name}", commit=True)
+    execute_query("DROP TABLE IF EXISTS calendar_version", commit=True)
+    LOGGER.info("Calendar version dropped")
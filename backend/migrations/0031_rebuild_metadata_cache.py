@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migration 0031: Rebuild the metadata cache table with an expiry column.
+
+The metadata cache used to be dropped and created again on every start,
+because databases had two different schemas of it. The table is now
+created once with the schema of `backend.features.metadata_service.cache`:
+keyed by type and ID, with the time the data was cached and the time it
+expires, so the cache survives restarts. Cached data is disposable, so an
+old table is dropped instead of converted.
+"""
+
+from backend.base.logging import LOGGER
+from backend.internals.db import execute_query
+
+
+def migrate():
+    """Create the metadata_cache table with the new schema."""
+    LOGGER.info("Rebuilding metadata cache table")
+
+    try:
+        table_exists = execute_query(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metadata_cache'"
+        )
+        has_expiry = execute_query(
+            "SELECT 1 FROM pragma_table_info('metadata_cache') WHERE name = 'expires_at'"
+        )
+        if table_exists and not has_expiry:
+            execute_query("DROP TABLE metadata_cache", commit=True)
+
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS metadata_cache (
+                type TEXT NOT NULL,
+                id TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                expires_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (type, id)
+            )
+        """, commit=True)
+        execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_metadata_cache_expires_at ON metadata_cache(expires_at)",
+            commit=True
+        )
+
+        LOGGER.info("Metadata cache table rebuilt successfully")
+        return True
+    except Exception as e:
+        LOGGER.error(f"Error rebuilding metadata cache table: {e}")
+        return False
+
+
+def rollback():
+    """Rollback the migration (optional)."""
+    LOGGER.info("Dropping metadata cache table")
+    execute_query("DROP TABLE IF EXISTS metadata_cache", commit=True)
+    LOGGER.info("Metadata cache table dropped")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the hot path queries before and after the index migration (0023).
+
+Builds a synthetic database (50k series by default) in a temporary folder,
+runs the queries that are executed on every page load or scan step, applies
+the migration and runs them again. For every query the query plan and the
+median latency before and after are printed.
+
+Usage:
+    python backend/tools/benchmark_indexes.py [--series 50000] [--runs 50]
+"""
+
+import importlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Callable, Dict, List, Tuple
+
+# Add the repository root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.internals.db import (
+    close_db_connection, execute_many, get_db_connection, set_db_location, setup_db, transaction
+)
+
+
+# (name, query, function that returns parameters for a run)
+QueryCase = Tuple[str, str, Callable[[], Tuple]]
+
+
+def _build_database(series_count: int, volumes_per_series: int, chapters_per_series: int) -> None:
+    """Fill the database with synthetic series, volumes, chapters and events."""
+    providers = ["AniList", "MangaDex", "OpenLibrary"]
+
+    with transaction():
+        execute_many(
+            "INSERT INTO series (id, title, content_type, metadata_source, metadata_id) VALUES (?, ?, ?, ?, ?)",
+            ((i, f"Series {i}", "MANGA", providers[i % 3], str(100000 + i)) for i in range(1, series_count + 1))
+        )
+        execute_many(
+            "INSERT INTO authors (id, name) VALUES (?, ?)",
+            ((i, f"Author {i}") for i in range(1, series_count // 10 + 2))
+        )
+        execute_many(
+            "INSERT INTO author_books (author_id, series_id) VALUES (?, ?)",
+            ((i // 10 + 1, i) for i in range(1, series_count + 1))
+        )
+
+        volume_rows = []
+        for series_id in range(1, series_count + 1):
+            for number in range(1, volumes_per_series + 1):
+                volume_rows.append((series_id, str(number), f"2026-{(number % 12) + 1:02d}-15"))
+        execute_many(
+            "INSERT INTO volumes (series_id, volume_number, release_date) VALUES (?, ?, ?)",
+            volume_rows
+        )
+
+        chapter_rows = []
+        for series_id in range(1, series_count + 1):
+            for number in range(1, chapters_per_series + 1):
+                chapter_rows.append((series_id, str(number), f"2026-{(number % 12) + 1:02d}-{(series_id % 28) + 1:02d}"))
+        execute_many(
+            "INSERT INTO chapters (series_id, chapter_number, release_date) VALUES (?, ?, ?)",
+            chapter_rows
+        )
+
+        conn = get_db_connection()
+        conn.execute("""
+            INSERT INTO calendar_events (series_id, chapter_id, title, event_date, event_type)
+            SELECT series_id, id, 'Chapter ' || chapter_number, release_date, 'CHAPTER_RELEASE'
+            FROM chapters
+        """)
+        conn.execute("""
+            INSERT INTO collection_items (series_id, volume_id, item_type, ownership_status, read_status)
+            SELECT series_id, id, 'VOLUME', 'OWNED', 'UNREAD' FROM volumes WHERE id % 3 = 0
+        """)
+        conn.execute("""
+            INSERT INTO ebook_files (series_id, volume_id, file_path, file_name)
+            SELECT series_id, id, '/library/' || series_id || '/' || id || '.cbz', id || '.cbz'
+            FROM volumes WHERE id % 2 = 0
+        """)
+
+
+def _query_cases(series_count: int, volumes_per_series: int) -> List[QueryCase]:
+    """The queries that run on every page load or scan step."""
+    def series_id() -> Tuple:
+        return (random.randint(1, series_count),)
+
+    def volume_id() -> Tuple:
+        return (random.randint(1, series_count * volumes_per_series),)
+
+    def month() -> Tuple:
+        m = random.randint(1, 12)
+        return (f"2026-{m:02d}-01", f"2026-{m:02d}-07")
+
+    return [
+        ("volumes of series",
+         "SELECT * FROM volumes WHERE series_id = ?", series_id),
+        ("get_or_create_volume",
+         "SELECT id FROM volumes WHERE series_id = ? AND volume_number = '3'", series_id),
+        ("chapters of series",
+         "SELECT * FROM chapters WHERE series_id = ?", series_id),
+        ("chapters in date range",
+         "SELECT c.id, s.title FROM chapters c JOIN series s ON c.series_id = s.id "
+         "WHERE c.release_date >= ? AND c.release_date <= ?", month),
+        ("calendar event exists",
+         "SELECT id FROM calendar_events WHERE series_id = ? AND chapter_id = 1 AND event_date = '2026-01-01'",
+         series_id),
+        ("calendar events in range",
+         "SELECT * FROM calendar_events WHERE event_date >= ? AND event_date <= ? ORDER BY event_date", month),
+        ("collection item of volume",
+         "SELECT id FROM collection_items WHERE series_id = ? AND volume_id = 1 AND item_type = 'VOLUME'",
+         series_id),
+        ("ebook files of volume",
+         "SELECT * FROM ebook_files WHERE volume_id = ?", volume_id),
+        ("author of series",
+         "SELECT id FROM author_books WHERE author_id = 1 AND series_id = ?", series_id),
+        ("series by provider id",
+         "SELECT id FROM series WHERE metadata_source = 'AniList' AND metadata_id = ?",
+         lambda: (str(100000 + random.randint(1, series_count)),)),
+    ]
+
+
+def _measure(cases: List[QueryCase], runs: int) -> Dict[str, Tuple[str, float]]:
+    """Get the query plan and the median latency in milliseconds of every query."""
+    conn = get_db_connection()
+    results = {}
+
+    for name, query, params in cases:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params()).fetchall()
+        plan_text = "; ".join(row[3] for row in plan)
+
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            conn.execute(query, params()).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        results[name] = (plan_text, statistics.median(timings))
+
+    return results
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the hot path queries before and after the index migration")
+    parser.add_argument('--series', type=int, default=50000, help="Number of series to generate")
+    parser.add_argument('--volumes', type=int, default=10, help="Volumes per series")
+    parser.add_argument('--chapters', type=int, default=20, help="Chapters per series")
+    parser.add_argument('--runs', type=int, default=50, help="Runs per query")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as db_folder:
+        set_db_location(db_folder)
+        setup_db()
+
+        print(f"Building database with {args.series} series, {args.volumes} volumes and {args.chapters} chapters per series...")
+        start = time.perf_counter()
+        _build_database(args.series, args.volumes, args.chapters)
+        print(f"Built database in {time.perf_counter() - start:.1f}s")
+
+        cases = _query_cases(args.series, args.volumes)
+        before = _measure(cases, args.runs)
+
+        migration = importlib.import_module("backend.migrations.0023_add_hot_path_indexes")
+        start = time.perf_counter()
+        migration.migrate()
+        print(f"Applied migration in {time.perf_counter() - start:.1f}s")
+
+        after = _measure(cases, args.runs)
+        close_db_connection()
+
+    print()
+    print(f"{'Query':<28} {'Before (ms)':>12} {'After (ms)':>12} {'Speedup':>9}")
+    for name, _, _ in cases:
+        before_ms = before[name][1]
+        after_ms = after[name][1]
+        speedup = before_ms / after_ms if after_ms else float('inf')
+        print(f"{name:<28} {before_ms:>12.3f} {after_ms:>12.3f} {speedup:>8.1f}x")
+
+    print()
+    print("Query plans:")
+    for name, _, _ in cases:
+        print(f"  {name}")
+        print(f"    before: {before[name][0]}")
+        print(f"    after:  {after[name][0]}")
+
+
+if __name__ == "__main__":
+    main()
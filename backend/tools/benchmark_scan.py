@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+End-to-end benchmark of the library scan on a synthetic library.
+
+Generates a root folder with manga series (CBZ and PDF volumes) and a root
+folder with author folders of books (EPUB and PDF volumes), all with a
+README.txt, in a temporary folder with its own database. Then the scan
+steps run one after the other:
+
+    discover    discover_and_create_series() on every root folder
+    first       scan_for_ebooks() on the new library
+    rescan      scan_for_ebooks() without any changes
+    changed     scan_for_ebooks() after changing some of the files
+    full        scan_for_ebooks(full_scan=True)
+
+Metadata providers and author syncing are stubbed out and all other HTTP
+requests fail right away, so only local work is measured. For every step
+the wall time, the file system calls, the read/write syscalls, the
+database statements and the peak RSS so far are reported.
+
+File system calls are the calls of os.stat, os.lstat, os.access,
+os.scandir, os.listdir and open() in this process; the stat of directory
+entries returned by os.scandir is not counted. Read/write syscalls are
+taken from /proc/self/io and are only available on Linux. With --workers,
+the calls of the worker processes are not counted.
+
+Usage:
+    python backend/tools/benchmark_scan.py [--series 500] [--volumes 10] [--authors 50] [--workers 4]
+"""
+
+import builtins
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the repository root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The original open(), for reading /proc/self/io without counting it
+_open = io.open
+
+
+class Counters:
+    """Counts of file system calls and database statements."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fs_calls = 0
+        self.statements = 0
+
+    def count_fs_call(self) -> None:
+        """Count a file system call."""
+        with self._lock:
+            self.fs_calls += 1
+
+    def count_statement(self, statement: str) -> None:
+        """Count a database statement, as trace callback of a connection."""
+        with self._lock:
+            self.statements += 1
+
+
+COUNTERS = Counters()
+
+
+def _counting(function: Callable) -> Callable:
+    """Wrap a function so its calls are counted as file system calls."""
+    def wrapper(*args, **kwargs):
+        COUNTERS.count_fs_call()
+        return function(*args, **kwargs)
+    wrapper.__wrapped__ = function
+    return wrapper
+
+
+def _install_counters() -> None:
+    """Count file system calls and the statements of every new database connection."""
+    for name in ('stat', 'lstat', 'access', 'scandir', 'listdir'):
+        setattr(os, name, _counting(getattr(os, name)))
+    io.open = builtins.open = _counting(io.open)
+
+    connect = sqlite3.connect
+
+    def counting_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(COUNTERS.count_statement)
+        return conn
+    sqlite3.connect = counting_connect
+
+
+def _stub_providers() -> None:
+    """Keep the scan from reaching out to metadata providers."""
+    import requests
+
+    import backend.features.authors_sync as authors_sync
+    import backend.features.ebook_files as ebook_files
+
+    ebook_files.enrich_series_metadata = lambda *args, **kwargs: True
+    authors_sync.sync_author_for_series = lambda *args, **kwargs: True
+
+    def no_network(*args, **kwargs):
+        raise requests.ConnectionError("Network access is disabled in the benchmark")
+    requests.Session.request = no_network
+
+
+def _read_syscalls() -> Optional[int]:
+    """Get the number of read and write syscalls of this process, if known."""
+    try:
+        with _open('/proc/self/io', 'r') as f:
+            values = dict(line.split(':', 1) for line in f.read().splitlines() if ':' in line)
+        return int(values['syscr']) + int(values['syscw'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Get the peak resident set size of this process in MB, if known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _archive(path: Path, entries: Dict[str, bytes]) -> None:
+    """Write a zip archive."""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+
+
+def _write_volume(path: Path, padding: bytes) -> None:
+    """Write a stub e-book file of the type of its extension."""
+    if path.suffix == '.cbz':
+        _archive(path, {
+            **{f"{page:03d}.jpg": padding for page in range(1, 4)},
+            'ComicInfo.xml': f"<ComicInfo><Title>{path.stem}</Title></ComicInfo>".encode()
+        })
+    elif path.suffix == '.epub':
+        _archive(path, {
+            'mimetype': b"application/epub+zip",
+            'META-INF/container.xml': (
+                b'<container><rootfiles><rootfile full-path="content.opf"/></rootfiles></container>'
+            ),
+            'content.opf': (
+                f'<package><metadata><title>{path.stem}</title></metadata></package>'.encode()
+            ),
+            'text.xhtml': padding
+        })
+    else:
+        path.write_bytes(b"%PDF-1.4\n" + padding + b"\n%%EOF\n")
+
+
+def generate_library(
+    root: Path,
+    series_count: int,
+    volumes: int,
+    authors: int,
+    books_per_author: int,
+    file_size: int
+) -> List[Path]:
+    """Generate a synthetic library.
+
+    Args:
+        root (Path): The folder to generate the library in.
+        series_count (int): The number of manga series.
+        volumes (int): The volumes of every series and book.
+        authors (int): The number of author folders.
+        books_per_author (int): The books in every author folder.
+        file_size (int): The size of the content of every file in bytes.
+
+    Returns:
+        List[Path]: The root folders for manga and for books.
+    """
+    manga_root = root / "manga"
+    books_root = root / "books"
+    rng = random.Random(0)
+
+    def content() -> bytes:
+        return rng.getrandbits(file_size * 8).to_bytes(file_size, 'little') if file_size else b""
+
+    for index in range(series_count):
+        title = f"Series {index:05d}"
+        folder = manga_root / title
+        folder.mkdir(parents=True)
+        (folder / "README.txt").write_text(
+            f"Series: {title}\nType: MANGA\nMetadataSource: AniList\nMetadataID: {100000 + index}\n"
+        )
+        for number in range(1, volumes + 1):
+            extension = '.pdf' if number % 5 == 0 else '.cbz'
+            _write_volume(folder / f"{title} v{number:02d}{extension}", content())
+
+    for index in range(authors):
+        author = f"Author {index:04d}"
+        for book in range(books_per_author):
+            title = f"Book {index:04d}-{book:02d}"
+            folder = books_root / author / title
+            folder.mkdir(parents=True)
+            (folder / "README.txt").write_text(
+                f"Book: {title}\nType: BOOK\nAuthor: {author}\n"
+                f"Provider: OpenLibrary\nMetadataID: OL{index * 100 + book}W\n"
+            )
+            for number in range(1, volumes + 1):
+                extension = '.pdf' if number % 4 == 0 else '.epub'
+                _write_volume(folder / f"{title} Vol {number}{extension}", content())
+
+    return [manga_root, books_root]
+
+
+def _change_files(roots: List[Path], fraction: float) -> int:
+    """Change the content of a fraction of the e-book files."""
+    rng = random.Random(1)
+    changed = 0
+    for root in roots:
+        for folder, _, files in os.walk(root):
+            for name in files:
+                if name != "README.txt" and rng.random() < fraction:
+                    with open(os.path.join(folder, name), 'ab') as f:
+                        f.write(b"\0")
+                    changed += 1
+    return changed
+
+
+def _measure(name: str, step: Callable[[], Any]) -> Dict[str, Any]:
+    """Run a step and measure it."""
+    fs_calls, statements, syscalls = COUNTERS.fs_calls, COUNTERS.statements, _read_syscalls()
+    start = time.perf_counter()
+    result = step()
+    elapsed = time.perf_counter() - start
+    syscalls_after = _read_syscalls()
+
+    return {
+        'step': name,
+        'seconds': round(elapsed, 3),
+        'fs_calls': COUNTERS.fs_calls - fs_calls,
+        'syscalls': syscalls_after - syscalls if syscalls is not None and syscalls_after is not None else None,
+        'statements': COUNTERS.statements - statements,
+        'peak_rss_mb': _peak_rss_mb(),
+        'result': result
+    }
+
+
+def _print_report(results: List[Dict[str, Any]]) -> None:
+    """Print the measurements as a table."""
+    def number(value: Optional[float], digits: int = 0) -> str:
+        return "-" if value is None else f"{value:,.{digits}f}"
+
+    print()
+    print(f"{'Step':<10} {'Seconds':>9} {'FS calls':>10} {'Syscalls':>10} {'DB stmts':>10} {'Peak RSS MB':>12}")
+    for result in results:
+        print(
+            f"{result['step']:<10} {result['seconds']:>9.3f} {number(result['fs_calls']):>10} "
+            f"{number(result['syscalls']):>10} {number(result['statements']):>10} "
+            f"{number(result['peak_rss_mb'], 1):>12}"
+        )
+
+    print()
+    for result in results:
+        print(f"{result['step']}: {result['result']}")
+
+
+def main() -> int:
+    parser = ArgumentParser(description="Benchmark the library scan on a synthetic library")
+    parser.add_argument('--series', type=int, default=500, help="Number of manga series")
+    parser.add_argument('--volumes', type=int, default=10, help="Volumes per series and book")
+    parser.add_argument('--authors', type=int, default=50, help="Number of author folders")
+    parser.add_argument('--books', type=int, default=4, help="Books per author folder")
+    parser.add_argument('--file-size', type=int, default=4096, help="Size of the content of every file in bytes")
+    parser.add_argument('--change', type=float, default=0.01, help="Fraction of the files changed before the 'changed' step")
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes that analyse the series folders, 0 to scan in one process")
+    parser.add_argument('--folder', type=Path, help="Generate the library and database here and keep them, instead of in a temporary folder")
+    parser.add_argument('--json', type=Path, help="Also write the measurements to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_folder:
+        folder = args.folder or Path(temp_folder)
+        folder.mkdir(parents=True, exist_ok=True)
+
+        print(f"Generating {args.series} series and {args.authors * args.books} books "
+              f"with {args.volumes} volumes each in {folder}...")
+        start = time.perf_counter()
+        roots = generate_library(folder / "library", args.series, args.volumes, args.authors, args.books, args.file_size)
+        print(f"Generated library in {time.perf_counter() - start:.1f}s")
+
+        _install_counters()
+
+        import logging
+        logging.disable(logging.CRITICAL)
+
+        from backend.internals.db import close_db_connection, set_db_location, setup_db
+        from backend.internals.migrations import run_migrations
+        from backend.internals.settings import Settings
+
+        set_db_location(str(folder))
+        setup_db()
+        run_migrations()
+        Settings().update({'root_folders': [
+            {'path': str(roots[0]), 'name': "Manga", 'content_type': 'MANGA'},
+            {'path': str(roots[1]), 'name': "Books", 'content_type': 'BOOK'}
+        ]})
+
+        _stub_providers()
+        # Covers extracted from the archives go to the benchmark folder
+        import backend.features.ebook_file_metadata as ebook_file_metadata
+        ebook_file_metadata.get_data_dir = lambda: folder
+
+        from backend.features.ebook_files import discover_and_create_series, scan_for_ebooks
+
+        def scan(full_scan: bool = False) -> Dict[str, Any]:
+            return scan_for_ebooks(full_scan=full_scan, workers=args.workers)
+
+        results = [
+            _measure('discover', lambda: sum(discover_and_create_series(root) for root in roots)),
+            _measure('first', scan),
+            _measure('rescan', scan),
+        ]
+        changed = _change_files(roots, args.change)
+        print(f"Changed {changed} files")
+        results.append(_measure('changed', scan))
+        results.append(_measure('full', lambda: scan(full_scan=True)))
+
+        close_db_connection()
+
+    _print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'arguments': {
+                key: str(value) if isinstance(value, Path) else value
+                for key, value in vars(args).items()
+            }, 'results': results}, f, indent=2)
+
+    return 1 if any(isinstance(r['result'], dict) and 'error' in r['result'] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Check and benchmark the volume number extraction.
+
+Every path in the golden corpus (volume_number_corpus.tsv next to this file)
+is run through `extract_volume_number()` and `extract_volume_numbers()`, and
+the results are compared with the expected volume number and range end.
+Then the throughput of both is measured on the corpus. The exit code is 1
+when a result differs from the corpus.
+
+Usage:
+    python backend/tools/benchmark_volume_numbers.py [--repeat 500] [--runs 5]
+"""
+
+import os
+import statistics
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Add the repository root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.features.volume_numbers import (
+    _match_filename, extract_volume_number, extract_volume_numbers, match_volume
+)
+
+
+CORPUS_FILE = Path(__file__).with_name("volume_number_corpus.tsv")
+
+# (path, expected volume number, expected end of the range or total)
+CorpusEntry = Tuple[Path, str, Optional[str]]
+
+
+def _load_corpus(corpus_file: Path) -> List[CorpusEntry]:
+    """Read the corpus, skipping comments and empty lines."""
+    entries = []
+    with open(corpus_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            path, volume, end = line.split('\t')
+            entries.append((Path(path), volume, end or None))
+    return entries
+
+
+def _check(entries: List[CorpusEntry]) -> int:
+    """Compare the results with the corpus and print the differences.
+
+    Returns:
+        int: The number of paths with a different result.
+    """
+    batch = extract_volume_numbers(path for path, _, _ in entries)
+    failures = 0
+
+    for path, volume, end in entries:
+        match = _match_filename(path) or match_volume(path.parent.name)
+        result = (extract_volume_number(path), match.end if match else None)
+        if result != (volume, end) or batch[path] != volume:
+            failures += 1
+            print(f"  {path}: expected {(volume, end)}, got {result}, batch {batch[path]!r}")
+
+    return failures
+
+
+def _measure(paths: List[Path], runs: int) -> Tuple[float, float]:
+    """Get the median throughput in paths per second, one by one and in a batch."""
+    single, batch = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for path in paths:
+            extract_volume_number(path)
+        single.append(len(paths) / (time.perf_counter() - start))
+
+        start = time.perf_counter()
+        extract_volume_numbers(paths)
+        batch.append(len(paths) / (time.perf_counter() - start))
+
+    return statistics.median(single), statistics.median(batch)
+
+
+def main() -> int:
+    parser = ArgumentParser(description="Check the volume number extraction against the golden corpus and benchmark it")
+    parser.add_argument('--corpus', type=Path, default=CORPUS_FILE, help="The corpus file")
+    parser.add_argument('--repeat', type=int, default=500, help="Times the corpus is repeated for the benchmark")
+    parser.add_argument('--runs', type=int, default=5, help="Benchmark runs")
+    args = parser.parse_args()
+
+    entries = _load_corpus(args.corpus)
+    print(f"Checking {len(entries)} paths from {args.corpus}...")
+    failures = _check(entries)
+    print(f"{len(entries) - failures}/{len(entries)} paths match the corpus")
+
+    paths = [path for path, _, _ in entries] * args.repeat
+    single, batch = _measure(paths, args.runs)
+    print()
+    print(f"{'API':<24} {'Paths/s':>12}")
+    print(f"{'extract_volume_number':<24} {single:>12,.0f}")
+    print(f"{'extract_volume_numbers':<24} {batch:>12,.0f}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())